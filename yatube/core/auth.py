@@ -0,0 +1,109 @@
+"""Пользователь запроса из кэша.
+
+Штатный AuthenticationMiddleware на каждый запрос авторизованного
+пользователя читает строку auth_user. Здесь строка (без хеша пароля)
+хранится в кэше вместе с хешем сессии, по которому Django проверяет,
+что пароль не сменился после входа. Запись сбрасывается при сохранении
+и удалении пользователя и при выходе; если хеш в сессии не совпал с
+кэшем, пользователь проверяется по базе штатным путём.
+
+Сброс оставляет в кэше метку на FORGOTTEN_TIMEOUT секунд, а запись
+добавляется только на свободное место: запрос, прочитавший пользователя
+до смены пароля, не вернёт в кэш старый хеш. Кэш должен быть общим для
+всех процессов, иначе сброс виден только одному; с
+AUTH_USER_CACHE_TIMEOUT = 0 (профиль development) пользователь всегда
+читается из базы.
+"""
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import get_user_model
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+User = get_user_model()
+
+
+# Значение после сброса: пока оно в кэше, remember ничего не пишет.
+FORGOTTEN: str = 'forgotten'
+FORGOTTEN_TIMEOUT: int = 60
+
+
+def user_key(user_id: Any) -> str:
+    return f'auth_user:{user_id}'
+
+
+def _fields() -> List[str]:
+    return [field.attname for field in User._meta.concrete_fields
+            if field.attname != 'password']
+
+
+def remember(user: Any) -> None:
+    values: Dict[str, Any] = {
+        name: getattr(user, name) for name in _fields()}
+    cache.add(user_key(user.pk), (values, user.get_session_auth_hash()),
+              settings.AUTH_USER_CACHE_TIMEOUT)
+
+
+def forget(user_id: Any) -> None:
+    cache.set(user_key(user_id), FORGOTTEN, FORGOTTEN_TIMEOUT)
+
+
+def get_user(request: Any) -> Any:
+    """Как django.contrib.auth.get_user, но без запроса при попадании."""
+    if not settings.AUTH_USER_CACHE_TIMEOUT:
+        return auth.get_user(request)
+    try:
+        user_id: Any = auth._get_user_session_key(request)
+    except KeyError:
+        return auth.get_user(request)
+    cached: Any = cache.get(user_key(user_id))
+    if isinstance(cached, tuple) and request.session.get(
+            auth.BACKEND_SESSION_KEY) in settings.AUTHENTICATION_BACKENDS:
+        values, session_hash = cached
+        if constant_time_compare(
+                request.session.get(auth.HASH_SESSION_KEY, ''),
+                session_hash):
+            # Пароль не загружен: при обращении к нему Django дочитает
+            # поле, а save() запишет только загруженные поля.
+            return User.from_db(
+                DEFAULT_DB_ALIAS, list(values), list(values.values()))
+    user: Any = auth.get_user(request)
+    if user.is_authenticated:
+        remember(user)
+    return user
+
+
+def _cached_user(request: Any) -> Any:
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request: Any) -> None:
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _cached_user(request))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        # Вход ничего не меняет в проверке сессии: метка не нужна.
+        cache.delete(user_key(instance.pk))
+        return
+    forget(instance.pk)
+
+
+@receiver(user_logged_out)
+def user_left(sender, request, user, **kwargs):
+    if user is not None:
+        forget(user.pk)
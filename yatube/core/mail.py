@@ -0,0 +1,145 @@
+"""Исходящая почта через очередь в базе.
+
+С EMAIL_BACKEND = 'core.mail.OutboxBackend' письма (сброс пароля,
+уведомления) не отправляются во время запроса: готовое MIME-сообщение
+сохраняется в core.OutboxMessage. Команда send_outbox забирает письма
+пачками и отправляет каждую пачку через OUTBOX_EMAIL_BACKEND по одному
+соединению, не быстрее OUTBOX_RATE писем в секунду. Неотправленное
+письмо повторяется с растущей паузой, после OUTBOX_MAX_ATTEMPTS попыток
+остаётся в состоянии failed.
+"""
+import json
+import logging
+import time
+import traceback
+from contextlib import suppress
+from datetime import timedelta
+from email import message_from_bytes
+from email.message import Message
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxMessage
+from .tasks import backoff
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxBackend(BaseEmailBackend):
+    """Кладёт письма в очередь вместо отправки."""
+
+    def send_messages(self, email_messages: Sequence[EmailMessage]) -> int:
+        now = timezone.now()
+        rows: List[OutboxMessage] = []
+        for message in email_messages:
+            recipients: List[str] = message.recipients()
+            if not recipients:
+                continue
+            rows.append(OutboxMessage(
+                from_email=message.from_email,
+                recipients=json.dumps(recipients),
+                subject=message.subject[:255],
+                raw=message.message().as_bytes(),
+                run_at=now))
+        try:
+            OutboxMessage.objects.bulk_create(rows)
+        except Exception:
+            if not self.fail_silently:
+                raise
+            return 0
+        return len(rows)
+
+
+class StoredMIME(MIMEMixin, Message):
+    """Сохранённое сообщение; as_bytes принимает linesep, как у Django."""
+
+
+class OutboxEmail(EmailMessage):
+    """Письмо из очереди в виде, понятном любому бэкенду Django."""
+
+    def __init__(self, row: OutboxMessage) -> None:
+        super().__init__(subject=row.subject, from_email=row.from_email,
+                         to=json.loads(row.recipients))
+        self.raw: bytes = bytes(row.raw)
+
+    def message(self) -> Message:
+        return message_from_bytes(self.raw, _class=StoredMIME)
+
+
+def requeue_stale() -> int:
+    """Возвращает в очередь письма рассыльщиков, упавших посреди пачки."""
+    deadline = timezone.now() - timedelta(
+        seconds=settings.TASKS_LOCK_TIMEOUT)
+    return OutboxMessage.objects.filter(
+        status=OutboxMessage.SENDING, locked_at__lt=deadline).update(
+        status=OutboxMessage.QUEUED, locked_by='', locked_at=None)
+
+
+def claim(worker: str, size: int) -> List[OutboxMessage]:
+    """Берёт пачку готовых писем одним условным UPDATE."""
+    now = timezone.now()
+    candidates: List[int] = list(OutboxMessage.objects.filter(
+        status=OutboxMessage.QUEUED, run_at__lte=now).order_by(
+        'run_at', 'pk').values_list('pk', flat=True)[:size])
+    OutboxMessage.objects.filter(
+        pk__in=candidates, status=OutboxMessage.QUEUED).update(
+        status=OutboxMessage.SENDING, locked_by=worker, locked_at=now,
+        attempts=F('attempts') + 1)
+    return list(OutboxMessage.objects.filter(
+        pk__in=candidates, status=OutboxMessage.SENDING,
+        locked_by=worker).order_by('run_at', 'pk'))
+
+
+def retry(row: OutboxMessage, error: str) -> None:
+    if row.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        OutboxMessage.objects.filter(pk=row.pk).update(
+            status=OutboxMessage.FAILED, last_error=error, locked_by='',
+            locked_at=None)
+        return
+    OutboxMessage.objects.filter(pk=row.pk).update(
+        status=OutboxMessage.QUEUED, last_error=error, locked_by='',
+        locked_at=None, run_at=timezone.now() + timedelta(
+            seconds=backoff(row.attempts, settings.OUTBOX_BACKOFF)))
+
+
+def deliver(rows: List[OutboxMessage], connection: Optional[Any] = None,
+            rate: Optional[float] = None) -> Tuple[int, int]:
+    """Отправляет захваченную пачку; возвращает (отправлено, с ошибкой).
+
+    Соединение открывается один раз на пачку и переоткрывается только
+    после ошибки, в каком бы состоянии она его ни оставила.
+    """
+    if connection is None:
+        connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+    if rate is None:
+        rate = settings.OUTBOX_RATE
+    interval: float = 1 / rate if rate else 0
+    sent = failed = 0
+    next_at: float = time.monotonic()
+    try:
+        for row in rows:
+            time.sleep(max(0, next_at - time.monotonic()))
+            next_at = time.monotonic() + interval
+            try:
+                connection.open()
+                connection.send_messages([OutboxEmail(row)])
+            except Exception:
+                logger.exception('Письмо %s, попытка %d', row.pk,
+                                 row.attempts)
+                with suppress(Exception):
+                    connection.close()
+                retry(row, traceback.format_exc())
+                failed += 1
+            else:
+                OutboxMessage.objects.filter(pk=row.pk).delete()
+                sent += 1
+    finally:
+        with suppress(Exception):
+            connection.close()
+    return sent, failed
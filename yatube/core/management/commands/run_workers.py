@@ -0,0 +1,112 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core import tasks
+from core.models import Task
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди core_task пулом потоков. '
+            'Упавшие задачи повторяются с растущей паузой; задачи '
+            'исполнителей, упавших посреди работы, возвращаются в очередь '
+            'через TASKS_LOCK_TIMEOUT (проверка — раз в '
+            'TASKS_REQUEUE_INTERVAL). SIGINT/SIGTERM — доделать текущие '
+            'задачи и выйти.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.TASKS_WORKERS)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и выйти (для cron и тестов).')
+        parser.add_argument(
+            '--max-tasks', type=int, default=0,
+            help='Выйти после стольких задач на поток (0 — без предела).')
+
+    def work(self, number, options, pooled=True):
+        """Цикл одного исполнителя: берёт задачи, пока не велят остановиться.
+
+        Соединениями с базой управляют только потоки пула: у каждого они
+        свои, а соединение главного потока принадлежит вызывающему коду.
+        """
+        worker = f'{socket.gethostname()}:{os.getpid()}:{number}'
+        done = failed = 0
+        try:
+            while not self.stopping.is_set():
+                if pooled:
+                    close_old_connections()
+                self.requeue_stale()
+                row = tasks.claim(worker)
+                if row is None:
+                    if options['once']:
+                        break
+                    self.stopping.wait(settings.TASKS_POLL_INTERVAL)
+                    continue
+                if tasks.execute(row):
+                    done += 1
+                else:
+                    failed += 1
+                if options['max_tasks'] and (
+                        done + failed >= options['max_tasks']):
+                    break
+        finally:
+            if pooled:
+                connections.close_all()
+        return done, failed
+
+    def requeue_stale(self):
+        """Возвращает в очередь задачи упавших исполнителей.
+
+        Проверка идёт не чаще раза в TASKS_REQUEUE_INTERVAL на весь пул,
+        в том числе пока остальные исполнители работают.
+        """
+        with self.requeue_lock:
+            if time.monotonic() < self.requeue_at:
+                return
+            self.requeue_at = (
+                time.monotonic() + settings.TASKS_REQUEUE_INTERVAL)
+        stale = tasks.requeue_stale()
+        if stale:
+            self.stdout.write(f'Возвращено в очередь брошенных: {stale}')
+
+    def stop(self, signum, frame):
+        self.stdout.write('Останавливаемся после текущих задач...')
+        self.stopping.set()
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                handlers[signum] = signal.signal(signum, self.stop)
+        try:
+            self.run(options)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run(self, options):
+        self.requeue_lock = threading.Lock()
+        self.requeue_at = time.monotonic()
+        started = time.monotonic()
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=options['workers'],
+                                    thread_name_prefix='run_workers') as pool:
+                results = list(pool.map(
+                    lambda number: self.work(number, options),
+                    range(options['workers'])))
+        else:
+            results = [self.work(0, options, pooled=False)]
+        done = sum(result[0] for result in results)
+        failed = sum(result[1] for result in results)
+        left = Task.objects.filter(status=Task.QUEUED).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Выполнено {done}, с ошибкой {failed} за '
+            f'{time.monotonic() - started:.1f} с; в очереди {left}.'))
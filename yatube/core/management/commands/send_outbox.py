@@ -0,0 +1,68 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+from core import mail
+from core.models import OutboxMessage
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди core_outboxmessage пачками через '
+            'OUTBOX_EMAIL_BACKEND, по одному соединению на пачку и не '
+            'быстрее --rate писем в секунду. SIGINT/SIGTERM — доотправить '
+            'пачку и выйти.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE)
+        parser.add_argument(
+            '--rate', type=float, default=settings.OUTBOX_RATE,
+            help='Писем в секунду, 0 — без ограничения.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Отправить готовые письма и выйти (для cron и тестов).')
+
+    def stop(self, signum, frame):
+        self.stdout.write('Останавливаемся после текущей пачки...')
+        self.stopping.set()
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                handlers[signum] = signal.signal(signum, self.stop)
+        try:
+            self.run(options)
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def run(self, options):
+        stale = mail.requeue_stale()
+        if stale:
+            self.stdout.write(f'Возвращено в очередь брошенных: {stale}')
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        connection = get_connection(settings.OUTBOX_EMAIL_BACKEND)
+        started = time.monotonic()
+        sent = failed = 0
+        while not self.stopping.is_set():
+            rows = mail.claim(worker, options['batch_size'])
+            if not rows:
+                if options['once']:
+                    break
+                self.stopping.wait(settings.TASKS_POLL_INTERVAL)
+                continue
+            done, errors = mail.deliver(rows, connection, options['rate'])
+            sent += done
+            failed += errors
+        left = OutboxMessage.objects.filter(
+            status=OutboxMessage.QUEUED).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Отправлено {sent}, с ошибкой {failed} за '
+            f'{time.monotonic() - started:.1f} с; в очереди {left}.'))
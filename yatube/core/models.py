@@ -0,0 +1,81 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """Задача фоновой очереди (core/tasks.py) для run_workers."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    # Ключ для склейки одинаковых задач в очереди, например имя картинки
+    key = models.CharField('Ключ', max_length=255, blank=True)
+    payload = models.TextField('Аргументы (JSON)')
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Предел попыток')
+    run_at = models.DateTimeField('Не раньше')
+    locked_by = models.CharField('Исполнитель', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взята', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    def __str__(self) -> str:
+        return f'{self.name}({self.key or self.pk})'
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        # Выбор готовых задач и поиск дублей по ключу
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='task_status_run_at_idx'),
+            models.Index(
+                fields=['name', 'key'], name='task_name_key_idx'),
+        ]
+
+
+class OutboxMessage(models.Model):
+    """Письмо, ждущее отправки командой send_outbox (core/mail.py)."""
+
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (SENDING, 'Отправляется'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    from_email = models.CharField('Отправитель', max_length=254)
+    # Адреса конверта (to, cc и bcc) в JSON
+    recipients = models.TextField('Получатели (JSON)')
+    subject = models.CharField('Тема', max_length=255, blank=True)
+    # Готовое MIME-сообщение: при отправке оно не собирается заново
+    raw = models.BinaryField('Сообщение')
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    run_at = models.DateTimeField('Не раньше')
+    locked_by = models.CharField('Рассыльщик', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взято', null=True, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.subject or f'Письмо {self.pk}'
+
+    class Meta:
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'], name='outbox_status_run_at_idx'),
+        ]
@@ -0,0 +1,220 @@
+"""Фоновые задачи без внешнего брокера.
+
+Функция-задача объявляется декоратором @task и ставится в очередь
+вызовом .delay(...): после коммита текущей транзакции, чтобы исполнитель
+видел сохранённые данные. Куда попадает задача, решает TASKS_BACKEND:
+
+- DatabaseBackend — строка core.Task; её выполняет команда run_workers
+  (пул потоков), с повторами и растущей паузой между ними;
+- ThreadBackend — пул потоков веб-процесса, без сохранения очереди;
+- ImmediateBackend — сразу в том же потоке (тесты, отладка).
+
+Аргументы задач сериализуются в JSON. Задача с ключом (key) не
+ставится повторно, пока такая же ждёт или выполняется. Успешные задачи
+удаляются, исчерпавшие попытки остаются в состоянии failed.
+"""
+import json
+import logging
+import random
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, 'TaskFunction'] = {}
+
+
+class TaskFunction:
+    """Функция, которую можно выполнить в фоне: f.delay(*args)."""
+
+    def __init__(self, func: Callable, max_attempts: int,
+                 backoff: float) -> None:
+        self.func: Callable = func
+        self.name: str = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts: int = max_attempts
+        self.backoff: float = backoff
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args: Any, key: str = '', **kwargs: Any) -> None:
+        """Ставит вызов в очередь после коммита транзакции."""
+        payload: str = json.dumps({'args': args, 'kwargs': kwargs})
+        transaction.on_commit(
+            lambda: get_backend().enqueue(self, payload, key))
+
+
+def task(max_attempts: int = 5,
+         backoff: Optional[float] = None
+         ) -> Callable[[Callable], TaskFunction]:
+    """Объявляет фоновую задачу.
+
+    После неудачной попытки n следующая — не раньше чем через
+    backoff * 2 ** (n - 1) секунд (но не дольше TASKS_MAX_BACKOFF).
+    """
+    def decorator(func: Callable) -> TaskFunction:
+        wrapped = TaskFunction(
+            func, max_attempts,
+            settings.TASKS_BACKOFF if backoff is None else backoff)
+        _registry[wrapped.name] = wrapped
+        return wrapped
+    return decorator
+
+
+def get_task(name: str) -> TaskFunction:
+    if name not in _registry:
+        # Модуль задачи ещё не импортирован в этом процессе: задачи
+        # регистрируются декоратором при импорте.
+        import_module(name.rsplit('.', 1)[0])
+    return _registry[name]
+
+
+def backoff(attempts: int, base: float) -> float:
+    """Пауза после неудачной попытки номер attempts, секунд."""
+    delay: float = min(base * 2 ** (attempts - 1),
+                       settings.TASKS_MAX_BACKOFF)
+    # Разброс, чтобы повторы упавших вместе задач не шли пачкой.
+    return delay * random.uniform(1, 1.25)
+
+
+def retry_delay(row: Task) -> float:
+    """Пауза перед следующей попыткой задачи row, секунд."""
+    function: Optional[TaskFunction] = _registry.get(row.name)
+    return backoff(
+        row.attempts,
+        function.backoff if function else settings.TASKS_BACKOFF)
+
+
+def _call(function: TaskFunction, payload: str) -> None:
+    data: Dict[str, Any] = json.loads(payload)
+    function(*data['args'], **data['kwargs'])
+
+
+class ImmediateBackend:
+    def enqueue(self, function: TaskFunction, payload: str,
+                key: str) -> None:
+        try:
+            _call(function, payload)
+        except Exception:
+            logger.exception('Задача %s не выполнена', function.name)
+
+
+class ThreadBackend(ImmediateBackend):
+    """Пул потоков процесса; очередь теряется при перезапуске."""
+
+    def __init__(self) -> None:
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._running: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def _run(self, function: TaskFunction, payload: str, key: str) -> None:
+        try:
+            super().enqueue(function, payload, key)
+        finally:
+            with self._lock:
+                self._running.discard(f'{function.name}:{key}')
+            # Соединения с базой у каждого потока свои.
+            connections.close_all()
+
+    def enqueue(self, function: TaskFunction, payload: str,
+                key: str) -> None:
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Базу SQLite в памяти (тесты) нельзя делить с другими потоками.
+            super().enqueue(function, payload, key)
+            return
+        with self._lock:
+            if key and f'{function.name}:{key}' in self._running:
+                return
+            self._running.add(f'{function.name}:{key}')
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=settings.TASKS_WORKERS,
+                    thread_name_prefix='tasks')
+        self._executor.submit(self._run, function, payload, key)
+
+
+class DatabaseBackend:
+    """Очередь в таблице core_task; выполняет её run_workers."""
+
+    def enqueue(self, function: TaskFunction, payload: str,
+                key: str) -> None:
+        if key and Task.objects.filter(
+                name=function.name, key=key,
+                status__in=(Task.QUEUED, Task.RUNNING)).exists():
+            return
+        Task.objects.create(
+            name=function.name, key=key, payload=payload,
+            max_attempts=function.max_attempts, run_at=timezone.now())
+
+
+_backend: Optional[Any] = None
+_backend_lock = threading.Lock()
+
+
+def get_backend() -> Any:
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = import_string(settings.TASKS_BACKEND)()
+        return _backend
+
+
+def requeue_stale() -> int:
+    """Возвращает в очередь задачи упавших исполнителей."""
+    deadline = timezone.now() - timedelta(
+        seconds=settings.TASKS_LOCK_TIMEOUT)
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=deadline).update(
+        status=Task.QUEUED, locked_by='', locked_at=None)
+
+
+def claim(worker: str) -> Optional[Task]:
+    """Берёт одну готовую задачу; конкуренты не получат ту же.
+
+    Строка захватывается условным UPDATE по состоянию, поэтому очередь
+    работает и в SQLite, где нет SELECT ... FOR UPDATE SKIP LOCKED.
+    """
+    now = timezone.now()
+    candidates: List[int] = list(Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now).order_by(
+        'run_at', 'pk').values_list('pk', flat=True)[:10])
+    for pk in candidates:
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+                status=Task.RUNNING, locked_by=worker, locked_at=now,
+                attempts=F('attempts') + 1):
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def execute(row: Task) -> bool:
+    """Выполняет захваченную задачу; True — успешно."""
+    try:
+        _call(get_task(row.name), row.payload)
+    except Exception:
+        logger.exception('Задача %s, попытка %d', row, row.attempts)
+        error: str = traceback.format_exc()
+        if row.attempts >= row.max_attempts:
+            Task.objects.filter(pk=row.pk).update(
+                status=Task.FAILED, last_error=error, locked_by='',
+                locked_at=None)
+        else:
+            Task.objects.filter(pk=row.pk).update(
+                status=Task.QUEUED, last_error=error, locked_by='',
+                locked_at=None, run_at=timezone.now() + timedelta(
+                    seconds=retry_delay(row)))
+        return False
+    Task.objects.filter(pk=row.pk).delete()
+    return True
@@ -1,4 +1,48 @@
-from django.test import Client, TestCase
+import os
+import runpy
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from typing import List
+from unittest import mock
+
+from core import auth, tasks, warmup
+from core.models import OutboxMessage, Task
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+calls: List[str] = []
+
+
+@tasks.task(max_attempts=3)
+def record(value: str) -> None:
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2, backoff=60)
+def explode() -> None:
+    raise ValueError('сбой')
+
+
+@tasks.task()
+def abandon(key: str) -> None:
+    """Исполнитель задачи key «упал» давно."""
+    Task.objects.filter(key=key).update(
+        locked_at=timezone.now() - timedelta(days=1))
 
 
 class ViewTestCase(TestCase):
@@ -10,3 +54,276 @@ class ViewTestCase(TestCase):
         response = self.client.get('/some-page/')
         self.assertEqual(response.status_code, 404)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self) -> None:
+        calls.clear()
+        # TestCase не коммитит транзакцию: колбэки выполняются сразу.
+        patcher = mock.patch.object(
+            tasks.transaction, 'on_commit', lambda callback: callback())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Очередь в базе, как в профиле production.
+        backend = mock.patch.object(
+            tasks, '_backend', tasks.DatabaseBackend())
+        backend.start()
+        self.addCleanup(backend.stop)
+
+    def run_workers(self) -> str:
+        out = StringIO()
+        call_command('run_workers', once=True, workers=1, stdout=out)
+        return out.getvalue()
+
+    def test_delay_enqueues_once_per_key(self) -> None:
+        """Задача с ключом не ставится повторно, пока ждёт в очереди."""
+        record.delay('a', key='a')
+        record.delay('a', key='a')
+        record.delay('b')
+        row = Task.objects.get(key='a')
+        self.assertEqual(row.name, 'core.tests.record')
+        self.assertEqual(row.max_attempts, 3)
+        self.assertEqual(Task.objects.count(), 2)
+        self.assertEqual(calls, [])
+
+    def test_run_workers_executes_and_deletes(self) -> None:
+        record.delay('a', key='a')
+        record.delay('b')
+        self.assertIn('Выполнено 2', self.run_workers())
+        self.assertEqual(sorted(calls), ['a', 'b'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_task_is_retried_with_backoff(self) -> None:
+        """Упавшая задача откладывается, после max_attempts — failed."""
+        explode.delay()
+        started = timezone.now()
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.run_workers()
+        row = Task.objects.get()
+        self.assertEqual(row.status, Task.QUEUED)
+        self.assertEqual(row.attempts, 1)
+        self.assertGreaterEqual(row.run_at, started + timedelta(seconds=60))
+        self.assertIn('ValueError', row.last_error)
+        # Пока пауза не вышла, задача не берётся.
+        self.assertIn('Выполнено 0, с ошибкой 0', self.run_workers())
+        Task.objects.update(run_at=started)
+        with self.assertLogs('core.tasks', 'ERROR'):
+            self.run_workers()
+        row.refresh_from_db()
+        self.assertEqual(row.status, Task.FAILED)
+        self.assertEqual(row.attempts, 2)
+
+    def test_stale_task_is_requeued(self) -> None:
+        """Задача упавшего исполнителя возвращается в очередь."""
+        record.delay('a')
+        self.assertIsNotNone(tasks.claim('dead'))
+        Task.objects.update(locked_at=timezone.now() - timedelta(days=1))
+        self.assertIsNone(tasks.claim('alive'))
+        self.run_workers()
+        self.assertEqual(calls, ['a'])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASKS_REQUEUE_INTERVAL=0)
+    def test_stale_task_is_requeued_while_running(self) -> None:
+        """Брошенная задача возвращается, не дожидаясь перезапуска."""
+        record.delay('b', key='b')
+        self.assertIsNotNone(tasks.claim('dead'))
+        abandon.delay('b')
+        self.run_workers()
+        self.assertEqual(calls, ['b'])
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.OutboxBackend',
+    OUTBOX_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+    OUTBOX_RATE=0)
+class OutboxTests(TestCase):
+    def send_outbox(self) -> str:
+        out = StringIO()
+        call_command('send_outbox', once=True, stdout=out)
+        return out.getvalue()
+
+    def test_password_reset_is_queued(self) -> None:
+        """Сброс пароля не отправляет письмо в запросе."""
+        User.objects.create_user('user', 'user@example.com', 'pass')
+        response = Client().post(reverse('users:password_reset_form'),
+                                 {'email': 'user@example.com'})
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboxMessage.objects.get().recipients,
+                         '["user@example.com"]')
+        self.assertIn('Отправлено 1', self.send_outbox())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].message()['To'], 'user@example.com')
+        self.assertIn('/auth/reset/',
+                      mail.outbox[0].message().get_payload(decode=True)
+                      .decode())
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_batch_uses_one_connection(self) -> None:
+        """Пачка писем уходит через одно соединение бэкенда."""
+        path: str = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, path, True)
+        mail.send_mass_mail([
+            (f'Письмо {number}', 'Текст', None, [f'u{number}@example.com'])
+            for number in range(3)])
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+        with self.settings(
+                OUTBOX_EMAIL_BACKEND='django.core.mail.backends.'
+                                     'filebased.EmailBackend',
+                EMAIL_FILE_PATH=path):
+            self.send_outbox()
+        self.assertEqual(len(os.listdir(path)), 1)
+        with open(os.path.join(path, os.listdir(path)[0]), 'rb') as sent:
+            self.assertEqual(sent.read().count(b'Subject:'), 3)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_failed_message_is_retried(self) -> None:
+        """Неотправленное письмо откладывается, затем — failed."""
+        mail.send_mail('Тема', 'Текст', None, ['user@example.com'])
+        started = timezone.now()
+        with mock.patch.object(EmailBackend, 'send_messages',
+                               side_effect=OSError('нет связи')):
+            with self.assertLogs('core.mail', 'ERROR'):
+                self.send_outbox()
+            row = OutboxMessage.objects.get()
+            self.assertEqual(row.status, OutboxMessage.QUEUED)
+            self.assertGreater(row.run_at, started + timedelta(seconds=59))
+            self.assertIn('нет связи', row.last_error)
+            OutboxMessage.objects.update(run_at=started)
+            with self.assertLogs('core.mail', 'ERROR'):
+                self.send_outbox()
+        row.refresh_from_db()
+        self.assertEqual(row.status, OutboxMessage.FAILED)
+        self.assertEqual(mail.outbox, [])
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db',
+    AUTH_USER_CACHE_TIMEOUT=60 * 60)
+class CachedUserTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create_user('reader', password='old-pass')
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('about:author')
+
+    def queries(self) -> int:
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        return len(context.captured_queries)
+
+    def test_page_view_skips_session_and_user_queries(self) -> None:
+        """Сессия и пользователь берутся из кэша, база не нужна."""
+        self.client.get(self.url)
+        self.assertEqual(self.queries(), 0)
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['user'].pk, self.user.pk)
+        self.assertContains(response, 'Пользователь: reader')
+
+    def test_rename_is_visible(self) -> None:
+        self.client.get(self.url)
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertContains(self.client.get(self.url),
+                            'Пользователь: renamed')
+
+    def test_password_change_ends_other_sessions(self) -> None:
+        """Сессия со старым паролем не проходит и через кэш."""
+        self.client.get(self.url)
+        other = Client()
+        other.force_login(self.user)
+        self.user.set_password('new-pass')
+        self.user.save()
+        other.get(self.url)
+        self.assertNotContains(self.client.get(self.url), 'Пользователь:')
+
+    def test_cached_user_saves_only_loaded_fields(self) -> None:
+        """Смена пароля через кэшированного пользователя не портит строку."""
+        self.client.get(self.url)
+        response = self.client.post(
+            reverse('users:password_change_form'),
+            {'old_password': 'old-pass', 'new_password1': 'Zx9-long-pass',
+             'new_password2': 'Zx9-long-pass'})
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('Zx9-long-pass'))
+        self.assertContains(self.client.get(self.url),
+                            'Пользователь: reader')
+
+    def test_logout_forgets_user(self) -> None:
+        self.client.get(self.url)
+        self.client.get(reverse('users:logout'))
+        self.assertEqual(cache.get(f'auth_user:{self.user.pk}'),
+                         auth.FORGOTTEN)
+
+    def test_stale_user_is_not_cached_after_forget(self) -> None:
+        """Пользователь, прочитанный до смены пароля, не попадает в кэш."""
+        stale = User.objects.get(pk=self.user.pk)
+        self.user.set_password('new-pass')
+        self.user.save()
+        auth.remember(stale)
+        self.assertEqual(cache.get(f'auth_user:{self.user.pk}'),
+                         auth.FORGOTTEN)
+        self.assertNotContains(self.client.get(self.url), 'Пользователь:')
+
+    @override_settings(AUTH_USER_CACHE_TIMEOUT=0)
+    def test_cache_can_be_disabled(self) -> None:
+        self.client.get(self.url)
+        self.assertIsNone(cache.get(f'auth_user:{self.user.pk}'))
+
+
+class ProfileTests(TestCase):
+    SETTINGS = os.path.join(settings.BASE_DIR, 'yatube', 'settings.py')
+
+    def load(self, profile: str) -> dict:
+        with mock.patch.dict(os.environ, YATUBE_PROFILE=profile):
+            return runpy.run_path(self.SETTINGS)
+
+    def test_production_profile(self) -> None:
+        production = self.load('production')
+        self.assertFalse(production['DEBUG'])
+        self.assertNotIn('debug_toolbar', production['INSTALLED_APPS'])
+        self.assertFalse(any('debug_toolbar' in middleware
+                             for middleware in production['MIDDLEWARE']))
+        options = production['TEMPLATES'][0]['OPTIONS']
+        self.assertEqual(options['loaders'][0][0],
+                         'django.template.loaders.cached.Loader')
+        self.assertGreater(
+            production['DATABASES']['default']['CONN_MAX_AGE'], 0)
+        self.assertIn(
+            'memcached', production['CACHES']['default']['BACKEND'])
+        # Долгие сроки кэша лент — только с общим кэшем.
+        self.assertIsNone(production['FEED_VERSION_TIMEOUT'])
+        self.assertGreater(production['POST_LIST_CACHE_TIMEOUT'],
+                           self.load('development')['POST_LIST_CACHE_TIMEOUT'])
+        # Сессии и пользователь в кэше — только с общим кэшем.
+        self.assertEqual(production['SESSION_ENGINE'],
+                         'django.contrib.sessions.backends.cached_db')
+        self.assertEqual(self.load('development')['AUTH_USER_CACHE_TIMEOUT'],
+                         0)
+        # Задачи из веб-процессов выполняет run_workers.
+        self.assertEqual(production['TASKS_BACKEND'],
+                         'core.tasks.DatabaseBackend')
+        self.assertTrue(self.load('development')['DEBUG'])
+
+    def test_unknown_profile(self) -> None:
+        with self.assertRaises(ImproperlyConfigured):
+            self.load('prod')
+
+
+class WarmupTests(TestCase):
+    def test_compile_templates(self) -> None:
+        """Компилируются все шаблоны из каталога templates."""
+        total: int = sum(len(files) for _, _, files in os.walk(
+            settings.TEMPLATES_DIR))
+        self.assertEqual(warmup.compile_templates(), total)
+
+    def test_warmup_requests_pages(self) -> None:
+        application = get_wsgi_application()
+        self.assertEqual(warmup.request(application, '/'), '200 OK')
+        with self.assertLogs('core.warmup', 'INFO') as logs:
+            warmup.warmup(application)
+        self.assertIn('Прогрев', logs.output[0])
@@ -0,0 +1,79 @@
+"""Прогрев процесса до первого запроса (вызывается из yatube/wsgi.py).
+
+Первый запрос нового процесса платит за компиляцию шаблонов, разбор
+URLconf, импорт вью, открытие соединения с базой и пустые кэши. warmup()
+делает всё это при старте: компилирует шаблоны из каталогов TEMPLATES
+(с кэширующим загрузчиком они остаются в памяти), заполняет резолвер и
+прогоняет через приложение запросы к WARMUP_URLS. Ошибки прогрева
+записываются в лог и не мешают процессу стартовать.
+"""
+import io
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def compile_templates() -> int:
+    """Компилирует все шаблоны из каталогов DIRS; возвращает их число."""
+    count = 0
+    for engine in engines.all():
+        for directory in engine.dirs:
+            for root, _, files in os.walk(directory):
+                for name in files:
+                    path: str = os.path.relpath(
+                        os.path.join(root, name), directory)
+                    try:
+                        engine.get_template(path.replace(os.sep, '/'))
+                    except TemplateSyntaxError:
+                        logger.exception('Шаблон %s не компилируется', path)
+                        continue
+                    count += 1
+    return count
+
+
+def request(application: Callable, url: str) -> str:
+    """Прогоняет GET url через WSGI-приложение; возвращает статус."""
+    environ: Dict[str, Any] = {
+        'PATH_INFO': url, 'wsgi.input': io.BytesIO(),
+        'HTTP_HOST': settings.ALLOWED_HOSTS[0]}
+    setup_testing_defaults(environ)
+    statuses: List[str] = []
+    response = application(
+        environ, lambda status, headers, exc_info=None: statuses.append(
+            status))
+    try:
+        for _ in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return statuses[0]
+
+
+def warmup(application: Callable) -> None:
+    started = time.monotonic()
+    try:
+        templates: int = compile_templates()
+        get_resolver()._populate()
+        for url in settings.WARMUP_URLS:
+            status: str = request(application, url)
+            if not status.startswith('200'):
+                logger.warning('Прогрев: %s ответил %s', url, status)
+    except Exception:
+        logger.exception('Прогрев не завершён')
+        return
+    finally:
+        # При запуске с --preload соединения открыты до fork и не должны
+        # достаться рабочим процессам.
+        connections.close_all()
+    logger.info('Прогрев: %d шаблонов, %d URL за %.2f с', templates,
+                len(settings.WARMUP_URLS), time.monotonic() - started)
@@ -1,9 +1,31 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 
+from . import export, search
 from .models import Comment, Follow, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+def export_jsonl(modeladmin, request, queryset):
+    """Выбранные записи файлом JSONL, потоком."""
+    label: str = queryset.model._meta.label_lower
+    response = StreamingHttpResponse(
+        export.lines(export.records(queryset)),
+        content_type='application/x-ndjson; charset=utf-8')
+    response['Content-Disposition'] = (
+        f'attachment; filename="{label}-'
+        f'{timezone.now():%Y%m%d-%H%M%S}.jsonl"')
+    return response
+
+
+export_jsonl.short_description = 'Выгрузить в JSONL'
+
+
+class ExportAdmin(admin.ModelAdmin):
+    actions = (export_jsonl,)
+
+
+class PostAdmin(ExportAdmin):
 
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
@@ -11,8 +33,16 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу FTS5 вместо LIKE по всей таблице."""
+        if not search.is_supported() or not search.match_expression(
+                search_term):
+            return super().get_search_results(
+                request, queryset, search_term)
+        return queryset.filter(pk__in=search.matching_ids(search_term)), False
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Group, ExportAdmin)
+admin.site.register(Comment, ExportAdmin)
+admin.site.register(Follow, ExportAdmin)
@@ -0,0 +1,173 @@
+"""JSON API только для чтения: посты, ленты групп и авторов, комментарии.
+
+Строки выбираются через values() ровно с теми столбцами, что нужны
+ответу: ?fields=id,text сужает и SELECT, и JSON, а без author или group
+запрос обходится без соединений. Экземпляры моделей не создаются.
+Списки листаются курсорами ?after=/?before= по ключу (момент, id), как
+ленты на сайте (utils.RowKeysetPaginator), и не считают COUNT(*).
+
+Ошибки — JSON вида {"error": "..."} с кодом 400 или 404.
+"""
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db.models.query import QuerySet
+from django.http import Http404, HttpRequest, JsonResponse
+from django.views.decorators.http import require_safe
+
+from .models import Comment, Group, Post, User
+from .utils import RowKeysetPaginator
+
+# Имя поля в ответе -> поле для values()
+POST_FIELDS: Dict[str, str] = {
+    'id': 'pk',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+}
+COMMENT_FIELDS: Dict[str, str] = {
+    'id': 'pk',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+JSON_OPTIONS: Dict[str, Any] = {'ensure_ascii': False}
+
+
+class ApiError(Exception):
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status: int = status
+
+
+def api_view(view: Callable) -> Callable:
+    """GET/HEAD и ошибки в виде JSON."""
+    @require_safe
+    @wraps(view)
+    def wrapper(request: HttpRequest, *args, **kwargs) -> JsonResponse:
+        try:
+            data: Dict[str, Any] = view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({'error': str(error)}, status=error.status,
+                                json_dumps_params=JSON_OPTIONS)
+        except Http404 as error:
+            return JsonResponse({'error': str(error)}, status=404,
+                                json_dumps_params=JSON_OPTIONS)
+        return JsonResponse(data, json_dumps_params=JSON_OPTIONS)
+    return wrapper
+
+
+def projection(request: HttpRequest, available: Dict[str, str]) -> List[str]:
+    """Поля ответа из ?fields=, по умолчанию все."""
+    raw: str = request.GET.get('fields', '')
+    if not raw:
+        return list(available)
+    names: List[str] = [name.strip() for name in raw.split(',')
+                        if name.strip()]
+    unknown: List[str] = [name for name in names if name not in available]
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(unknown)}. '
+                       f'Доступны: {", ".join(available)}.')
+    return names
+
+
+def serializer(names: List[str],
+               available: Dict[str, str]) -> Callable[[Dict], Dict]:
+    """Строка values() -> словарь ответа с полями names."""
+    storage: Any = Post._meta.get_field('image').storage
+
+    def serialize(row: Dict[str, Any]) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            name: row[available[name]] for name in names}
+        if data.get('image'):
+            data['image'] = storage.url(data['image'])
+        elif 'image' in data:
+            data['image'] = None
+        return data
+    return serialize
+
+
+def page_size(request: HttpRequest) -> int:
+    try:
+        size: int = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        raise ApiError('limit должен быть числом.')
+    return max(1, min(size, settings.API_MAX_PAGE_SIZE))
+
+
+def page_link(request: HttpRequest, name: str,
+              cursor: Optional[str]) -> Optional[str]:
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params.pop('after', None)
+    params.pop('before', None)
+    params[name] = cursor
+    return request.build_absolute_uri(f'?{params.urlencode()}')
+
+
+def row_page(request: HttpRequest, queryset: QuerySet,
+             available: Dict[str, str], key: str) -> Dict[str, Any]:
+    """Страница строк queryset с курсорами соседних страниц."""
+    names: List[str] = projection(request, available)
+    columns = {available[name] for name in names} | {'pk', key}
+    paginator = RowKeysetPaginator(
+        queryset.values(*columns), page_size(request), key)
+    page: Any = paginator.get_page(
+        after=request.GET.get('after'), before=request.GET.get('before'))
+    serialize: Callable = serializer(names, available)
+    return {
+        'results': [serialize(row) for row in page],
+        'next': page_link(request, 'after', page.next_cursor()),
+        'previous': page_link(request, 'before', page.previous_cursor()),
+    }
+
+
+def pk_or_404(model: Any, **kwargs: Any) -> int:
+    pk: Optional[int] = model.objects.filter(**kwargs).values_list(
+        'pk', flat=True).first()
+    if pk is None:
+        raise Http404(f'{model._meta.object_name} не найден.')
+    return pk
+
+
+@api_view
+def post_list(request: HttpRequest) -> Dict[str, Any]:
+    return row_page(request, Post.objects.all(), POST_FIELDS, 'pub_date')
+
+
+@api_view
+def group_posts(request: HttpRequest, slug: str) -> Dict[str, Any]:
+    group_id: int = pk_or_404(Group, slug=slug)
+    return row_page(request, Post.objects.filter(group_id=group_id),
+                    POST_FIELDS, 'pub_date')
+
+
+@api_view
+def author_posts(request: HttpRequest, username: str) -> Dict[str, Any]:
+    author_id: int = pk_or_404(User, username=username)
+    return row_page(request, Post.objects.filter(author_id=author_id),
+                    POST_FIELDS, 'pub_date')
+
+
+@api_view
+def post_detail(request: HttpRequest, post_id: int) -> Dict[str, Any]:
+    names: List[str] = projection(request, POST_FIELDS)
+    row: Optional[Dict[str, Any]] = Post.objects.filter(pk=post_id).values(
+        *{POST_FIELDS[name] for name in names}).first()
+    if row is None:
+        raise Http404('Post не найден.')
+    return serializer(names, POST_FIELDS)(row)
+
+
+@api_view
+def post_comments(request: HttpRequest, post_id: int) -> Dict[str, Any]:
+    pk_or_404(Post, pk=post_id)
+    return row_page(request, Comment.objects.filter(post_id=post_id),
+                    COMMENT_FIELDS, 'created')
@@ -0,0 +1,102 @@
+"""Подсчёт ссылок постов на файлы картинок.
+
+Картинки постов лежат в хранилище по содержимому (storage.py): один
+файл может принадлежать многим постам. Сигналы Post увеличивают и
+уменьшают ImageBlob.refcount в той же транзакции, что и запись поста
+(models.AtomicSaveModel).
+Файл без ссылок удаляется вместе с миниатюрами после коммита, и только
+если за это время на него не сослался новый пост. Загрузка тех же байтов
+находит файл раньше, чем пост со ссылкой попадёт в базу, поэтому файл,
+переиспользованный за последние IMAGE_REUSE_GRACE секунд, остаётся на
+месте без строки ImageBlob: её создаст новый пост, а если он так и не
+сохранится, файл уберёт gc_media.
+
+Строки ImageBlob для картинок, загруженных до хранилища по содержимому,
+создаёт команда dedupe_images; пока строки нет, файл не удаляется.
+"""
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import thumbnails
+from .models import ImageBlob, Post
+
+
+def storage():
+    return Post._meta.get_field('image').storage
+
+
+def _size(name: str) -> int:
+    try:
+        return storage().size(name)
+    except (OSError, SuspiciousFileOperation):
+        return 0
+
+
+def acquire(name: Optional[str]) -> None:
+    """Ещё один пост ссылается на файл name."""
+    if not name:
+        return
+    with transaction.atomic():
+        if ImageBlob.objects.filter(name=name).update(
+                refcount=F('refcount') + 1):
+            return
+        try:
+            with transaction.atomic():
+                ImageBlob.objects.create(
+                    name=name, size=_size(name), refcount=1)
+        except IntegrityError:
+            # Строку параллельно создал другой запрос.
+            ImageBlob.objects.filter(name=name).update(
+                refcount=F('refcount') + 1)
+
+
+def release(name: Optional[str]) -> None:
+    """Пост больше не ссылается на файл name."""
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, refcount__gt=0).update(
+        refcount=F('refcount') - 1)
+    transaction.on_commit(lambda: collect(name))
+
+
+def collect(name: str) -> bool:
+    """Удаляет файл и его миниатюры, если на него никто не ссылается."""
+    deleted, _ = ImageBlob.objects.filter(name=name, refcount=0).delete()
+    if not deleted:
+        return False
+    try:
+        if not storage().discard(name, settings.IMAGE_REUSE_GRACE):
+            return False
+    except SuspiciousFileOperation:
+        # Имя вне MEDIA_ROOT: файл хранилищу не принадлежит.
+        pass
+    delete_thumbnails(thumbnails.source(name), delete_file=False)
+    thumbnails.forget(name)
+    return True
+
+
+@transaction.atomic
+def recount() -> int:
+    """Пересчитывает ссылки всех файлов по Post; возвращает число файлов.
+
+    Строки с нулём ссылок остаются: их файлы удаляет collect.
+    """
+    counts: Dict[str, int] = dict(
+        Post.objects.order_by().exclude(image='').values_list(
+            'image').annotate(total=Count('pk')))
+    existing: Dict[str, int] = dict(
+        ImageBlob.objects.values_list('name', 'refcount'))
+    for name, refcount in existing.items():
+        if counts.get(name, 0) != refcount:
+            ImageBlob.objects.filter(name=name).update(
+                refcount=counts.get(name, 0))
+    ImageBlob.objects.bulk_create([
+        ImageBlob(name=name, size=_size(name), refcount=total)
+        for name, total in counts.items() if name not in existing
+    ], batch_size=500)
+    return len(counts)
@@ -0,0 +1,93 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются сигналами (см. signals.py) в той же транзакции, что и
+сама запись: Post, Comment и Follow сохраняются вместе с сигналами
+(models.AtomicSaveModel), удаление Django выполняет так же. Строка
+счётчика создаётся лениво при первом чтении из реального COUNT(*),
+поэтому объекты, созданные до появления счётчика или через
+bulk_create, не портят значения. Накопившийся дрейф чинит
+команда recount.
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F
+
+from .models import Comment, Counter, Follow, Post
+
+# Источник истины для каждого счётчика: модель и поле группировки
+# (None — один общий счётчик с object_id=0).
+SOURCES: Dict[str, Tuple[models.Model, Optional[str]]] = {
+    Counter.AUTHOR_POSTS: (Post, 'author_id'),
+    Counter.GROUP_POSTS: (Post, 'group_id'),
+    Counter.ALL_POSTS: (Post, None),
+    Counter.POST_COMMENTS: (Comment, 'post_id'),
+    Counter.FOLLOWERS: (Follow, 'author_id'),
+    Counter.FOLLOWING: (Follow, 'user_id'),
+}
+
+
+def _count(name: str, object_id: int) -> int:
+    model, field = SOURCES[name]
+    queryset = model.objects.all()
+    if field is not None:
+        queryset = queryset.filter(**{field: object_id})
+    return queryset.count()
+
+
+def change(name: str, object_id: Optional[int], delta: int) -> None:
+    """Сдвигает счётчик на delta, если он уже заведён."""
+    if object_id is None:
+        return
+    Counter.objects.filter(name=name, object_id=object_id).update(
+        value=F('value') + delta)
+
+
+def get(name: str, object_id: int = 0) -> int:
+    """Значение счётчика; при отсутствии строки считает и сохраняет."""
+    value: Optional[int] = Counter.objects.filter(
+        name=name, object_id=object_id).values_list(
+        'value', flat=True).first()
+    if value is not None:
+        return value
+    value = _count(name, object_id)
+    try:
+        with transaction.atomic():
+            Counter.objects.create(
+                name=name, object_id=object_id, value=value)
+    except IntegrityError:
+        # Строку параллельно создал другой запрос.
+        pass
+    return value
+
+
+def get_many(name: str, object_ids: Iterable[int]) -> Dict[int, int]:
+    """Значения счётчика для нескольких объектов одним запросом."""
+    object_ids = set(object_ids)
+    values: Dict[int, int] = dict(Counter.objects.filter(
+        name=name, object_id__in=object_ids).values_list(
+        'object_id', 'value'))
+    for object_id in object_ids - values.keys():
+        values[object_id] = get(name, object_id)
+    return values
+
+
+def delete(name: str, object_id: int) -> None:
+    Counter.objects.filter(name=name, object_id=object_id).delete()
+
+
+@transaction.atomic
+def recount(name: str) -> int:
+    """Пересчитывает все строки счётчика name; возвращает их число."""
+    model, field = SOURCES[name]
+    Counter.objects.filter(name=name).delete()
+    if field is None:
+        rows = [Counter(name=name, object_id=0,
+                        value=model.objects.count())]
+    else:
+        totals = model.objects.order_by().exclude(
+            **{field: None}).values(field).annotate(total=Count('pk'))
+        rows = [Counter(name=name, object_id=row[field], value=row['total'])
+                for row in totals]
+    Counter.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
@@ -0,0 +1,116 @@
+"""Условные GET (ETag) для лент и страницы поста.
+
+ETag считается без запроса ленты и без рендеринга шаблона: из поколений
+лент (feed_cache), от которых зависит страница, id посетителя и его
+CSRF-cookie (форма комментария на странице поста). Совпавший
+If-None-Match стоит одного обращения к кэшу и, для группы, профиля и
+поста, одного запроса по уникальному ключу; ответ — 304. Найденный
+объект запоминается в запросе (lookup), и представление его не ищет
+повторно.
+
+Поколения сдвигают сигналы: post:<id> — правка поста и комментарии,
+follows:<id> — подписки пользователя и на пользователя. Страница с
+заглушкой ещё не готовой миниатюры ETag не получает, иначе клиент так и
+не увидел бы картинку; картинка, из которой миниатюры не создаются,
+заглушкой не считается (posts/thumbnails.py). ETAG_VERSION в
+настройках меняют вместе с шаблонами.
+"""
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from django.conf import settings
+from django.db import models
+from django.http import Http404, HttpRequest
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import feed_cache
+from .models import Group, Post, User
+
+
+def make_etag(request: HttpRequest, *scopes: str) -> str:
+    versions = feed_cache.get_versions(*scopes)
+    raw: str = '|'.join([
+        settings.ETAG_VERSION,
+        request.get_full_path(),
+        str(request.user.pk or 0),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        *map(str, versions),
+    ])
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def lookup(request: HttpRequest, model: Type[models.Model],
+           **kwargs: Any) -> Optional[models.Model]:
+    """Объект по уникальному ключу, один раз за запрос."""
+    found: Dict[Tuple, Optional[models.Model]] = request.__dict__.setdefault(
+        '_etag_objects', {})
+    key: Tuple = (model, tuple(sorted(kwargs.items())))
+    if key not in found:
+        try:
+            found[key] = model.objects.get(**kwargs)
+        except model.DoesNotExist:
+            found[key] = None
+    return found[key]
+
+
+def lookup_or_404(request: HttpRequest, model: Type[models.Model],
+                  **kwargs: Any) -> models.Model:
+    obj: Optional[models.Model] = lookup(request, model, **kwargs)
+    if obj is None:
+        raise Http404(f'{model._meta.object_name} не найден.')
+    return obj
+
+
+def index_etag(request: HttpRequest) -> str:
+    return make_etag(request, feed_cache.INDEX, feed_cache.GROUPS)
+
+
+def group_etag(request: HttpRequest, slug: str) -> Optional[str]:
+    group: Optional[Group] = lookup(request, Group, slug=slug)
+    if group is None:
+        return None
+    return make_etag(request, feed_cache.group_scope(group.pk))
+
+
+def profile_etag(request: HttpRequest, username: str) -> Optional[str]:
+    author: Optional[User] = lookup(request, User, username=username)
+    if author is None:
+        return None
+    return make_etag(
+        request, feed_cache.author_scope(author.pk), feed_cache.GROUPS,
+        feed_cache.follows_scope(author.pk))
+
+
+def post_etag(request: HttpRequest, post_id: int) -> Optional[str]:
+    post: Optional[Post] = lookup(request, Post, pk=post_id)
+    if post is None:
+        return None
+    return make_etag(
+        request, feed_cache.post_scope(post.pk),
+        feed_cache.author_scope(post.author_id), feed_cache.GROUPS)
+
+
+def conditional(etag_func: Callable[..., Optional[str]]) -> Callable:
+    """condition(etag_func) с Cache-Control для ревалидации прокси."""
+    def decorator(view: Callable) -> Callable:
+        conditional_view: Callable = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request: HttpRequest, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if not response.has_header('ETag'):
+                return response
+            if (not response.streaming and feed_cache.PENDING_MARKER
+                    in response.content.decode(response.charset)):
+                del response['ETag']
+                patch_cache_control(response, no_store=True)
+                return response
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,61 @@
+"""Потоковая выгрузка постов, комментариев, подписок и групп в JSONL.
+
+Строка выгрузки — запись в формате dumpdata ({"model", "pk", "fields"}),
+поэтому файл загружается обратно командой import_dump. Строки читаются
+через values().iterator(chunk_size) по первичному ключу и сразу
+пишутся: память не зависит от размера таблиц.
+"""
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+from .models import Comment, Follow, Group, Post, User
+
+# Метка модели -> (модель, поле даты для --since или None)
+EXPORTS: Dict[str, Tuple[Any, Optional[str]]] = {
+    'posts.group': (Group, None),
+    'posts.post': (Post, 'pub_date'),
+    'posts.comment': (Comment, 'created'),
+    'posts.follow': (Follow, None),
+}
+# Пользователи — без пароля и прав, только для ссылок из постов
+USER_FIELDS: Tuple[str, ...] = (
+    'username', 'first_name', 'last_name', 'is_active', 'date_joined')
+CHUNK_SIZE: int = 2000
+
+
+def columns(model: Any) -> List[Tuple[str, str]]:
+    """Пары (имя поля в записи, имя для values()) без первичного ключа."""
+    if model is User:
+        return [(name, name) for name in USER_FIELDS]
+    return [(field.name, field.attname)
+            for field in model._meta.concrete_fields
+            if not field.primary_key]
+
+
+def records(queryset: models.QuerySet, since: Optional[datetime] = None,
+            chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Записи dumpdata для строк queryset по возрастанию id."""
+    model: Any = queryset.model
+    label: str = model._meta.label_lower
+    date_field: Optional[str] = EXPORTS.get(label, (None, None))[1]
+    if since is not None and date_field is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': since})
+    pairs: List[Tuple[str, str]] = columns(model)
+    rows = queryset.order_by('pk').values(
+        'pk', *[attname for _, attname in pairs])
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield {
+            'model': label,
+            'pk': row['pk'],
+            'fields': {name: row[attname] for name, attname in pairs},
+        }
+
+
+def lines(items: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    for item in items:
+        yield json.dumps(
+            item, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
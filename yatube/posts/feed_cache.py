@@ -0,0 +1,151 @@
+"""Кэш фрагментов списков постов.
+
+Кэшируется только разметка самих постов страницы, одинаковая для всех
+посетителей: шапка с именем пользователя и ссылки «Редактировать»
+рендерятся в шаблоне страницы отдельно. Поэтому авторизованные
+посетители попадают в тот же кэш, что и анонимные.
+
+У каждой ленты есть свои поколения (версии): INDEX для главной,
+group:<id> для группы, author:<id> для автора и GROUPS для названий
+групп, которые видны в чужих лентах. Поколения post:<id> и follows:<id>
+фрагментов не имеют и нужны только для ETag страниц (etags.py). Сигналы
+Post и Group увеличивают поколения затронутых лент, а ключ фрагмента
+включает их текущие значения, поэтому фрагменты можно хранить часами:
+после записи старые ключи просто перестают читаться. Это верно, только
+если поколения видят все процессы: с кэшем процесса (LocMemCache) и
+поколения, и фрагменты живут FEED_VERSION_TIMEOUT и недолгие
+POST_*_CACHE_TIMEOUT, иначе записи из run_workers, import_dump или
+соседнего воркера не дойдут до читателей.
+
+Сами карточки постов (posts/includes/post_card.html) кэшируются
+отдельно по id и pub_date поста и общие для всех лент: при промахе по
+странице карточки достаются одним get_many. Сигналы удаляют карточку
+при редактировании поста, переименовании группы или автора. Карточка с
+заглушкой вместо ещё не готовой миниатюры (см. thumbnails.py) не
+кэшируется.
+"""
+import time
+from collections import namedtuple
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page
+from django.template.loader import render_to_string
+
+from . import thumbnails
+from .utils import page_key
+
+INDEX: str = 'index'
+GROUPS: str = 'groups'
+CARD_TEMPLATE: str = 'posts/includes/post_card.html'
+# Метка заглушки миниатюры в разметке карточки
+PENDING_MARKER: str = 'data-thumbnail-pending'
+
+PostFragment = namedtuple('PostFragment', ['pk', 'author_id', 'html'])
+
+
+def group_scope(group_id: int) -> str:
+    return f'group:{group_id}'
+
+
+def author_scope(author_id: int) -> str:
+    return f'author:{author_id}'
+
+
+def post_scope(post_id: int) -> str:
+    return f'post:{post_id}'
+
+
+def follows_scope(user_id: int) -> str:
+    return f'follows:{user_id}'
+
+
+def _version_key(scope: str) -> str:
+    return f'feed_version:{scope}'
+
+
+def get_versions(*scopes: str) -> List[int]:
+    """Текущие поколения лент одним обращением к кэшу."""
+    keys: List[str] = [_version_key(scope) for scope in scopes]
+    found: Dict[str, int] = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Миллисекунды вместо 1: после вытеснения ключа поколение
+            # не совпадёт ни с одним из уже использованных.
+            cache.add(key, _now(), settings.FEED_VERSION_TIMEOUT)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _now() -> int:
+    return int(time.time() * 1000)
+
+
+def bump(*scopes: str) -> None:
+    """Увеличивает поколения лент, делая их фрагменты устаревшими.
+
+    Не incr: в общем файловом кэше он не атомарен и сбрасывает срок
+    жизни ключа на TIMEOUT кэша. Новое поколение не меньше текущих
+    миллисекунд, поэтому два одновременных сброса почти никогда не дают
+    одно и то же значение.
+    """
+    keys: List[str] = [_version_key(scope) for scope in scopes]
+    if not keys:
+        return
+    found: Dict[str, int] = cache.get_many(keys)
+    now: int = _now()
+    cache.set_many({key: max(now, found.get(key, 0) + 1) for key in keys},
+                   settings.FEED_VERSION_TIMEOUT)
+
+
+def card_key(pk: int, pub_date: datetime) -> str:
+    # pub_date в ключе защищает от переиспользования id в SQLite.
+    return f'post_card:{pk}:{pub_date.timestamp()}'
+
+
+def render_cards(posts: Iterable[Any]) -> List[PostFragment]:
+    """Карточки постов из кэша; недостающие рендерятся и сохраняются."""
+    posts = list(posts)
+    keys: List[str] = [card_key(post.pk, post.pub_date) for post in posts]
+    found: Dict[str, str] = cache.get_many(keys)
+    rendered: Dict[str, str] = {}
+    fragments: List[PostFragment] = []
+    # Миниатюры всех недостающих карточек — одним обращением.
+    ready: Dict[str, Any] = thumbnails.resolve(
+        [post.image for post, key in zip(posts, keys) if key not in found],
+        thumbnails.srcset_names('card'))
+    for post, key in zip(posts, keys):
+        html: Optional[str] = found.get(key)
+        if html is None:
+            html = render_to_string(
+                CARD_TEMPLATE, {'post': post, 'thumbnails': ready})
+            if PENDING_MARKER not in html:
+                rendered[key] = html
+        fragments.append(PostFragment(post.pk, post.author_id, html))
+    if rendered:
+        cache.set_many(rendered, settings.POST_CARD_CACHE_TIMEOUT)
+    return fragments
+
+
+def drop_cards(rows: Iterable[Tuple[int, datetime]]) -> None:
+    """Удаляет карточки постов по парам (id, pub_date)."""
+    cache.delete_many([card_key(pk, pub_date) for pk, pub_date in rows])
+
+
+def post_list(page_obj: Page, *scopes: str) -> List[PostFragment]:
+    """Карточки страницы ленты, из кэша или заново.
+
+    Первый из scopes называет саму ленту, остальные — ленты, от
+    изменений которых она тоже зависит.
+    """
+    versions: str = '.'.join(map(str, get_versions(*scopes)))
+    key: str = (f'post_list:{":".join(scopes)}:{page_key(page_obj)}:'
+                f'{versions}')
+    fragments: Optional[List[PostFragment]] = cache.get(key)
+    if fragments is None:
+        fragments = render_cards(page_obj)
+        if not any(PENDING_MARKER in item.html for item in fragments):
+            cache.set(key, fragments, settings.POST_LIST_CACHE_TIMEOUT)
+    return fragments
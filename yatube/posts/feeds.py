@@ -0,0 +1,213 @@
+"""RSS, Atom и JSON Feed: весь сайт, группа и автор.
+
+Ленты собираются из строк values() без экземпляров моделей, а готовый
+документ кэшируется под поколениями тех же лент, что и страницы
+(feed_cache): новый пост, правка, переименование группы или автора
+делают ключ устаревшим. ETag — хэш ключа документа, Last-Modified — время
+его сборки, поэтому повторный опрос агрегатора стоит обращения к кэшу и,
+для группы и автора, одного запроса по уникальному ключу.
+
+Абсолютные ссылки строятся от хоста запроса, он тоже входит в ключ.
+"""
+import hashlib
+import json
+import time
+from collections import namedtuple
+from io import StringIO
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpRequest, HttpResponse
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import (Atom1Feed, Rss201rev2Feed,
+                                        SyndicationFeed)
+from django.utils.html import escape, linebreaks
+from django.utils.http import http_date, quote_etag
+from django.utils.text import Truncator
+
+from . import feed_cache
+from .models import Group, Post, User
+
+# Поля строки ленты
+ITEM_FIELDS: Tuple[str, ...] = (
+    'pk', 'text', 'pub_date', 'image', 'author__username',
+    'author__first_name', 'author__last_name', 'group__title',
+)
+TITLE_WORDS: int = 10
+
+# Объект ленты и запрос, от которого строятся абсолютные ссылки:
+# экземпляр Feed один на все запросы и хранить запрос в нём нельзя.
+Source = namedtuple('Source', ['object', 'request'])
+
+
+class JSONFeed(SyndicationFeed):
+    """JSON Feed 1.1 (https://www.jsonfeed.org/version/1.1/)."""
+
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        data: Dict[str, Any] = {
+            'id': item['unique_id'] or item['link'],
+            'url': item['link'],
+            'title': item['title'],
+            'content_html': item['description'],
+            'date_published': item['pubdate'].isoformat(),
+        }
+        if item['author_name']:
+            data['authors'] = [{'name': item['author_name']}]
+        if item['categories']:
+            data['tags'] = list(item['categories'])
+        return data
+
+    def write(self, outfile, encoding):
+        json.dump({
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': self.feed['title'],
+            'home_page_url': self.feed['link'],
+            'feed_url': self.feed['feed_url'],
+            'description': self.feed['description'],
+            'language': self.feed['language'],
+            'items': [self.item(item) for item in self.items],
+        }, outfile, ensure_ascii=False)
+
+
+FORMATS: Dict[str, type] = {
+    'rss': Rss201rev2Feed,
+    'atom': Atom1Feed,
+    'json': JSONFeed,
+}
+
+
+class PostFeed(Feed):
+    """Последние посты; подклассы сужают выборку и задают поколения."""
+
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def __init__(self, feed_type: type = Rss201rev2Feed) -> None:
+        self.feed_type = feed_type
+
+    def __call__(self, request: HttpRequest, *args, **kwargs):
+        try:
+            obj: Any = self.get_object(request, *args, **kwargs)
+        except ObjectDoesNotExist:
+            raise Http404('Лента не найдена.')
+        scopes: List[str] = self.scopes(obj)
+        versions: str = '.'.join(
+            map(str, feed_cache.get_versions(*scopes)))
+        key: str = (f'syndication:{self.feed_type.__name__}:'
+                    f'{request.scheme}://{request.get_host()}:'
+                    f'{":".join(scopes)}:{versions}')
+        document: Optional[Tuple[str, int]] = cache.get(key)
+        if document is None:
+            output = StringIO()
+            self.get_feed(
+                Source(obj, request), request).write(output, 'utf-8')
+            document = (output.getvalue(), int(time.time()))
+            cache.set(
+                key, document, settings.SYNDICATION_CACHE_TIMEOUT)
+        content, generated = document
+        etag: str = quote_etag(hashlib.md5(key.encode()).hexdigest())
+        response = HttpResponse(
+            content, content_type=self.feed_type.content_type)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(generated)
+        patch_cache_control(
+            response, public=True, max_age=settings.SYNDICATION_MAX_AGE)
+        return get_conditional_response(
+            request, etag=etag, last_modified=generated, response=response)
+
+    def get_object(self, request: HttpRequest, *args, **kwargs) -> Any:
+        return None
+
+    def scopes(self, obj: Any) -> List[str]:
+        # Названия групп видны в категориях записей.
+        return [feed_cache.INDEX, feed_cache.GROUPS]
+
+    def queryset(self, obj: Any):
+        return Post.objects.all()
+
+    def items(self, source: Source) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = list(
+            self.queryset(source.object).order_by('-pub_date', '-pk')
+            .values(*ITEM_FIELDS)[:settings.SYNDICATION_ITEMS])
+        storage = Post._meta.get_field('image').storage
+        for row in rows:
+            row['image_url'] = row['image'] and (
+                source.request.build_absolute_uri(storage.url(row['image'])))
+        return rows
+
+    def link(self, source: Source) -> str:
+        return reverse('posts:index')
+
+    def item_title(self, item: Dict[str, Any]) -> str:
+        return Truncator(item['text']).words(TITLE_WORDS)
+
+    def item_description(self, item: Dict[str, Any]) -> str:
+        html: str = linebreaks(item['text'], autoescape=True)
+        if item['image_url']:
+            html = (f'<p><img src="{escape(item["image_url"])}" alt="">'
+                    f'</p>{html}')
+        return html
+
+    def item_link(self, item: Dict[str, Any]) -> str:
+        return reverse('posts:post_detail', args=(item['pk'],))
+
+    def item_pubdate(self, item: Dict[str, Any]):
+        return item['pub_date']
+
+    def item_author_name(self, item: Dict[str, Any]) -> str:
+        full_name: str = (f'{item["author__first_name"]} '
+                          f'{item["author__last_name"]}').strip()
+        return full_name or item['author__username']
+
+    def item_author_link(self, item: Dict[str, Any]) -> str:
+        return reverse('posts:profile', args=(item['author__username'],))
+
+    def item_categories(self, item: Dict[str, Any]) -> List[str]:
+        return [item['group__title']] if item['group__title'] else []
+
+
+class GroupFeed(PostFeed):
+    def get_object(self, request: HttpRequest, slug: str) -> Group:
+        return Group.objects.get(slug=slug)
+
+    def scopes(self, group: Group) -> List[str]:
+        return [feed_cache.group_scope(group.pk)]
+
+    def queryset(self, group: Group):
+        return Post.objects.filter(group_id=group.pk)
+
+    def title(self, source: Source) -> str:
+        return f'Yatube: {source.object.title}'
+
+    def description(self, source: Source) -> str:
+        return source.object.description
+
+    def link(self, source: Source) -> str:
+        return reverse('posts:group_list', args=(source.object.slug,))
+
+
+class AuthorFeed(PostFeed):
+    def get_object(self, request: HttpRequest, username: str) -> User:
+        return User.objects.get(username=username)
+
+    def scopes(self, author: User) -> List[str]:
+        return [feed_cache.author_scope(author.pk), feed_cache.GROUPS]
+
+    def queryset(self, author: User):
+        return Post.objects.filter(author_id=author.pk)
+
+    def title(self, source: Source) -> str:
+        author: User = source.object
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, source: Source) -> str:
+        return f'Записи автора {source.object.username}'
+
+    def link(self, source: Source) -> str:
+        return reverse('posts:profile', args=(source.object.username,))
@@ -1,6 +1,7 @@
 from django.forms import ModelForm
 
 from .models import Comment, Post
+from .uploads import process_upload
 
 
 class PostForm(ModelForm):
@@ -15,6 +16,9 @@ class PostForm(ModelForm):
         }
         fields = ['text', 'group', 'image']
 
+    def clean_image(self):
+        return process_upload(self.cleaned_data['image'])
+
 
 class CommentForm(ModelForm):
     class Meta:
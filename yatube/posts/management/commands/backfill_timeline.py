@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from posts import timeline
+from posts.models import Follow, PulledAuthor, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Заполняет ленты подписок по существующим записям Follow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить все ленты перед заполнением.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            TimelineEntry.objects.all().delete()
+        follows = Follow.objects.order_by('pk').values_list(
+            'user_id', 'author_id')
+        total = 0
+        for user_id, author_id in follows.iterator():
+            timeline.add_author(user_id, author_id)
+            total += 1
+        # Ленты лёгких авторов теперь заполнены: их посты больше не нужно
+        # выбирать при чтении.
+        timeline.unmark(PulledAuthor.objects.all())
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано подписок: {total}, '
+            f'записей в лентах: {TimelineEntry.objects.count()}'))
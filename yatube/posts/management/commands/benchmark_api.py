@@ -0,0 +1,69 @@
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+from posts.models import Group, Post
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает HTML-страницы лент с JSON API: время ответа и '
+            'байт на пост первой страницы главной, группы и профиля.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом.')
+        parser.add_argument(
+            '--fields', default='',
+            help='Проекция ?fields= для API, например id,text,pub_date.')
+
+    def measure(self, client, url, params, repeat, cold):
+        elapsed = 0.0
+        for _ in range(repeat):
+            if cold:
+                cache.clear()
+            started = default_timer()
+            response = client.get(url, params)
+            elapsed += default_timer() - started
+            if response.status_code != 200:
+                raise CommandError(f'{url}: код {response.status_code}')
+        return elapsed / repeat * 1000, len(response.content)
+
+    def handle(self, *args, **options):
+        post = Post.objects.select_related('author').first()
+        if post is None:
+            raise CommandError('В базе нет постов.')
+        group = Group.objects.annotate(
+            total=Count('posts')).order_by('-total').first()
+        pages = [
+            ('главная', reverse('posts:index'), reverse('posts:api_posts'),
+             Post.objects.all()),
+            ('профиль', reverse('posts:profile', args=(post.author,)),
+             reverse('posts:api_author_posts', args=(post.author,)),
+             Post.objects.filter(author=post.author)),
+        ]
+        if group is not None:
+            pages.append((
+                'группа', reverse('posts:group_list', args=(group.slug,)),
+                reverse('posts:api_group_posts', args=(group.slug,)),
+                Post.objects.filter(group=group)))
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        api_params = {'limit': settings.POSTS_PER_PAGE}
+        if options['fields']:
+            api_params['fields'] = options['fields']
+        for name, html_url, api_url, posts in pages:
+            count = min(posts.count(), settings.POSTS_PER_PAGE) or 1
+            html_ms, html_bytes = self.measure(
+                client, html_url, {}, options['repeat'], options['cold'])
+            api_ms, api_bytes = self.measure(
+                client, api_url, api_params, options['repeat'],
+                options['cold'])
+            self.stdout.write(
+                f'{name}: {count} постов на странице\n'
+                f'  HTML: {html_ms:.2f} мс, {html_bytes // count} Б/пост\n'
+                f'  API:  {api_ms:.2f} мс, {api_bytes // count} Б/пост')
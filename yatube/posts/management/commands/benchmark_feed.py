@@ -0,0 +1,50 @@
+from timeit import default_timer
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from posts.models import Post
+from posts.timeline import get_feed
+from posts.utils import KeysetPaginator
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время первой страницы ленты подписок: '
+            'соединение Follow/Post против гибридной ленты.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', help='Читатель; по умолчанию — с наибольшим '
+                           'числом подписок.')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def measure(self, build, repeat):
+        started = default_timer()
+        for _ in range(repeat):
+            list(build())
+        return (default_timer() - started) / repeat * 1000
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+        else:
+            user = User.objects.annotate(
+                total=Count('follower')).order_by('-total').first()
+        if user is None:
+            raise CommandError('Читатель не найден.')
+        per_page = settings.POSTS_PER_PAGE
+        join_ms = self.measure(
+            lambda: Post.objects.filter(
+                author__following__user=user).select_related(
+                'group', 'author')[:per_page],
+            options['repeat'])
+        hybrid_ms = self.measure(
+            lambda: KeysetPaginator(get_feed(user), per_page).get_page(),
+            options['repeat'])
+        self.stdout.write(
+            f'{user.username}: подписок {user.follower.count()}\n'
+            f'  join Follow/Post: {join_ms:.2f} мс\n'
+            f'  гибридная лента:  {hybrid_ms:.2f} мс')
@@ -0,0 +1,40 @@
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает время первой страницы поиска: LIKE по всей '
+            'таблице против индекса FTS5.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('query', help='Поисковый запрос.')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def measure(self, build, repeat):
+        started = default_timer()
+        for _ in range(repeat):
+            list(build())
+        return (default_timer() - started) / repeat * 1000
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Индекс FTS5 есть только в SQLite.')
+        query = options['query']
+        per_page = settings.POSTS_PER_PAGE
+        like_ms = self.measure(
+            lambda: search.fallback_queryset(query)[:per_page],
+            options['repeat'])
+        fts_ms = self.measure(
+            lambda: search.SearchPaginator(
+                search.SearchResults(query), per_page).get_page(),
+            options['repeat'])
+        found = Post.objects.filter(pk__in=search.matching_ids(query))
+        self.stdout.write(
+            f'«{query}»: найдено {found.count()} '
+            f'из {Post.objects.count()} постов\n'
+            f'  LIKE:  {like_ms:.2f} мс\n'
+            f'  FTS5:  {fts_ms:.2f} мс')
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import shutil
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from posts import blobs, feed_cache, thumbnails
+from posts.models import Post
+from posts.storage import hashed_name, is_hashed
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+
+def content_digest(storage, name):
+    digest = hashlib.sha256()
+    with storage.open(name) as source:
+        for chunk in source.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def thumbnails_size(name):
+    """Суммарный размер миниатюр картинки name в байтах.
+
+    Миниатюры старых имён созданы со стандартным хранилищем, поэтому
+    ищутся через ImageFile(name), а не thumbnails.source.
+    """
+    total = 0
+    keys = default.kvstore._get(
+        ImageFile(name).key, identity='thumbnails') or []
+    for key in keys:
+        thumbnail = default.kvstore._get(key)
+        if thumbnail is None:
+            continue
+        try:
+            total += thumbnail.storage.size(thumbnail.name)
+        except OSError:
+            pass
+    return total
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов в хранилище по содержимому: '
+            'одинаковые файлы сливаются в один, посты переводятся на '
+            'новые имена, старые миниатюры удаляются, ссылки '
+            'ImageBlob пересчитываются. Сообщает освобождённое место.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, ничего не меняя.')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def place(self, storage, name, target):
+        """Кладёт копию name под именем target, не трогая name."""
+        path = storage.path(target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            os.link(storage.path(name), path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # Другая файловая система: копия через временный файл.
+            temporary = f'{path}.{os.getpid()}.tmp'
+            shutil.copyfile(storage.path(name), temporary)
+            os.replace(temporary, path)
+
+    def migrate(self, storage, name, target, duplicate, scopes):
+        """Переводит посты с name на target; scopes — затронутые ленты.
+
+        Старый файл удаляется только после коммита: прерванный запуск
+        оставляет посты на целом файле, и команду можно повторить.
+        """
+        if not duplicate:
+            self.place(storage, name, target)
+        posts = Post.objects.filter(image=name)
+        with transaction.atomic():
+            rows = list(posts.values_list(
+                'pk', 'pub_date', 'author_id', 'group_id'))
+            posts.update(image=target)
+            transaction.on_commit(lambda: self.discard(storage, name))
+        feed_cache.drop_cards((pk, pub_date) for pk, pub_date, _, _ in rows)
+        for _, _, author_id, group_id in rows:
+            scopes.add(feed_cache.author_scope(author_id))
+            if group_id is not None:
+                scopes.add(feed_cache.group_scope(group_id))
+
+    def discard(self, storage, name):
+        storage.delete(name)
+        default.backend.delete(name, delete_file=False)
+        thumbnails.forget(name)
+
+    def handle(self, *args, **options):
+        storage = blobs.storage()
+        dry_run = options['dry_run']
+        names = Post.objects.order_by('image').exclude(
+            image='').values_list('image', flat=True).distinct()
+        targets = set()
+        scopes = set()
+        moved = merged = missing = 0
+        reclaimed = thumbnails_reclaimed = 0
+        last = ''
+        while True:
+            batch = list(names.filter(image__gt=last)[:options['batch_size']])
+            if not batch:
+                break
+            last = batch[-1]
+            for name in batch:
+                if is_hashed(name):
+                    continue
+                if not storage.exists(name):
+                    missing += 1
+                    continue
+                target = hashed_name(name, content_digest(storage, name))
+                duplicate = target in targets or storage.exists(target)
+                targets.add(target)
+                thumbnails_reclaimed += thumbnails_size(name)
+                if duplicate:
+                    merged += 1
+                    reclaimed += storage.size(name)
+                else:
+                    moved += 1
+                if not dry_run:
+                    self.migrate(storage, name, target, duplicate, scopes)
+        if not dry_run:
+            feed_cache.bump(feed_cache.INDEX, *scopes)
+            files = blobs.recount()
+            self.stdout.write(f'Файлов с учётом ссылок: {files}.')
+        prefix = 'Будет освобождено' if dry_run else 'Освобождено'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}: {reclaimed / 2 ** 20:.1f} МБ оригиналов '
+            f'({merged} дублей слито, {moved} файлов переименовано, '
+            f'{missing} отсутствует) и {thumbnails_reclaimed / 2 ** 20:.1f} '
+            f'МБ миниатюр старых имён.'))
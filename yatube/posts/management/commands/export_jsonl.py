@@ -0,0 +1,89 @@
+import gzip
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from posts import export
+from posts.models import User
+
+
+def parse_since(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'--since: ожидается дата ISO, а не {value!r}')
+        moment = datetime(day.year, day.month, day.day)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+class Command(BaseCommand):
+    help = ('Выгружает группы, посты, комментарии и подписки в JSONL '
+            '(записи dumpdata, загружаются import_dump) потоком, без '
+            'чтения таблиц в память. --since ограничивает посты и '
+            'комментарии по pub_date/created; группы и подписки дат не '
+            'имеют и выгружаются целиком.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл; окончание .gz включает сжатие. По умолчанию stdout.')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--since',
+            help='Дата или момент ISO 8601, например 2022-09-01.')
+        parser.add_argument(
+            '--models', nargs='+', choices=list(export.EXPORTS),
+            default=list(export.EXPORTS))
+        parser.add_argument(
+            '--with-users', action='store_true',
+            help='Добавить пользователей (без паролей) для загрузки '
+                 'в пустую базу.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=export.CHUNK_SIZE)
+
+    def open_output(self, options):
+        path = options['output']
+        compress = options['gzip'] or path.endswith('.gz')
+        if path == '-':
+            if compress:
+                raise CommandError('Сжатие — только в файл (--output).')
+            return None
+        if compress:
+            return gzip.open(path, 'wt', encoding='utf-8')
+        return open(path, 'w', encoding='utf-8')
+
+    def handle(self, *args, **options):
+        querysets = []
+        if options['with_users']:
+            querysets.append(User.objects.all())
+        querysets += [export.EXPORTS[label][0].objects.all()
+                      for label in options['models']]
+        since = options['since'] and parse_since(options['since'])
+        output = self.open_output(options)
+        # Отчёт не смешивается с выгрузкой в stdout.
+        report = self.stderr if output is None else self.stdout
+        started = time.monotonic()
+        total = 0
+        try:
+            for queryset in querysets:
+                count = 0
+                for line in export.lines(export.records(
+                        queryset, since, options['chunk_size'])):
+                    if output is None:
+                        self.stdout.write(line, ending='')
+                    else:
+                        output.write(line)
+                    count += 1
+                report.write(f'{queryset.model._meta.label_lower}: {count}')
+                total += count
+        finally:
+            if output is not None:
+                output.close()
+        elapsed = time.monotonic() - started
+        report.write(self.style.SUCCESS(
+            f'Выгружено {total} записей за {elapsed:.1f} с.'))
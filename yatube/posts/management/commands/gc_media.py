@@ -0,0 +1,204 @@
+import fnmatch
+import os
+import time
+from itertools import islice
+from typing import Iterator, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from posts import blobs, thumbnails
+from posts.models import ImageBlob, Post
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+# Каталоги в корне MEDIA_ROOT, оставшиеся от старых прогонов тестов
+STRAY_PATTERN = 'tmp*'
+
+
+def walk_from(root: str, top: List[str], start: str) -> Iterator[str]:
+    """Относительные пути файлов в каталогах top по порядку после start.
+
+    Порядок — покомпонентный, поэтому подкаталоги целиком до start
+    пропускаются без чтения: повторный запуск не обходит дерево заново.
+    """
+    start_parts: Tuple[str, ...] = tuple(start.split('/')) if start else ()
+
+    def walk(parts: Tuple[str, ...]) -> Iterator[str]:
+        try:
+            entries = sorted(os.scandir(os.path.join(root, *parts)),
+                             key=lambda entry: entry.name)
+        except OSError:
+            return
+        for entry in entries:
+            child: Tuple[str, ...] = parts + (entry.name,)
+            if entry.is_dir(follow_symlinks=False):
+                if (child < start_parts
+                        and start_parts[:len(child)] != child):
+                    continue
+                yield from walk(child)
+            elif child > start_parts:
+                yield '/'.join(child)
+
+    for name in sorted(top):
+        if start_parts and (name,) < start_parts[:1]:
+            continue
+        yield from walk((name,))
+
+
+class Command(BaseCommand):
+    help = ('Удаляет из MEDIA_ROOT картинки, на которые не ссылается ни '
+            'один пост, миниатюры без записи в хранилище ключей sorl и '
+            'каталоги tmp* от старых прогонов тестов. Работает пачками '
+            'и сохраняет позицию: каждый запуск продолжает обход с места '
+            'остановки и проверяет не больше --limit файлов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать сирот, ничего не удаляя.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--limit', type=int, default=5000,
+            help='Сколько файлов проверить за запуск.')
+        parser.add_argument(
+            '--min-age', type=int, default=3600,
+            help='Не трогать файлы моложе стольких секунд: загрузка или '
+                 'миниатюра может быть ещё не записана в базу.')
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.MEDIA_ROOT, '.gc_media'),
+            help='Файл с последним проверенным путём.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать обход сначала.')
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint:
+                return checkpoint.read().strip()
+        except OSError:
+            return ''
+
+    def write_checkpoint(self, path, position):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w') as checkpoint:
+            checkpoint.write(position)
+        os.replace(path + '.tmp', path)
+
+    def top_directories(self, root):
+        upload_dir = Post._meta.get_field('image').upload_to.strip('/')
+        thumbnail_dir = thumbnail_settings.THUMBNAIL_PREFIX.strip('/')
+        try:
+            names = os.listdir(root)
+        except OSError:
+            return [], upload_dir, thumbnail_dir
+        top = [name for name in names
+               if os.path.isdir(os.path.join(root, name))
+               and (name in (upload_dir, thumbnail_dir)
+                    or fnmatch.fnmatch(name, STRAY_PATTERN))]
+        return top, upload_dir, thumbnail_dir
+
+    def orphans(self, paths, upload_dir, thumbnail_dir):
+        """Пути из paths, на которые ничто не ссылается."""
+        images = [path for path in paths
+                  if path.startswith(upload_dir + '/')]
+        referenced = set(Post.objects.filter(
+            image__in=images).values_list('image', flat=True))
+        referenced |= set(ImageBlob.objects.filter(
+            name__in=images, refcount__gt=0).values_list('name', flat=True))
+        # Ключ миниатюры в KVStore выводится из её имени и хранилища.
+        thumbnail_keys = {
+            add_prefix(ImageFile(path, default.storage).key): path
+            for path in paths if path.startswith(thumbnail_dir + '/')
+        }
+        referenced |= {
+            thumbnail_keys[key] for key in KVStore.objects.filter(
+                key__in=thumbnail_keys).values_list('key', flat=True)
+        }
+        return [path for path in paths if path not in referenced]
+
+    def remove(self, root, path, upload_dir):
+        if path.startswith(upload_dir + '/'):
+            if ImageBlob.objects.filter(name=path).exists():
+                # Файлом со строкой ведает подсчёт ссылок: между поиском
+                # сирот и удалением на него мог сослаться новый пост.
+                blobs.collect(path)
+                return
+            if not blobs.storage().discard(
+                    path, settings.IMAGE_REUSE_GRACE):
+                return
+            # Миниатюры под новым и под прежним (стандартным) хранилищем.
+            default.backend.delete(thumbnails.source(path), delete_file=False)
+            default.backend.delete(path, delete_file=False)
+            thumbnails.forget(path)
+        full_path = os.path.join(root, path)
+        if os.path.exists(full_path):
+            os.remove(full_path)
+        # Опустевшие каталоги вплоть до корневого каталога пути.
+        directory = os.path.dirname(full_path)
+        top = os.path.join(root, path.split('/')[0])
+        while directory != top and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+        if (fnmatch.fnmatch(os.path.basename(top), STRAY_PATTERN)
+                and not os.listdir(top)):
+            os.rmdir(top)
+
+    def old_files(self, root, names, deadline):
+        """Размеры файлов из names, изменённых не позже deadline."""
+        sizes = {}
+        for name in names:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue
+            if stat.st_mtime <= deadline:
+                sizes[name] = stat.st_size
+        return sizes
+
+    def handle(self, *args, **options):
+        root = settings.MEDIA_ROOT
+        path = options['checkpoint']
+        dry_run = options['dry_run']
+        start = '' if options['restart'] else self.read_checkpoint(path)
+        top, upload_dir, thumbnail_dir = self.top_directories(root)
+        if start:
+            self.stdout.write(f'Продолжение после {start}.')
+        deadline = time.time() - options['min_age']
+        files = walk_from(root, top, start)
+        examined = removed = freed = 0
+        position = start
+        finished = False
+        while examined < options['limit']:
+            batch = list(islice(files, min(
+                options['batch_size'], options['limit'] - examined)))
+            if not batch:
+                finished = True
+                break
+            examined += len(batch)
+            position = batch[-1]
+            sizes = self.old_files(root, batch, deadline)
+            orphans = self.orphans(list(sizes), upload_dir, thumbnail_dir)
+            for name in orphans:
+                if dry_run:
+                    self.stdout.write(f'  {name}')
+                else:
+                    self.remove(root, name, upload_dir)
+                removed += 1
+                freed += sizes[name]
+            if not dry_run:
+                self.write_checkpoint(path, position)
+            self.stdout.write(
+                f'{examined}: до {position}, сирот {removed}, '
+                f'{freed / 2 ** 20:.1f} МБ')
+        if finished and not dry_run:
+            self.write_checkpoint(path, '')
+        action = 'Найдено' if dry_run else 'Удалено'
+        tail = ('обход завершён, следующий начнётся сначала' if finished
+                else f'следующий запуск продолжит после {position}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {removed} из {examined} файлов '
+            f'({freed / 2 ** 20:.1f} МБ); {tail}.'))
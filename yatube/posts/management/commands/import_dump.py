@@ -0,0 +1,287 @@
+import codecs
+import gzip
+import json
+import time
+from contextlib import contextmanager
+from itertools import chain, islice
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, models, transaction
+from posts import blobs, counters, feed_cache, search
+from posts.models import Comment, Follow, Group, Post, User
+
+# Модели, которые переносятся; остальные записи дампа пропускаются
+MODELS: Dict[str, Any] = {
+    'auth.user': User,
+    'posts.group': Group,
+    'posts.post': Post,
+    'posts.comment': Comment,
+    'posts.follow': Follow,
+}
+BOMS: Tuple[Tuple[bytes, str], ...] = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+CHUNK_SIZE: int = 1 << 16
+SEPARATORS: str = ' \t\r\n,'
+
+
+def open_binary(path: str):
+    with open(path, 'rb') as raw:
+        gzipped: bool = raw.read(2) == b'\x1f\x8b'
+    return gzip.open(path, 'rb') if gzipped else open(path, 'rb')
+
+
+def detect_encoding(head: bytes) -> Tuple[str, int]:
+    """Кодировка по BOM или по нулевым байтам в начале JSON; длина BOM."""
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    # Первый символ JSON — ASCII, нули рядом с ним выдают UTF-16.
+    if len(head) >= 2 and head[0] and not head[1]:
+        return 'utf-16-le', 0
+    if len(head) >= 2 and not head[0] and head[1]:
+        return 'utf-16-be', 0
+    return 'utf-8', 0
+
+
+def read_text(path: str) -> Iterator[str]:
+    """Текст файла кусками в обнаруженной кодировке."""
+    with open_binary(path) as binary:
+        head: bytes = binary.read(4)
+        encoding, skip = detect_encoding(head)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        text: str = decoder.decode(head[skip:])
+        if text:
+            yield text
+        for chunk in iter(lambda: binary.read(CHUNK_SIZE), b''):
+            yield decoder.decode(chunk)
+        yield decoder.decode(b'', final=True)
+
+
+def open_array(chunks: Iterator[str]) -> Iterator[str]:
+    """Куски текста после открывающей скобки массива."""
+    for chunk in chunks:
+        stripped: str = chunk.lstrip()
+        if not stripped:
+            continue
+        if stripped[0] != '[':
+            raise CommandError('Ожидался массив JSON.')
+        yield stripped[1:]
+        yield from chunks
+        return
+
+
+def iter_array(chunks: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """Объекты JSON-массива верхнего уровня по одному, без чтения целиком.
+
+    В памяти держится необработанный хвост текста: не больше одного
+    объекта и одного куска файла.
+    """
+    chunks = open_array(chunks)
+    decoder = json.JSONDecoder()
+    buffer: str = ''
+    position: int = 0
+    while True:
+        while position < len(buffer) and buffer[position] in SEPARATORS:
+            position += 1
+        if position < len(buffer) and buffer[position] == ']':
+            return
+        try:
+            item, position = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # Объект ещё не дочитан: добавляем следующий кусок.
+            chunk: Optional[str] = next(chunks, None)
+            if chunk is None:
+                raise CommandError(
+                    f'Файл обрывается или испорчен: '
+                    f'{buffer[position:position + 80]!r}')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        yield item
+
+
+def iter_lines(chunks: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """Объекты JSONL: по одному на строку."""
+    tail: str = ''
+    for chunk in chunks:
+        lines: List[str] = (tail + chunk).split('\n')
+        tail = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    if tail.strip():
+        yield json.loads(tail)
+
+
+@contextmanager
+def raw_timestamps(model: Any) -> Iterator[None]:
+    """auto_now_add не перезаписывает даты из дампа при bulk_create."""
+    fields: List[Any] = [field for field in model._meta.concrete_fields
+                         if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def build(model: Any, record: Dict[str, Any]) -> models.Model:
+    """Объект модели из записи дампа; связи — по id, без запросов."""
+    values: Dict[str, Any] = record.get('fields', {})
+    kwargs: Dict[str, Any] = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        if field.name not in values:
+            continue
+        value: Any = values[field.name]
+        if field.is_relation:
+            kwargs[field.attname] = value
+        else:
+            kwargs[field.attname] = field.to_python(value)
+    return model(pk=record['pk'], **kwargs)
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает дамп dumpdata (JSON-массив или JSONL, в '
+            'том числе .gz и UTF-16) в пользователей, группы, посты, '
+            'комментарии и подписки через bulk_create. Память не растёт '
+            'с размером файла; затем пересчитывает производные данные.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=('auto', 'json', 'jsonl'), default='auto',
+            help='По умолчанию — по первому символу файла.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--transaction-size', type=int, default=20000,
+            help='Записей в одной транзакции.')
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать записи с уже существующим id.')
+        parser.add_argument(
+            '--defer-indexes', action='store_true',
+            help='Удалить индексы лент на время загрузки и создать '
+                 'заново после неё.')
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики, ссылки на картинки, поиск '
+                 'и ленты подписок.')
+
+    def records(self, path, file_format):
+        chunks = read_text(path)
+        if file_format == 'auto':
+            head = ''
+            for chunk in chunks:
+                head += chunk
+                if head.strip():
+                    break
+            file_format = 'json' if head.lstrip()[:1] == '[' else 'jsonl'
+            chunks = chain([head], chunks)
+        if file_format == 'json':
+            return iter_array(chunks)
+        return iter_lines(chunks)
+
+    def insert(self, chunk, options, touched, stats):
+        """Одна транзакция: записи chunk пачками по моделям."""
+        by_model: Dict[Any, List[models.Model]] = {}
+        for record in chunk:
+            model = MODELS.get(record.get('model'))
+            if model is None:
+                stats['skipped'] += 1
+                continue
+            obj = build(model, record)
+            by_model.setdefault(model, []).append(obj)
+            if model is Post:
+                touched.add(feed_cache.author_scope(obj.author_id))
+                if obj.group_id is not None:
+                    touched.add(feed_cache.group_scope(obj.group_id))
+        with transaction.atomic():
+            for model, objs in by_model.items():
+                with raw_timestamps(model):
+                    model.objects.bulk_create(
+                        objs, batch_size=options['batch_size'],
+                        ignore_conflicts=options['ignore_conflicts'])
+                stats[model._meta.label_lower] = (
+                    stats.get(model._meta.label_lower, 0) + len(objs))
+
+    @contextmanager
+    def deferred_indexes(self, enabled):
+        """Индексы лент удаляются на время загрузки и создаются заново."""
+        deferred = [(model, index) for model in (Post, Comment)
+                    for index in model._meta.indexes] if enabled else []
+        if deferred:
+            with connection.schema_editor() as editor:
+                for model, index in deferred:
+                    editor.remove_index(model, index)
+        try:
+            yield
+        finally:
+            if deferred:
+                with connection.schema_editor() as editor:
+                    for model, index in deferred:
+                        editor.add_index(model, index)
+
+    def load(self, records, options, touched, stats):
+        total = 0
+        started = time.monotonic()
+        # Связи проверяются один раз в конце: комментарии в дампе
+        # могут идти раньше своих постов.
+        with connection.constraint_checks_disabled():
+            while True:
+                chunk = list(islice(records, options['transaction_size']))
+                if not chunk:
+                    break
+                self.insert(chunk, options, touched, stats)
+                total += len(chunk)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{total} записей, {total / elapsed:.0f} в секунду')
+        connection.check_constraints(table_names=[
+            model._meta.db_table for model in MODELS.values()])
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), list(MODELS.values())):
+                cursor.execute(sql)
+        return total
+
+    def rebuild(self):
+        """bulk_create не вызывает сигналы: производные данные заново."""
+        for name in counters.SOURCES:
+            counters.recount(name)
+        blobs.recount()
+        if search.is_supported():
+            search.rebuild()
+        call_command('backfill_timeline', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Счётчики, ссылки на картинки, поиск и ленты пересчитаны.'))
+
+    def handle(self, *args, **options):
+        records = self.records(options['path'], options['format'])
+        touched: Set[str] = set()
+        stats: Dict[str, int] = {'skipped': 0}
+        started = time.monotonic()
+        try:
+            with self.deferred_indexes(options['defer_indexes']):
+                total = self.load(records, options, touched, stats)
+        except (DatabaseError, ValueError, KeyError) as error:
+            raise CommandError(f'Загрузка прервана: {error!r}')
+        elapsed = time.monotonic() - started
+        for label, count in stats.items():
+            self.stdout.write(f'  {label}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} записей за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-6):.0f} в секунду).'))
+        feed_cache.bump(feed_cache.INDEX, feed_cache.GROUPS, *touched)
+        if not options['skip_rebuild']:
+            self.rebuild()
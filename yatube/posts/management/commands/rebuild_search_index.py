@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает полнотекстовый индекс постов (FTS5) по '
+            'текущему содержимому posts_post.')
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Индекс FTS5 есть только в SQLite.')
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс перестроен: постов {Post.objects.count()}.'))
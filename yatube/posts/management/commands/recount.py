@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики по реальным данным.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Счётчики для пересчёта; по умолчанию — все.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(counters.SOURCES)
+        if unknown:
+            raise CommandError(
+                f'Неизвестные счётчики: {", ".join(sorted(unknown))}')
+        for name in options['names'] or counters.SOURCES:
+            rows = counters.recount(name)
+            self.stdout.write(f'{name}: {rows}')
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
@@ -0,0 +1,140 @@
+import os
+from multiprocessing import Pool
+from timeit import default_timer
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+from posts import feed_cache, thumbnails
+from posts.models import Post
+
+
+def generate(task):
+    """Задача процесса пула: (имя картинки, были ли нужны миниатюры,
+    удалось ли, описание).
+
+    Описание (размеры и LQIP, см. thumbnails.describe) считается только
+    для постов, у которых его ещё нет.
+    """
+    image_name, need_thumbnails, need_description = task
+    ok, description = True, None
+    try:
+        if need_description:
+            with default_storage.open(image_name) as image:
+                description = thumbnails.describe(image)
+        if need_thumbnails:
+            ok = thumbnails.generate(image_name)
+    except Exception:
+        ok = False
+    return image_name, need_thumbnails, ok, description
+
+
+class Command(BaseCommand):
+    help = ('Создаёт миниатюры всех картинок постов во всех размерах '
+            'THUMBNAIL_GEOMETRIES пулом процессов и заполняет размеры и '
+            'LQIP постов, где их нет. Готовые миниатюры '
+            'пропускаются; прогресс сохраняется после каждой пачки, '
+            'поэтому прерванный прогон продолжается с места остановки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Число процессов; 0 — без пула, в текущем процессе.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--checkpoint',
+            default=os.path.join(settings.MEDIA_ROOT, '.warm_thumbnails'),
+            help='Файл с id последнего обработанного поста.')
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать сначала, не читая файл прогресса.')
+
+    def read_checkpoint(self, path):
+        try:
+            with open(path) as checkpoint:
+                return int(checkpoint.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def write_checkpoint(self, path, last_pk):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path + '.tmp', 'w') as checkpoint:
+            checkpoint.write(str(last_pk))
+        os.replace(path + '.tmp', path)
+
+    def describe(self, name, description, scopes):
+        """Записывает размеры и LQIP постам с картинкой name.
+
+        update() не вызывает сигналы, поэтому карточки постов удаляются
+        здесь, а ленты из scopes сбрасывает вызывающий код.
+        """
+        width, height, placeholder = description
+        posts = Post.objects.filter(image=name)
+        rows = list(posts.values_list(
+            'pk', 'pub_date', 'author_id', 'group_id'))
+        posts.update(image_width=width, image_height=height,
+                     image_placeholder=placeholder)
+        feed_cache.drop_cards((pk, pub_date) for pk, pub_date, _, _ in rows)
+        for pk, _, author_id, group_id in rows:
+            scopes.add(feed_cache.post_scope(pk))
+            scopes.add(feed_cache.author_scope(author_id))
+            if group_id is not None:
+                scopes.add(feed_cache.group_scope(group_id))
+
+    def handle(self, *args, **options):
+        path = options['checkpoint']
+        last_pk = 0 if options['restart'] else self.read_checkpoint(path)
+        posts = Post.objects.exclude(image='').filter(
+            pk__gt=last_pk).order_by('pk').values_list(
+            'pk', 'image', 'image_width')
+        total = posts.count()
+        if last_pk:
+            self.stdout.write(f'Продолжение после поста {last_pk}.')
+        # Дочерние процессы не должны наследовать открытые соединения.
+        connections.close_all()
+        pool = Pool(options['workers']) if options['workers'] else None
+        done = generated = skipped = failed = 0
+        started = default_timer()
+        try:
+            while True:
+                batch = list(posts.filter(
+                    pk__gt=last_pk)[:options['batch_size']])
+                if not batch:
+                    break
+                tasks = [
+                    (name, bool(thumbnails.missing(name)), width is None)
+                    for _, name, width in batch]
+                tasks = [task for task in tasks if task[1] or task[2]]
+                skipped += len(batch) - sum(task[1] for task in tasks)
+                results = (pool.imap_unordered(generate, tasks)
+                           if pool else map(generate, tasks))
+                scopes = set()
+                for name, need_thumbnails, ok, description in results:
+                    if description is not None:
+                        self.describe(name, description, scopes)
+                    if not need_thumbnails:
+                        continue
+                    if ok:
+                        generated += 1
+                    else:
+                        failed += 1
+                if scopes:
+                    feed_cache.bump(feed_cache.INDEX, *scopes)
+                done += len(batch)
+                last_pk = batch[-1][0]
+                self.write_checkpoint(path, last_pk)
+                elapsed = default_timer() - started
+                rate = done / elapsed if elapsed else 0
+                eta = (total - done) / rate if rate else 0
+                self.stdout.write(
+                    f'{done}/{total}: создано {generated}, '
+                    f'пропущено {skipped}, ошибок {failed}; '
+                    f'{rate:.1f} карт./с, осталось ~{eta:.0f} с')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: создано {generated}, пропущено {skipped}, '
+            f'ошибок {failed} за {default_timer() - started:.1f} с.'))
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('author_posts', 'Посты автора'), ('group_posts', 'Посты группы'), ('all_posts', 'Все посты'), ('post_comments', 'Комментарии поста'), ('followers', 'Подписчики автора'), ('following', 'Подписки пользователя')], max_length=32, verbose_name='Счётчик')),
+                ('object_id', models.PositiveIntegerField(verbose_name='ID объекта')),
+                ('value', models.IntegerField(default=0, verbose_name='Значение')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='counter',
+            constraint=models.UniqueConstraint(fields=('name', 'object_id'), name='unique_counter'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+# Индекс FTS5 поддерживается сигналами Post, а не триггерами: SQLite
+# схема Django пересоздаёт posts_post при изменении полей, и триггеры
+# при этом теряются.
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_post_fts USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')"
+)
+REBUILD_SQL = "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')"
+DROP_SQL = 'DROP TABLE IF EXISTS posts_post_fts'
+
+
+def create_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(REBUILD_SQL)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
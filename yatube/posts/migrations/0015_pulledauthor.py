@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def mark_heavy_authors(apps, schema_editor):
+    """Посты уже тяжёлых авторов не разложены: их читают при запросе."""
+    Follow = apps.get_model('posts', 'Follow')
+    PulledAuthor = apps.get_model('posts', 'PulledAuthor')
+    heavy = Follow.objects.order_by().values('author_id').annotate(
+        total=Count('id')).filter(
+        total__gte=settings.FEED_HEAVY_AUTHOR_FOLLOWERS)
+    PulledAuthor.objects.bulk_create(
+        [PulledAuthor(author_id=row['author_id']) for row in heavy],
+        ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0014_comment_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PulledAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('since', models.DateTimeField(auto_now_add=True, verbose_name='С')),
+            ],
+            options={
+                'verbose_name': 'Автор без раскладки по лентам',
+                'verbose_name_plural': 'Авторы без раскладки по лентам',
+            },
+        ),
+        migrations.RunPython(mark_heavy_authors, migrations.RunPython.noop),
+    ]
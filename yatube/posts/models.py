@@ -2,12 +2,31 @@ from typing import Type
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.base_user import AbstractBaseUser
-from django.db import models
+from django.db import models, transaction
+
+from .storage import ContentAddressedStorage
 
 User: Type[AbstractBaseUser] = get_user_model()
 
 
-class Post(models.Model):
+class AtomicSaveModel(models.Model):
+    """Модель, сигналы сохранения которой выполняются в транзакции записи.
+
+    Django отправляет post_save после записи строки, а без транзакции
+    вокруг запроса — уже после её коммита. Счётчики (counters.py) и
+    ссылки на картинки (blobs.py) должны меняться вместе со строкой.
+    Удаление Django и так выполняет в транзакции вместе с post_delete.
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class Post(AtomicSaveModel):
     """Модель для хранения поста."""
 
     text = models.TextField(
@@ -27,12 +46,33 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост'
     )
-    # Поле для картинки (необязательное)
+    # Поле для картинки (необязательное); одинаковые картинки хранятся
+    # одним файлом с именем по содержимому
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Размеры оригинала и LQIP-заглушка (data: URI) считаются при
+    # загрузке картинки, чтобы не открывать файл при выводе ленты
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        blank=True,
+        editable=False
+    )
+    image_placeholder = models.TextField(
+        'Заглушка картинки',
+        blank=True,
+        editable=False
+    )
 
     def __str__(self) -> str:
         """Метод для отображения информации
@@ -43,6 +83,23 @@ class Post(models.Model):
         """Контейнер класса(модели) с некоторыми данными."""
         ordering = ('-pub_date',)
         default_related_name = 'posts'
+        # Ленты главной, группы и профиля в порядке курсорной пагинации
+        # (-pub_date, -id); id в конце индекса позволяет обходить его
+        # в обе стороны без сортировки
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx',
+            ),
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx',
+            ),
+        ]
 
 
 class Group(models.Model):
@@ -58,7 +115,7 @@ class Group(models.Model):
         return self.title
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveModel):
     """Модель комментарии."""
 
     post = models.ForeignKey(
@@ -81,9 +138,16 @@ class Comment(models.Model):
         """Контейнер класса(модели) с некоторыми данными."""
         ordering = ('-created',)
         default_related_name = 'comments'
+        # Комментарии на странице поста и курсоры API (-created, -id)
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx',
+            ),
+        ]
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     """Модель подписки."""
 
     author = models.ForeignKey(
@@ -103,3 +167,101 @@ class Follow(models.Model):
                 fields=["user", "author"], name="unique_follow"
             )
         ]
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост в ленте читателя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Читатель',
+        related_name='timeline',)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        verbose_name='Пост',
+        related_name='timeline_entries',)
+    # Копия Post.pub_date: лента читается одним проходом по индексу
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx',
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'], name='unique_timeline_entry'
+            )
+        ]
+
+
+class PulledAuthor(models.Model):
+    """Автор, чьи посты лента подписок выбирает при чтении (timeline.py).
+
+    Строка появляется, как только пост автора не разложен по лентам, и
+    удаляется только после того, как ленты подписчиков дозаполнены.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Автор',
+        related_name='+',)
+    since = models.DateTimeField('С', auto_now_add=True)
+
+    def __str__(self) -> str:
+        return str(self.author_id)
+
+    class Meta:
+        verbose_name = 'Автор без раскладки по лентам'
+        verbose_name_plural = 'Авторы без раскладки по лентам'
+
+
+class Counter(models.Model):
+    """Денормализованный счётчик вместо COUNT(*) по таблицам."""
+
+    AUTHOR_POSTS = 'author_posts'
+    GROUP_POSTS = 'group_posts'
+    ALL_POSTS = 'all_posts'
+    POST_COMMENTS = 'post_comments'
+    FOLLOWERS = 'followers'
+    FOLLOWING = 'following'
+    NAMES = (
+        (AUTHOR_POSTS, 'Посты автора'),
+        (GROUP_POSTS, 'Посты группы'),
+        (ALL_POSTS, 'Все посты'),
+        (POST_COMMENTS, 'Комментарии поста'),
+        (FOLLOWERS, 'Подписчики автора'),
+        (FOLLOWING, 'Подписки пользователя'),
+    )
+
+    name = models.CharField('Счётчик', max_length=32, choices=NAMES)
+    object_id = models.PositiveIntegerField('ID объекта')
+    value = models.IntegerField('Значение', default=0)
+
+    def __str__(self) -> str:
+        return f'{self.name}:{self.object_id}={self.value}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'object_id'], name='unique_counter'
+            )
+        ]
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище по содержимому и число постов с ним."""
+
+    name = models.CharField('Файл', max_length=255, unique=True)
+    size = models.PositiveIntegerField('Размер, байт', default=0)
+    refcount = models.PositiveIntegerField('Ссылок', default=0)
+
+    def __str__(self) -> str:
+        return f'{self.name} x{self.refcount}'
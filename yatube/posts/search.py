@@ -0,0 +1,145 @@
+"""Полнотекстовый поиск постов по индексу SQLite FTS5.
+
+Таблица posts_post_fts (миграция 0011) хранит только индекс по
+Post.text, сами тексты читаются из posts_post (external content).
+Индекс обновляется сигналами Post (см. signals.py); записи в обход
+сигналов (bulk_create, update) чинит команда rebuild_search_index.
+
+Результаты упорядочены по bm25 и листаются курсором (rank, id). На
+других СУБД поиск сводится к icontains с обычной курсорной пагинацией.
+"""
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.db.models.query import QuerySet
+
+from .models import Post
+from .utils import KeysetPaginator
+
+FTS_TABLE: str = 'posts_post_fts'
+
+SearchCursor = Tuple[float, int]
+
+
+def is_supported() -> bool:
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query: str) -> str:
+    """Запрос пользователя в синтаксисе FTS5: все слова, по префиксу.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 и спецсимволы
+    из запроса не интерпретируются.
+    """
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def index_post(pk: int, text: str) -> None:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+            [pk, text])
+
+
+def unindex_post(pk: int, text: str) -> None:
+    # Для external content FTS5 нужен прежний текст: по нему
+    # удаляются записи из индекса.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) '
+            f"VALUES ('delete', %s, %s)", [pk, text])
+
+
+def rebuild() -> None:
+    """Перестраивает индекс целиком по текущему содержимому posts_post."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+
+
+def matching_ids(query: str) -> RawSQL:
+    """Подзапрос id подходящих постов для фильтра pk__in."""
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+        [match_expression(query)])
+
+
+def ranked_ids(query: str, cursor: Optional[SearchCursor], reverse: bool,
+               limit: int) -> List[Tuple[int, float]]:
+    """До limit пар (id, rank) после курсора, от лучших к худшим."""
+    sql: str = (f'SELECT rowid, rank FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s')
+    params: List[Any] = [match_expression(query)]
+    if cursor is not None:
+        op: str = '<' if reverse else '>'
+        sql += f' AND (rank {op} %s OR (rank = %s AND rowid {op} %s))'
+        params += [cursor[0], cursor[0], cursor[1]]
+    direction: str = 'DESC' if reverse else 'ASC'
+    sql += f' ORDER BY rank {direction}, rowid {direction} LIMIT %s'
+    params.append(limit)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(sql, params)
+        rows: List[Tuple[int, float]] = db_cursor.fetchall()
+    if reverse:
+        rows.reverse()
+    return rows
+
+
+class SearchResults:
+    """Найденные посты с рангом bm25 в атрибуте search_rank."""
+
+    ordered: bool = True
+
+    def __init__(self, query: str) -> None:
+        self.query: str = query
+
+    def keyset_slice(self, cursor: Optional[SearchCursor], reverse: bool,
+                     limit: int) -> List[Post]:
+        if not match_expression(self.query):
+            return []
+        rows: List[Tuple[int, float]] = ranked_ids(
+            self.query, cursor, reverse, limit)
+        posts: Dict[int, Post] = Post.objects.select_related(
+            'group', 'author').in_bulk([pk for pk, _ in rows])
+        found: List[Post] = []
+        for pk, rank in rows:
+            if pk in posts:
+                posts[pk].search_rank = rank
+                found.append(posts[pk])
+        return found
+
+
+class SearchPaginator(KeysetPaginator):
+    """Курсорная пагинация результатов поиска по ключу (rank, id)."""
+
+    def encode_cursor(self, post: Post) -> str:
+        raw: str = f'{post.search_rank!r}|{post.pk}'
+        return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token: Optional[str]) -> Optional[SearchCursor]:
+        if not token:
+            return None
+        try:
+            padding: str = '=' * (-len(token) % 4)
+            rank, pk = urlsafe_b64decode(
+                token + padding).decode().rsplit('|', 1)
+            return float(rank), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            return None
+
+    def cursor_key(self, direction: str,
+                   cursor: Optional[SearchCursor]) -> str:
+        if cursor is None:
+            return 'first'
+        return f'{direction}:{cursor[0]!r}:{cursor[1]}'
+
+
+def fallback_queryset(query: str) -> QuerySet:
+    """Поиск без FTS5: подстрока в тексте, новые посты первыми."""
+    return Post.objects.filter(text__icontains=query).select_related(
+        'group', 'author')
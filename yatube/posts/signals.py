@@ -0,0 +1,147 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import blobs, counters, feed_cache, search, thumbnails, timeline
+from .models import Comment, Counter, Follow, Group, Post, User
+
+
+@receiver(pre_save, sender=Post)
+def post_pre_save(sender, instance, **kwargs):
+    """Запоминает прежние группу, текст и картинку редактируемого поста
+    и описывает только что загруженную картинку."""
+    if not instance.image:
+        instance.image_width = instance.image_height = None
+        instance.image_placeholder = ''
+    elif not instance.image._committed:
+        (instance.image_width, instance.image_height,
+         instance.image_placeholder) = thumbnails.describe(
+            instance.image) or (None, None, '')
+    instance._old_group_id = instance._old_text = instance._old_image = None
+    if instance.pk is not None:
+        (instance._old_group_id, instance._old_text,
+         instance._old_image) = Post.objects.filter(
+            pk=instance.pk).values_list(
+            'group_id', 'text', 'image').first() or (None, None, None)
+
+
+def bump_post_feeds(post, *group_ids):
+    """Сбрасывает ленты, в которых виден пост."""
+    feed_cache.bump(
+        feed_cache.INDEX,
+        feed_cache.post_scope(post.pk),
+        feed_cache.author_scope(post.author_id),
+        *[feed_cache.group_scope(group_id)
+          for group_id in set(group_ids) if group_id is not None])
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    """Обновляет счётчики, ссылки на картинки, кэш лент, поисковый индекс
+    и раскладывает новый пост по лентам."""
+    bump_post_feeds(instance, instance.group_id, instance._old_group_id)
+    if search.is_supported() and instance._old_text != instance.text:
+        if instance._old_text is not None:
+            search.unindex_post(instance.pk, instance._old_text)
+        search.index_post(instance.pk, instance.text)
+    if instance._old_image != instance.image.name:
+        blobs.acquire(instance.image.name)
+        blobs.release(instance._old_image)
+    if created:
+        counters.change(Counter.ALL_POSTS, 0, 1)
+        counters.change(Counter.AUTHOR_POSTS, instance.author_id, 1)
+        counters.change(Counter.GROUP_POSTS, instance.group_id, 1)
+        timeline.fan_out(instance)
+        return
+    feed_cache.drop_cards([(instance.pk, instance.pub_date)])
+    if instance._old_image and instance._old_image != instance.image.name:
+        thumbnails.forget(instance._old_image)
+    if instance._old_group_id != instance.group_id:
+        counters.change(Counter.GROUP_POSTS, instance._old_group_id, -1)
+        counters.change(Counter.GROUP_POSTS, instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_post_feeds(instance, instance.group_id)
+    if search.is_supported():
+        search.unindex_post(instance.pk, instance.text)
+    feed_cache.drop_cards([(instance.pk, instance.pub_date)])
+    if instance.image:
+        thumbnails.forget(instance.image.name)
+        blobs.release(instance.image.name)
+    counters.change(Counter.ALL_POSTS, 0, -1)
+    counters.change(Counter.AUTHOR_POSTS, instance.author_id, -1)
+    counters.change(Counter.GROUP_POSTS, instance.group_id, -1)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, **kwargs):
+    feed_cache.bump(
+        feed_cache.GROUPS, feed_cache.group_scope(instance.pk))
+    feed_cache.drop_cards(instance.posts.values_list('pk', 'pub_date'))
+
+
+@receiver(pre_delete, sender=Group)
+def group_pre_delete(sender, instance, **kwargs):
+    """Карточки постов группы удаляются, пока связь ещё в базе."""
+    feed_cache.drop_cards(instance.posts.values_list('pk', 'pub_date'))
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    feed_cache.bump(
+        feed_cache.INDEX, feed_cache.GROUPS,
+        feed_cache.group_scope(instance.pk))
+    counters.delete(Counter.GROUP_POSTS, instance.pk)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """Имя автора видно в карточках и фрагментах лент."""
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    # Имя автора видно и в лентах групп с его постами.
+    feed_cache.bump(
+        feed_cache.INDEX, feed_cache.author_scope(instance.pk),
+        *[feed_cache.group_scope(group_id) for group_id in
+          instance.posts.exclude(group=None).order_by().values_list(
+              'group_id', flat=True).distinct()])
+    feed_cache.drop_cards(instance.posts.values_list('pk', 'pub_date'))
+    # Имя автора видно и в комментариях на страницах постов.
+    feed_cache.bump(*[
+        feed_cache.post_scope(post_id) for post_id in Comment.objects.filter(
+            author=instance).order_by().values_list(
+            'post_id', flat=True).distinct()])
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+    if created:
+        counters.change(Counter.POST_COMMENTS, instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.post_scope(instance.post_id))
+    counters.change(Counter.POST_COMMENTS, instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        feed_cache.bump(feed_cache.follows_scope(instance.author_id),
+                        feed_cache.follows_scope(instance.user_id))
+        counters.change(Counter.FOLLOWERS, instance.author_id, 1)
+        counters.change(Counter.FOLLOWING, instance.user_id, 1)
+        timeline.add_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed_cache.bump(feed_cache.follows_scope(instance.author_id),
+                    feed_cache.follows_scope(instance.user_id))
+    counters.change(Counter.FOLLOWERS, instance.author_id, -1)
+    counters.change(Counter.FOLLOWING, instance.user_id, -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
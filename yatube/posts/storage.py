@@ -0,0 +1,94 @@
+"""Хранилище картинок постов с именами по содержимому.
+
+Файл сохраняется под именем <каталог>/<sha256[:2]>/<sha256><расширение>,
+поэтому одинаковые картинки (перепосты) лежат на диске один раз, а их
+миниатюры sorl, ключ которых строится по имени файла, общие для всех
+постов. Сколько постов ссылается на файл, считает модель ImageBlob
+(см. blobs.py).
+
+Загрузка пишется во временный файл в целевом каталоге, одновременно
+считается хэш, затем файл атомарно переименовывается. Если такой файл
+уже есть, временный удаляется, а у существующего обновляется время
+изменения: по нему discard и gc_media видят, что файл только что
+переиспользован. Параллельная запись тех же байтов безопасна, os.replace
+заменит файл идентичным.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from typing import Any, Optional
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+HASHED_NAME = re.compile(r'(^|/)([0-9a-f]{2})/\2[0-9a-f]{62}(\.\w+)?$')
+
+
+def is_hashed(name: str) -> bool:
+    """Имя уже выдано хранилищем по содержимому."""
+    return bool(HASHED_NAME.search(name))
+
+
+def hashed_name(name: str, digest: str) -> str:
+    directory, filename = os.path.split(name)
+    extension: str = os.path.splitext(filename)[1].lower()
+    return os.path.join(directory, digest[:2], digest + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name: str,
+                           max_length: Optional[int] = None) -> str:
+        # Итоговое имя задаёт содержимое, а не свободные имена в каталоге.
+        return name
+
+    def _save(self, name: str, content: Any) -> str:
+        directory: str = os.path.dirname(self.path(name))
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    output.write(chunk)
+            name = hashed_name(name, digest.hexdigest())
+            path: str = self.path(name)
+            if os.path.exists(path):
+                try:
+                    os.utime(path)
+                    return name
+                except FileNotFoundError:
+                    # Файл только что убрал discard: записываем свой.
+                    pass
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # mkstemp создаёт файл с правами 0600.
+            os.chmod(temporary, self.file_permissions_mode or 0o644)
+            os.replace(temporary, path)
+            return name
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+    def discard(self, name: str, grace: float) -> bool:
+        """Удаляет файл, если его не переиспользовали за grace секунд.
+
+        Файл сначала атомарно убирается из-под своего имени: загрузка,
+        успевшая его увидеть, до этого обновила время изменения, а
+        следующая запишет файл заново. Возвращает, удалён ли файл.
+        """
+        path: str = self.path(name)
+        directory, filename = os.path.split(path)
+        trash: str = os.path.join(directory, '.discard-' + filename)
+        try:
+            os.replace(path, trash)
+        except FileNotFoundError:
+            return True
+        if os.stat(trash).st_mtime > time.time() - grace:
+            os.replace(trash, path)
+            return False
+        os.remove(trash)
+        return True
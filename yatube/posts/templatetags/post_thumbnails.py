@@ -0,0 +1,13 @@
+from django import template
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_picture(post, name, resolved=None):
+    """Данные srcset картинки поста или None, если миниатюры не готовы.
+
+    resolved — результат thumbnails.resolve для всей страницы.
+    """
+    return thumbnails.picture(post, name, resolved)
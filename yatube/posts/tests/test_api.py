@@ -0,0 +1,110 @@
+from io import StringIO
+from typing import Any, List
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Group, Post, User
+
+POSTS_COUNT: int = 7
+
+
+@override_settings(API_PAGE_SIZE=3)
+class JsonApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Пост {i}',
+                 group=cls.group if i % 2 else None)
+            for i in range(POSTS_COUNT)
+        ])
+        cls.post = Post.objects.order_by('pk').first()
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.author, text=f'Ответ {i}')
+            for i in range(5)
+        ])
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+
+    def walk(self, url: str, **params: Any) -> List[Any]:
+        results: List[Any] = []
+        response: Any = self.client.get(url, params).json()
+        results.extend(response['results'])
+        while response['next']:
+            response = self.client.get(response['next']).json()
+            results.extend(response['results'])
+        return results
+
+    def test_cursor_walk(self) -> None:
+        """Курсоры ?after= проходят списки целиком и по порядку."""
+        cases = (
+            (reverse('posts:api_posts'), Post.objects.all()),
+            (reverse('posts:api_group_posts', args=('group',)),
+             Post.objects.filter(group=self.group)),
+            (reverse('posts:api_author_posts', args=('author',)),
+             Post.objects.filter(author=self.author)),
+            (reverse('posts:api_post_comments', args=(self.post.pk,)),
+             Comment.objects.filter(post=self.post)),
+        )
+        for url, queryset in cases:
+            with self.subTest(url=url):
+                ids: List[int] = [row['id'] for row in self.walk(url)]
+                self.assertEqual(ids, list(queryset.values_list(
+                    'pk', flat=True)))
+
+    def test_previous_page(self) -> None:
+        url: str = reverse('posts:api_posts')
+        first: Any = self.client.get(url).json()
+        second: Any = self.client.get(first['next']).json()
+        back: Any = self.client.get(second['previous']).json()
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_fields_projection(self) -> None:
+        """?fields= сужает ответ и SELECT, без соединения с автором."""
+        with CaptureQueriesContext(connection) as queries:
+            response: Any = self.client.get(
+                reverse('posts:api_posts'), {'fields': 'id,text'}).json()
+        self.assertEqual(set(response['results'][0]), {'id', 'text'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('auth_user', queries[0]['sql'])
+        self.assertNotIn('image_placeholder', queries[0]['sql'])
+
+    def test_post_detail(self) -> None:
+        response: Any = self.client.get(
+            reverse('posts:api_post_detail', args=(self.post.pk,)))
+        self.assertEqual(response.json(), {
+            'id': self.post.pk, 'text': self.post.text,
+            'pub_date': response.json()['pub_date'],
+            'author': 'author', 'group': None, 'image': None,
+            'image_width': None, 'image_height': None,
+        })
+
+    def test_errors_are_json(self) -> None:
+        cases = (
+            (reverse('posts:api_posts'), {'fields': 'id,password'}, 400),
+            (reverse('posts:api_posts'), {'limit': 'много'}, 400),
+            (reverse('posts:api_group_posts', args=('none',)), {}, 404),
+            (reverse('posts:api_post_detail', args=(0,)), {}, 404),
+        )
+        for url, params, status in cases:
+            with self.subTest(url=url, params=params):
+                response: Any = self.client.get(url, params)
+                self.assertEqual(response.status_code, status)
+                self.assertIn('error', response.json())
+        response = self.client.post(reverse('posts:api_posts'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_benchmark_command(self) -> None:
+        out = StringIO()
+        call_command('benchmark_api', repeat=1, stdout=out)
+        self.assertIn('API:', out.getvalue())
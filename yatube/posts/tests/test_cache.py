@@ -0,0 +1,104 @@
+from typing import Any
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts import feed_cache
+from posts.models import Follow, Group, Post, User
+
+
+class FeedCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Первый пост', group=cls.group)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+
+    def test_feeds_reflect_new_post_immediately(self) -> None:
+        """Новый пост сразу виден во всех закэшированных лентах."""
+        for url in self.urls:
+            self.client.get(url)
+        Post.objects.create(
+            author=self.author, text='Свежий пост', group=self.group)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежий пост')
+
+    def test_moving_post_between_groups(self) -> None:
+        """Смена группы поста сбрасывает кэш обеих групп."""
+        other_url: str = reverse(
+            'posts:group_list', kwargs={'slug': self.other_group.slug})
+        self.client.get(self.urls[1])
+        self.client.get(other_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertNotContains(self.client.get(self.urls[1]), 'Первый пост')
+        self.assertContains(self.client.get(other_url), 'Первый пост')
+
+    def test_group_rename_reaches_index(self) -> None:
+        """Новое название группы видно в ленте главной страницы."""
+        self.client.get(self.urls[0])
+        self.group.title = 'Переименованная группа'
+        self.group.save()
+        self.assertContains(
+            self.client.get(self.urls[0]), 'Переименованная группа')
+
+    def test_unrelated_write_keeps_group_cache(self) -> None:
+        """Пост в другой группе не сбрасывает кэш этой группы."""
+        self.client.get(self.urls[1])
+        Post.objects.create(
+            author=self.author, text='Чужой пост', group=self.other_group)
+        with self.assertNumQueries(2):
+            response: Any = self.client.get(self.urls[1])
+        self.assertContains(response, 'Первый пост')
+
+    def test_post_edit_reaches_every_feed(self) -> None:
+        """Отредактированный пост виден во всех лентах, включая подписки."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        self.client.force_login(reader)
+        urls = self.urls + (reverse('posts:follow_index'),)
+        for url in urls:
+            self.client.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.client.get(url), 'Исправленный пост')
+
+    def test_card_is_shared_between_feeds(self) -> None:
+        """Карточка поста рендерится один раз для всех лент."""
+        self.client.get(self.urls[0])
+        key: str = feed_cache.card_key(self.post.pk, self.post.pub_date)
+        cache.set(key, 'закэшированная карточка')
+        for url in self.urls[1:]:
+            with self.subTest(url=url):
+                self.assertContains(
+                    self.client.get(url), 'закэшированная карточка')
+
+    def test_bump_changes_every_version(self) -> None:
+        """Сброс меняет поколения всех переданных лент сразу."""
+        scopes = (feed_cache.INDEX, feed_cache.group_scope(self.group.pk))
+        before = feed_cache.get_versions(*scopes)
+        feed_cache.bump(*scopes)
+        after = feed_cache.get_versions(*scopes)
+        self.assertTrue(all(new > old for old, new in zip(before, after)))
+        feed_cache.bump()
+        self.assertEqual(feed_cache.get_versions(*scopes), after)
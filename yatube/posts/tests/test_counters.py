@@ -0,0 +1,77 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from posts import counters, timeline
+from posts.models import Comment, Counter, Follow, Group, Post, User
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+
+    def test_failed_write_keeps_counters(self) -> None:
+        """Сбой после записи поста откатывает и пост, и счётчики."""
+        self.assertEqual(counters.get(Counter.AUTHOR_POSTS, self.author.pk), 0)
+        with mock.patch.object(timeline, 'fan_out', side_effect=OSError):
+            with self.assertRaises(OSError):
+                Post.objects.create(author=self.author, text='Пост')
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(counters.get(Counter.AUTHOR_POSTS, self.author.pk), 0)
+        self.assertEqual(counters.get(Counter.ALL_POSTS), 0)
+
+    def test_counters_follow_writes(self) -> None:
+        """Счётчики меняются при создании и удалении объектов."""
+        self.assertEqual(counters.get(Counter.AUTHOR_POSTS, self.author.pk), 0)
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group)
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(counters.get(Counter.AUTHOR_POSTS, self.author.pk), 1)
+        self.assertEqual(counters.get(Counter.GROUP_POSTS, self.group.pk), 1)
+        self.assertEqual(counters.get(Counter.POST_COMMENTS, post.pk), 1)
+        self.assertEqual(counters.get(Counter.FOLLOWERS, self.author.pk), 1)
+        self.assertEqual(counters.get(Counter.FOLLOWING, self.reader.pk), 1)
+        follow.delete()
+        post.delete()
+        self.assertEqual(counters.get(Counter.AUTHOR_POSTS, self.author.pk), 0)
+        self.assertEqual(counters.get(Counter.FOLLOWERS, self.author.pk), 0)
+
+    def test_group_change_moves_post_between_counters(self) -> None:
+        """Смена группы при редактировании переносит пост в счётчиках."""
+        post = Post.objects.create(
+            author=self.author, text='Пост', group=self.group)
+        counters.get(Counter.GROUP_POSTS, self.group.pk)
+        counters.get(Counter.GROUP_POSTS, self.other_group.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertEqual(counters.get(Counter.GROUP_POSTS, self.group.pk), 0)
+        self.assertEqual(
+            counters.get(Counter.GROUP_POSTS, self.other_group.pk), 1)
+
+    def test_profile_reads_counter_instead_of_count(self) -> None:
+        """Профиль берёт число постов из счётчика."""
+        Post.objects.create(author=self.author, text='Пост')
+        counters.get(Counter.AUTHOR_POSTS, self.author.pk)
+        Counter.objects.filter(
+            name=Counter.AUTHOR_POSTS, object_id=self.author.pk).update(
+            value=42)
+        response = self.client.get(f'/profile/{self.author.username}/')
+        self.assertEqual(response.context['posts_count'], 42)
+
+    def test_recount_repairs_drift(self) -> None:
+        """Команда recount исправляет разошедшиеся счётчики."""
+        Post.objects.create(author=self.author, text='Пост')
+        counters.get(Counter.AUTHOR_POSTS, self.author.pk)
+        Counter.objects.update(value=100)
+        call_command('recount', stdout=StringIO())
+        self.assertEqual(counters.get(Counter.AUTHOR_POSTS, self.author.pk), 1)
+        self.assertEqual(counters.get(Counter.ALL_POSTS), 1)
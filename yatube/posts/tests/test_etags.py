@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from typing import Any
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import thumbnails
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'post': reverse('posts:post_detail', args=(self.post.pk,)),
+        }
+        # Первый визит ставит CSRF-cookie, который входит в ETag.
+        self.client.get(self.urls['post'])
+
+    def etag(self, url: str) -> str:
+        response: Any = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        return response['ETag']
+
+    def test_unchanged_page_is_not_rendered(self) -> None:
+        """Совпавший ETag — 304 без запросов к постам и рендеринга."""
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                etag: str = self.etag(url)
+                with CaptureQueriesContext(connection) as queries:
+                    response: Any = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.content)
+                # Сессия, пользователь и поиск объекта по ключу.
+                self.assertLessEqual(len(queries), 3)
+                self.assertFalse(any(
+                    'posts_comment' in query['sql']
+                    or '"posts_post"."pub_date" DESC' in query['sql']
+                    for query in queries))
+
+    def test_changes_give_new_etag(self) -> None:
+        """Новые посты, комментарии и подписки меняют ETag страниц."""
+        changes = (
+            ('index', lambda: Post.objects.create(
+                author=self.author, text='Новый')),
+            ('group', lambda: Group.objects.filter(pk=self.group.pk).first()
+             .save()),
+            ('post', lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')),
+            ('profile', lambda: Follow.objects.create(
+                user=self.reader, author=self.author)),
+        )
+        for name, change in changes:
+            with self.subTest(page=name):
+                etag: str = self.etag(self.urls[name])
+                change()
+                response: Any = self.client.get(
+                    self.urls[name], HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_visitor(self) -> None:
+        """Другой посетитель не получает 304 на чужую страницу."""
+        etag: str = self.etag(self.urls['index'])
+        response: Any = Client().get(
+            self.urls['index'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_object_is_404(self) -> None:
+        response: Any = self.client.get(
+            reverse('posts:post_detail', args=(0,)), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_failed_image_keeps_etag(self) -> None:
+        """Страница с неоткрывающейся картинкой не теряет ETag."""
+        media_root: str = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        with override_settings(MEDIA_ROOT=media_root), mock.patch.object(
+                thumbnails.generate_task, 'delay'):
+            post: Post = Post.objects.create(
+                author=self.author, text='Не картинка',
+                image=SimpleUploadedFile('broken.jpg', b'RIFF....WEBP'))
+            url: str = reverse('posts:post_detail', args=(post.pk,))
+            # Пока миниатюры создаются, ETag нет.
+            response: Any = self.client.get(url)
+            self.assertFalse(response.has_header('ETag'))
+            self.assertIn('no-store', response['Cache-Control'])
+            self.assertFalse(thumbnails.generate(post.image.name))
+            etag: str = self.etag(url)
+            self.assertEqual(self.client.get(
+                url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
@@ -0,0 +1,94 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from typing import Any, List
+
+from django.conf import settings
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+OLD = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+class ExportJsonlTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.old = Post.objects.create(
+            author=cls.author, text='Старый', group=cls.group)
+        Post.objects.filter(pk=cls.old.pk).update(pub_date=OLD)
+        cls.new = Post.objects.create(author=cls.author, text='Новый')
+        Comment.objects.create(
+            post=cls.new, author=cls.reader, text='Ответ')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def export(self, **options: Any) -> List[Any]:
+        out = StringIO()
+        call_command('export_jsonl', stdout=out, stderr=StringIO(),
+                     **options)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_records(self) -> None:
+        """Записи dumpdata со связями по id."""
+        records: List[Any] = self.export()
+        self.assertEqual(
+            [record['model'] for record in records],
+            ['posts.group', 'posts.post', 'posts.post', 'posts.comment',
+             'posts.follow'])
+        post: Any = records[1]
+        self.assertEqual(post['pk'], self.old.pk)
+        self.assertEqual(post['fields']['author'], self.author.pk)
+        self.assertEqual(post['fields']['group'], self.group.pk)
+        self.assertTrue(post['fields']['pub_date'].startswith('2020-01-01'))
+
+    def test_since(self) -> None:
+        """--since отсекает старые посты, группы выгружаются целиком."""
+        records: List[Any] = self.export(since='2021-01-01')
+        posts: List[Any] = [record['pk'] for record in records
+                            if record['model'] == 'posts.post']
+        self.assertEqual(posts, [self.new.pk])
+        self.assertIn('posts.group', {record['model'] for record in records})
+
+    def test_gzip_roundtrip(self) -> None:
+        """Сжатая выгрузка загружается import_dump в пустую базу."""
+        path: str = os.path.join(TEMP_DIR, 'export.jsonl.gz')
+        call_command('export_jsonl', output=path, with_users=True,
+                     stdout=StringIO())
+        with gzip.open(path, 'rt', encoding='utf-8') as dump:
+            count: int = sum(1 for _ in dump)
+        self.assertEqual(count, 7)
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        call_command('import_dump', path, stdout=StringIO())
+        self.assertEqual(Post.objects.get(pk=self.old.pk).pub_date, OLD)
+        self.assertEqual(Comment.objects.get().author.username, 'reader')
+        self.assertTrue(Follow.objects.exists())
+
+    def test_admin_action(self) -> None:
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response: Any = client.post(
+            reverse('admin:posts_post_changelist'),
+            {'action': 'export_jsonl', '_selected_action': [self.new.pk]})
+        self.assertIn('attachment', response['Content-Disposition'])
+        lines: List[Any] = [
+            json.loads(line) for line in
+            b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([line['pk'] for line in lines], [self.new.pk])
@@ -0,0 +1,89 @@
+import json
+from typing import Any
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Group, Post, User
+
+
+class SyndicationFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, text='Первый <пост>', group=cls.group)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.urls = {
+            'posts': reverse('posts:feed_rss'),
+            'group': reverse('posts:group_feed_atom', args=('group',)),
+            'profile': reverse('posts:profile_feed_json', args=('author',)),
+        }
+
+    def test_formats(self) -> None:
+        """RSS, Atom и JSON Feed с текстом, автором и группой поста."""
+        rss: Any = self.client.get(self.urls['posts'])
+        self.assertEqual(rss['Content-Type'], 'application/rss+xml; '
+                                              'charset=utf-8')
+        self.assertIn('&lt;пост&gt;', rss.content.decode())
+        self.assertIn('<category>Группа</category>', rss.content.decode())
+        atom: Any = self.client.get(self.urls['group'])
+        self.assertIn('<name>Лев Толстой</name>', atom.content.decode())
+        feed: Any = json.loads(self.client.get(self.urls['profile']).content)
+        self.assertEqual(feed['version'], 'https://jsonfeed.org/version/1.1')
+        item: Any = feed['items'][0]
+        self.assertEqual(
+            item['url'], 'http://testserver' + reverse(
+                'posts:post_detail', args=(self.post.pk,)))
+        self.assertEqual(item['tags'], ['Группа'])
+
+    def test_cached_document_and_304(self) -> None:
+        """Повторный опрос не читает посты, совпавший ETag — 304."""
+        for name, url in self.urls.items():
+            with self.subTest(feed=name):
+                response: Any = self.client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    cached: Any = self.client.get(url)
+                    conditional: Any = self.client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag'])
+                    since: Any = self.client.get(
+                        url,
+                        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(cached.content, response.content)
+                self.assertEqual(conditional.status_code, 304)
+                self.assertEqual(since.status_code, 304)
+                self.assertFalse(any(
+                    'posts_post' in query['sql'] for query in queries))
+
+    def test_changes_invalidate_feeds(self) -> None:
+        """Новый пост, переименование группы или автора меняют ленты."""
+        changes = (
+            ('posts', lambda: Post.objects.create(
+                author=self.author, text='Второй')),
+            ('group', lambda: User.objects.filter(pk=self.author.pk)
+             .first().save()),
+            ('profile', lambda: Group(
+                pk=self.group.pk, title='Новое', slug='group').save()),
+        )
+        for name, change in changes:
+            with self.subTest(feed=name):
+                etag: str = self.client.get(self.urls[name])['ETag']
+                change()
+                response: Any = self.client.get(
+                    self.urls[name], HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_missing_object_is_404(self) -> None:
+        for url in (reverse('posts:group_feed_rss', args=('none',)),
+                    reverse('posts:profile_feed_atom', args=('none',))):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
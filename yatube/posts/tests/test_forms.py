@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -33,7 +34,7 @@ class PostCreateFormTests(TestCase):
 
     @classmethod
     def tearDownClass(cls) -> None:
-        return super().tearDownClass()
+        super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def test_create_post(self):
@@ -92,6 +93,8 @@ class PostCreateFormTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        # Хранилище называет файл по SHA-256 содержимого
+        digest = hashlib.sha256(small_gif).hexdigest()
         uploaded = SimpleUploadedFile(
             name='small.gif',
             content=small_gif,
@@ -114,6 +117,6 @@ class PostCreateFormTests(TestCase):
             Post.objects.filter(
                 text=self.post.text,
                 group=self.group.id,
-                image='posts/small.gif'
+                image=f'posts/{digest[:2]}/{digest}.gif'
             ).exists()
         )
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from posts import thumbnails
+from posts.management.commands.gc_media import Command
+from posts.models import ImageBlob, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF: bytes = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageCollectionTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.post = Post.objects.create(
+            author=self.author, text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+        thumbnails.forget(self.post.image.name)
+        thumbnails.generate(self.post.image.name)
+        self.orphans = [
+            self.write('posts/old.gif'),
+            self.write('cache/aa/bb/aabb.jpg'),
+            self.write('tmpabc123/posts/small.gif'),
+        ]
+        self.young = self.write('posts/just-uploaded.gif')
+        # Файлы «старые», чтобы их не защищал --min-age.
+        for root, _, files in os.walk(TEMP_MEDIA_ROOT):
+            for name in files:
+                path = os.path.join(root, name)
+                if path != self.young:
+                    os.utime(path, (time.time() - 7200,) * 2)
+
+    def write(self, name: str) -> str:
+        path = os.path.join(TEMP_MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as output:
+            output.write(SMALL_GIF)
+        return path
+
+    def gc(self, **options) -> str:
+        out = StringIO()
+        call_command('gc_media', stdout=out, **options)
+        return out.getvalue()
+
+    def test_dry_run_lists_orphans_only(self) -> None:
+        """--dry-run находит сирот, но ничего не удаляет."""
+        output: str = self.gc(dry_run=True)
+        self.assertIn('Найдено 3 из', output)
+        for path in self.orphans:
+            self.assertIn(os.path.relpath(path, TEMP_MEDIA_ROOT), output)
+            self.assertTrue(os.path.exists(path))
+
+    def test_incremental_runs_remove_orphans(self) -> None:
+        """Короткие запуски продолжают обход и удаляют только сирот."""
+        outputs = [self.gc(batch_size=1, limit=2) for _ in range(6)]
+        self.assertIn('Продолжение после', outputs[1])
+        self.assertTrue(any('обход завершён' in out for out in outputs))
+        for path in self.orphans:
+            self.assertFalse(os.path.exists(path))
+        self.assertFalse(
+            os.path.exists(os.path.join(TEMP_MEDIA_ROOT, 'tmpabc123')))
+        self.assertTrue(os.path.exists(self.young))
+        self.assertTrue(os.path.exists(self.post.image.path))
+        self.assertEqual(thumbnails.missing(self.post.image.name), [])
+
+    def test_file_referenced_after_scan_is_kept(self) -> None:
+        """Файл, на который сослались после поиска сирот, не удаляется."""
+        name: str = self.post.image.name
+        self.post.delete()
+        ImageBlob.objects.filter(name=name).update(refcount=1)
+        Command().remove(TEMP_MEDIA_ROOT, name, 'posts')
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name)))
+
+    def test_reused_upload_is_young_again(self) -> None:
+        """Повторная загрузка тех же байтов защищает файл --min-age."""
+        name: str = self.post.image.name
+        self.post.delete()
+        ImageBlob.objects.filter(name=name).delete()
+        self.post.image.storage.save(
+            'posts/repost.gif', ContentFile(SMALL_GIF))
+        self.gc(restart=True)
+        self.assertTrue(os.path.exists(os.path.join(TEMP_MEDIA_ROOT, name)))
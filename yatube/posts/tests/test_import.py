@@ -0,0 +1,95 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from posts import counters
+from posts.management.commands.import_dump import iter_array
+from posts.models import Comment, Counter, Follow, Post, User
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+RECORDS: List[Dict[str, Any]] = [
+    {'model': 'posts.group', 'pk': 1,
+     'fields': {'title': 'Писатели', 'slug': 'writer', 'description': ''}},
+    {'model': 'auth.user', 'pk': 10,
+     'fields': {'username': 'leo', 'password': '!', 'is_active': True,
+                'date_joined': '2019-10-01T14:34:56Z', 'groups': []}},
+    {'model': 'auth.user', 'pk': 11,
+     'fields': {'username': 'reader', 'password': '!', 'is_active': True,
+                'date_joined': '2019-10-01T14:34:56Z', 'groups': []}},
+    # Комментарий раньше своего поста, как в dump.json.
+    {'model': 'posts.comment', 'pk': 1,
+     'fields': {'post': 2, 'author': 11, 'text': 'Ответ',
+                'created': '2022-08-30T08:57:40Z'}},
+    {'model': 'posts.post', 'pk': 1,
+     'fields': {'text': 'Дневник', 'pub_date': '1854-03-14T00:00:00Z',
+                'author': 10, 'group': 1, 'image': ''}},
+    {'model': 'posts.post', 'pk': 2,
+     'fields': {'text': 'Севастополь', 'pub_date': '1855-01-01T00:00:00Z',
+                'author': 10, 'group': None, 'image': ''}},
+    {'model': 'posts.follow', 'pk': 4, 'fields': {'author': 10, 'user': 11}},
+    {'model': 'sessions.session', 'pk': 'abc',
+     'fields': {'session_data': '', 'expire_date': '2022-08-08T07:17:05Z'}},
+]
+
+
+class ImportDumpTests(TestCase):
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def import_dump(self, path: str, **options: Any) -> str:
+        out = StringIO()
+        call_command('import_dump', path, stdout=out, **options)
+        return out.getvalue()
+
+    def assert_imported(self) -> None:
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            Post.objects.get(pk=1).pub_date.year, 1854)
+        self.assertEqual(Comment.objects.get().post_id, 2)
+        self.assertTrue(Follow.objects.filter(user_id=11).exists())
+        self.assertEqual(counters.get(Counter.AUTHOR_POSTS, 10), 2)
+        self.assertEqual(counters.get(Counter.POST_COMMENTS, 2), 1)
+
+    def test_utf16_array(self) -> None:
+        """Массив в UTF-16 с BOM: даты из дампа, счётчики пересчитаны."""
+        path: str = os.path.join(TEMP_DIR, 'dump.json')
+        with open(path, 'w', encoding='utf-16') as dump:
+            json.dump(RECORDS, dump, ensure_ascii=False, indent=2)
+        output: str = self.import_dump(path, batch_size=2)
+        self.assert_imported()
+        self.assertIn('skipped: 1', output)
+        self.assertIn('в секунду', output)
+
+    def test_gzipped_jsonl_reimport(self) -> None:
+        """JSONL.gz малыми транзакциями; повтор с --ignore-conflicts."""
+        path: str = os.path.join(TEMP_DIR, 'dump.jsonl.gz')
+        with gzip.open(path, 'wt', encoding='utf-8') as dump:
+            for record in RECORDS:
+                dump.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.import_dump(path, transaction_size=3)
+        self.import_dump(path, transaction_size=3, ignore_conflicts=True)
+        self.assert_imported()
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_objects_split_across_chunks(self) -> None:
+        text: str = json.dumps(RECORDS, ensure_ascii=False)
+        chunks = iter([text[i:i + 7] for i in range(0, len(text), 7)])
+        self.assertEqual(list(iter_array(chunks)), RECORDS)
+
+    def test_broken_file(self) -> None:
+        path: str = os.path.join(TEMP_DIR, 'broken.json')
+        with open(path, 'w', encoding='utf-8') as dump:
+            dump.write(json.dumps(RECORDS)[:-40])
+        with self.assertRaises(CommandError):
+            self.import_dump(path)
+        self.assertFalse(Post.objects.exists())
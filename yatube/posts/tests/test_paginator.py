@@ -0,0 +1,80 @@
+from typing import Any, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts.models import Post, User
+from posts.utils import KeysetPaginator, encode_cursor
+
+POSTS_COUNT: int = 25
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.bulk_create([
+            Post(author=cls.author, text=f'Пост {i}')
+            for i in range(POSTS_COUNT)
+        ])
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+
+    def walk_forward(self) -> List[Post]:
+        paginator = KeysetPaginator(Post.objects.all(),
+                                    settings.POSTS_PER_PAGE)
+        page: Any = paginator.get_page()
+        posts: List[Post] = list(page)
+        while page.has_next():
+            page = paginator.get_page(after=page.next_cursor())
+            posts.extend(page)
+        return posts
+
+    def test_forward_walk_returns_all_posts_in_order(self) -> None:
+        """Проход по курсорам ?after= выдаёт все посты без пропусков."""
+        expected: List[Post] = list(
+            Post.objects.order_by('-pub_date', '-pk'))
+        self.assertEqual(self.walk_forward(), expected)
+
+    def test_before_cursor_returns_previous_page(self) -> None:
+        """Курсор ?before= возвращает предыдущую страницу целиком."""
+        paginator = KeysetPaginator(Post.objects.all(),
+                                    settings.POSTS_PER_PAGE)
+        first: Any = paginator.get_page()
+        second: Any = paginator.get_page(after=first.next_cursor())
+        back: Any = paginator.get_page(before=second.previous_cursor())
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+        self.assertTrue(back.has_next())
+
+    def test_broken_cursor_falls_back_to_first_page(self) -> None:
+        """Испорченный токен отдаёт первую страницу."""
+        response: Any = self.client.get(
+            reverse('posts:index'), {'after': '%%%не-курсор'})
+        first: List[Post] = list(
+            Post.objects.order_by('-pub_date', '-pk')[
+                :settings.POSTS_PER_PAGE])
+        self.assertEqual(list(response.context['page_obj']), first)
+
+    @override_settings(POSTS_PAGINATION='keyset')
+    def test_deep_page_does_not_count_rows(self) -> None:
+        """Глубокая страница выбирается одним запросом без COUNT(*)."""
+        last: Post = Post.objects.order_by('pub_date', 'pk')[3]
+        paginator = KeysetPaginator(Post.objects.all(),
+                                    settings.POSTS_PER_PAGE)
+        with self.assertNumQueries(1):
+            page: Any = paginator.get_page(after=encode_cursor(last))
+        self.assertEqual(len(page), 3)
+        self.assertFalse(page.has_next())
+
+    @override_settings(POSTS_PAGINATION='keyset')
+    def test_keyset_links_rendered(self) -> None:
+        """В режиме keyset шаблон выводит ссылки ?after= вместо номеров."""
+        response: Any = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, f'?after={response.context["page_obj"].next_cursor()}')
+        self.assertNotContains(response, '?page=')
@@ -0,0 +1,96 @@
+from typing import Dict, List
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post, User
+from posts.utils import encode_cursor, encode_key
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц не читают таблицы целиком и не сортируют в памяти.
+
+    Статистика (ANALYZE) не собирается: без неё SQLite планирует запросы
+    как для больших таблиц, а не для нескольких тестовых строк.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            author=cls.author, text='Пост', group=cls.group)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def bad_steps(self, sql: str) -> List[str]:
+        """Шаги плана с полным проходом таблицы или временной сортировкой."""
+        with connection.cursor() as cursor:
+            # captured_queries хранит SQL с уже подставленными значениями
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            steps: List[str] = [row[-1] for row in cursor.fetchall()]
+        return [
+            step for step in steps
+            if 'USE TEMP B-TREE' in step
+            or (step.startswith('SCAN ') and ' USING ' not in step)
+        ]
+
+    def assert_indexed(self, url: str, params: Dict[str, str]) -> None:
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url, params)
+        for query in context.captured_queries:
+            sql: str = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            with self.subTest(url=url, params=params, sql=sql):
+                self.assertEqual(self.bad_steps(sql), [])
+
+    def test_feeds_use_indexes(self) -> None:
+        """Ленты, их RSS и курсорные страницы идут по индексам."""
+        cursor: str = encode_cursor(self.post)
+        urls: List[str] = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            for params in ({}, {'after': cursor}, {'before': cursor}):
+                self.assert_indexed(url, params)
+        for url in (reverse('posts:feed_rss'),
+                    reverse('posts:group_feed_rss', args=('group',)),
+                    reverse('posts:profile_feed_rss', args=('author',))):
+            self.assert_indexed(url, {})
+
+    def test_api_uses_indexes(self) -> None:
+        """Списки API и их курсоры идут по индексам."""
+        comment: Comment = Comment.objects.get(post=self.post)
+        cases = (
+            (reverse('posts:api_posts'), encode_cursor(self.post)),
+            (reverse('posts:api_group_posts', args=('group',)),
+             encode_cursor(self.post)),
+            (reverse('posts:api_author_posts', args=('author',)),
+             encode_cursor(self.post)),
+            (reverse('posts:api_post_comments', args=(self.post.pk,)),
+             encode_key(comment.created, comment.pk)),
+        )
+        for url, cursor in cases:
+            for params in ({}, {'after': cursor}, {'before': cursor}):
+                self.assert_indexed(url, params)
+
+    def test_post_detail_uses_indexes(self) -> None:
+        """Комментарии поста читаются по индексу (post, -created)."""
+        self.assert_indexed(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            {})
@@ -0,0 +1,90 @@
+from io import StringIO
+from typing import Any, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts.models import Post, User
+
+POSTS_COUNT: int = 13
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='author', is_staff=True, is_superuser=True)
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Котики номер {i}')
+            for i in range(POSTS_COUNT)
+        ]
+        cls.dog = Post.objects.create(author=cls.author, text='Про собак')
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.url: str = reverse('posts:search')
+
+    def found(self, query: str, **params: str) -> List[Post]:
+        response: Any = self.client.get(self.url, {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_search_finds_by_word_prefix(self) -> None:
+        """Поиск находит посты по началу слова без учёта регистра."""
+        self.assertEqual(self.found('СОБ'), [self.dog])
+        self.assertEqual(self.found('нет такого'), [])
+
+    def test_index_follows_edits_and_deletes(self) -> None:
+        """Индекс обновляется при редактировании и удалении поста."""
+        post = Post.objects.get(pk=self.dog.pk)
+        post.text = 'Про попугаев'
+        post.save()
+        self.assertEqual(self.found('собак'), [])
+        self.assertEqual(self.found('попугаев'), [post])
+        post.delete()
+        self.assertEqual(self.found('попугаев'), [])
+
+    def test_results_are_ranked_and_paginated(self) -> None:
+        """Лучшее совпадение первое, страницы листаются курсором с q."""
+        best = Post.objects.create(
+            author=self.author, text='Котики, котики и снова котики')
+        first: Any = self.client.get(self.url, {'q': 'котики'})
+        page: Any = first.context['page_obj']
+        self.assertEqual(page[0], best)
+        self.assertEqual(len(page), settings.POSTS_PER_PAGE)
+        self.assertContains(first, f'q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA%D0%B8'
+                                   f'&after={page.next_cursor()}')
+        rest: List[Post] = self.found('котики', after=page.next_cursor())
+        self.assertEqual(
+            set(page) | set(rest), set(self.posts) | {best})
+        self.assertEqual(len(page) + len(rest), POSTS_COUNT + 1)
+
+    def test_query_syntax_is_escaped(self) -> None:
+        """Операторы FTS5 в запросе не ломают поиск."""
+        for query in ('"', 'собак*', 'NOT собак', 'text:собак', '(('):
+            with self.subTest(query=query):
+                self.assertEqual(self.client.get(
+                    self.url, {'q': query}).status_code, 200)
+
+    def test_admin_search_uses_index(self) -> None:
+        """Поиск в админке идёт через индекс FTS5."""
+        self.client.force_login(self.author)
+        with CaptureQueriesContext(connection) as context:
+            response: Any = self.client.get(
+                reverse('admin:posts_post_changelist'), {'q': 'собак'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.dog])
+        sql: str = ' '.join(query['sql'] for query in context)
+        self.assertIn('posts_post_fts MATCH', sql)
+        self.assertNotIn(' LIKE ', sql)
+
+    def test_rebuild_command(self) -> None:
+        """Команда rebuild_search_index подхватывает записи без сигналов."""
+        Post.objects.filter(pk=self.dog.pk).update(text='Про хомяков')
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.found('хомяков'), [self.dog])
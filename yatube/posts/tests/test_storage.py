@@ -0,0 +1,139 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, transaction
+from django.db.models import QuerySet
+from django.test import TestCase, override_settings
+from posts import blobs, thumbnails
+from posts.models import ImageBlob, Post, User
+from posts.storage import is_hashed
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF: bytes = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def age(self, path: str) -> None:
+        stamp: float = time.time() - settings.IMAGE_REUSE_GRACE - 60
+        os.utime(path, (stamp, stamp))
+
+    def create_post(self, name: str) -> Post:
+        return Post.objects.create(
+            author=self.author, text=name,
+            image=SimpleUploadedFile(name, SMALL_GIF, 'image/gif'))
+
+    def test_same_content_is_stored_once(self) -> None:
+        """Одинаковые картинки — один файл, общие миниатюры и две ссылки."""
+        first: Post = self.create_post('meme.gif')
+        second: Post = self.create_post('repost.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_hashed(first.image.name))
+        self.assertEqual(
+            os.listdir(os.path.dirname(first.image.path)),
+            [os.path.basename(first.image.name)])
+        self.assertEqual(
+            ImageBlob.objects.get(name=first.image.name).refcount, 2)
+        thumbnails.generate(first.image.name)
+        self.assertEqual(thumbnails.missing(second.image.name), [])
+
+    def test_file_is_deleted_with_last_reference(self) -> None:
+        """Файл удаляется, только когда на него не ссылается ни один пост."""
+        first: Post = self.create_post('meme.gif')
+        second: Post = self.create_post('repost.gif')
+        name: str = first.image.name
+        first.delete()
+        # В TestCase on_commit не срабатывает: collect вызывается явно.
+        self.assertFalse(blobs.collect(name))
+        self.assertTrue(first.image.storage.exists(name))
+        second.delete()
+        self.age(first.image.path)
+        self.assertTrue(blobs.collect(name))
+        self.assertFalse(first.image.storage.exists(name))
+
+    def test_reused_file_survives_collect(self) -> None:
+        """Загрузка тех же байтов до сохранения поста не теряет файл."""
+        post: Post = self.create_post('meme.gif')
+        name: str = post.image.name
+        self.age(post.image.path)
+        post.delete()
+        # Форма уже сохранила файл, пост со ссылкой ещё не записан.
+        self.assertEqual(
+            post.image.storage.save(
+                'posts/repost.gif', ContentFile(SMALL_GIF)),
+            name)
+        self.assertFalse(blobs.collect(name))
+        self.assertTrue(post.image.storage.exists(name))
+        repost: Post = Post.objects.create(
+            author=self.author, text='repost', image=name)
+        self.assertEqual(ImageBlob.objects.get(name=name).refcount, 1)
+        self.assertTrue(os.path.exists(repost.image.path))
+
+    def legacy_posts(self) -> FileSystemStorage:
+        legacy = FileSystemStorage()
+        for name in ('posts/a.gif', 'posts/b.gif'):
+            legacy.save(name, ContentFile(SMALL_GIF))
+            Post.objects.create(author=self.author, text=name, image=name)
+        return legacy
+
+    def dedupe(self) -> None:
+        # В TestCase on_commit не срабатывает: колбэки выполняются сразу.
+        with mock.patch.object(
+                transaction, 'on_commit', lambda callback: callback()):
+            call_command('dedupe_images', stdout=StringIO())
+
+    def test_dedupe_command_merges_legacy_files(self) -> None:
+        """dedupe_images сливает старые копии в один файл по содержимому."""
+        legacy = self.legacy_posts()
+        out = StringIO()
+        call_command('dedupe_images', dry_run=True, stdout=out)
+        self.assertIn('1 дублей слито, 1 файлов переименовано', out.getvalue())
+        self.assertTrue(legacy.exists('posts/a.gif'))
+        self.dedupe()
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name: str = names.pop()
+        self.assertTrue(is_hashed(name))
+        self.assertFalse(legacy.exists('posts/a.gif'))
+        self.assertFalse(legacy.exists('posts/b.gif'))
+        self.assertEqual(ImageBlob.objects.get(name=name).refcount, 2)
+
+    def test_interrupted_dedupe_can_be_repeated(self) -> None:
+        """Сбой при переводе постов не оставляет их без файла."""
+        legacy = self.legacy_posts()
+        with mock.patch.object(
+                QuerySet, 'update', side_effect=DatabaseError), \
+                self.assertRaises(DatabaseError):
+            self.dedupe()
+        for post in Post.objects.all():
+            self.assertTrue(legacy.exists(post.image.name))
+        self.dedupe()
+        self.assertEqual(
+            len(set(Post.objects.values_list('image', flat=True))), 1)
+        self.assertFalse(legacy.exists('posts/a.gif'))
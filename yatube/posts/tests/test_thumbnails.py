@@ -0,0 +1,276 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from typing import Any
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import feed_cache, thumbnails
+from posts.models import Post, User
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF: bytes = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+# Та же картинка другого цвета: другое содержимое — другой файл
+OTHER_GIF: bytes = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\xFF\x00')
+
+
+def uploaded_gif(name: str = 'small.gif') -> SimpleUploadedFile:
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+        self.post = Post.objects.create(
+            author=self.author, text='С картинкой', image=uploaded_gif())
+        thumbnails.forget(self.post.image.name)
+
+    def cached_thumbnail(self) -> Any:
+        geometry_string, options = thumbnails.geometry('card')
+        return default.backend.get_cached_thumbnail(
+            self.post.image, geometry_string, **options)
+
+    def test_page_does_not_generate_thumbnail(self) -> None:
+        """Страница выводит заглушку и не создаёт миниатюру сама."""
+        response: Any = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'data-thumbnail-pending')
+        self.assertIsNone(self.cached_thumbnail())
+
+    def test_ready_thumbnail_replaces_placeholder(self) -> None:
+        """Готовая миниатюра сразу видна, хотя лента уже открывалась."""
+        self.client.get(reverse('posts:index'))
+        thumbnails.generate(self.post.image.name)
+        thumbnail: Any = self.cached_thumbnail()
+        self.assertIsNotNone(thumbnail)
+        for url in (reverse('posts:index'),
+                    reverse('posts:post_detail', args=(self.post.pk,))):
+            with self.subTest(url=url):
+                response: Any = self.client.get(url)
+                self.assertContains(response, thumbnail.url)
+                self.assertNotContains(response, 'data-thumbnail-pending')
+
+    def test_create_and_edit_schedule_thumbnails(self) -> None:
+        """Создание и редактирование поста ставят миниатюры в очередь."""
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Новый пост', 'image': uploaded_gif('new.gif')})
+            self.client.post(
+                reverse('posts:post_edit', args=(self.post.pk,)),
+                {'text': 'Исправленный пост', 'image': uploaded_gif()})
+        new_post = Post.objects.get(text='Новый пост')
+        self.post.refresh_from_db()
+        schedule.assert_has_calls([
+            mock.call(new_post.image.name),
+            mock.call(self.post.image.name),
+        ])
+
+    def test_warm_command_is_resumable(self) -> None:
+        """warm_thumbnails создаёт миниатюры и продолжает с места остановки."""
+        checkpoint: str = os.path.join(TEMP_MEDIA_ROOT, 'checkpoint')
+
+        def warm(**options: Any) -> str:
+            out = StringIO()
+            call_command('warm_thumbnails', workers=0, batch_size=1,
+                         checkpoint=checkpoint, stdout=out, **options)
+            return out.getvalue()
+
+        self.assertIn('создано 1, пропущено 0', warm())
+        self.assertIsNotNone(self.cached_thumbnail())
+        self.assertIn('создано 0, пропущено 0', warm())
+        self.assertIn('создано 0, пропущено 1', warm(restart=True))
+
+    def kvstore_queries(self, url: str) -> int:
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        return sum('thumbnail_kvstore' in query['sql'] for query in context)
+
+    def test_feed_resolves_thumbnails_in_one_query(self) -> None:
+        """Миниатюры ленты ищутся одним запросом, затем берутся из LRU."""
+        posts = [self.post] + [
+            Post.objects.create(author=self.author, text=f'Пост {i}',
+                                image=uploaded_gif(f'{i}.gif'))
+            for i in range(3)
+        ]
+        for post in posts:
+            thumbnails.generate(post.image.name)
+            thumbnails.forget(post.image.name)
+        cache.clear()
+        self.assertEqual(self.kvstore_queries(reverse('posts:index')), 1)
+        cache.clear()
+        self.assertEqual(self.kvstore_queries(reverse('posts:index')), 0)
+
+    def test_thumbnail_from_another_process_is_seen(self) -> None:
+        """Миниатюра, созданная после промаха, видна без сброса кэша."""
+        geometry_string, options = thumbnails.geometry('card')
+        key: str = add_prefix(default.backend.thumbnail_file(
+            self.post.image.name, geometry_string, **options).key)
+        with mock.patch.object(thumbnails.generate_task, 'delay'):
+            self.assertIsNone(thumbnails.get_ready(self.post.image, 'card'))
+            self.assertIsNone(self.cached_thumbnail())
+        self.assertIsNone(cache.get(key))
+        thumbnails.generate(self.post.image.name)
+        # Исполнитель задач — другой процесс: в кэше этого остался промах,
+        # запомненный штатным хранилищем sorl.
+        cache.set(key, cached_db_kvstore.EMPTY_VALUE)
+        self.assertIsNotNone(thumbnails.get_ready(self.post.image, 'card'))
+        cache.set(key, cached_db_kvstore.EMPTY_VALUE)
+        self.assertIsNotNone(self.cached_thumbnail())
+
+    def test_image_change_invalidates_lru(self) -> None:
+        """Смена картинки поста убирает её миниатюры из LRU."""
+        old_name: str = self.post.image.name
+        thumbnails.generate(old_name)
+        self.assertIsNotNone(thumbnails.get_ready(self.post.image, 'card'))
+        self.assertIn((old_name, 'card'), thumbnails._lru)
+        self.post.image = SimpleUploadedFile(
+            'other.gif', OTHER_GIF, 'image/gif')
+        self.post.save()
+        self.assertNotIn((old_name, 'card'), thumbnails._lru)
+
+    def test_upload_stores_dimensions_and_placeholder(self) -> None:
+        """Размеры и LQIP считаются при загрузке и видны вместо миниатюры."""
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1))
+        self.assertTrue(self.post.image_placeholder.startswith(
+            'data:image/jpeg;base64,'))
+        response: Any = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.post.image_placeholder)
+        self.post.image = ''
+        self.post.save()
+        self.assertIsNone(Post.objects.get(pk=self.post.pk).image_width)
+
+    def test_srcset_skips_widths_above_original(self) -> None:
+        """srcset содержит ширины не больше оригинала и ленивую загрузку."""
+        Post.objects.filter(pk=self.post.pk).update(image_width=1000)
+        thumbnails.generate(self.post.image.name)
+        response: Any = self.client.get(reverse('posts:index'))
+        content: str = response.content.decode()
+        self.assertIn('loading="lazy"', content)
+        self.assertIn(' 480w, ', content)
+        self.assertIn(' 960w', content)
+        self.assertNotIn(' 1440w', content)
+
+    def test_warm_command_fills_missing_description(self) -> None:
+        """warm_thumbnails заполняет размеры постов, загруженных до них."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=None, image_height=None, image_placeholder='')
+        call_command('warm_thumbnails', workers=0, restart=True,
+                     checkpoint=os.path.join(TEMP_MEDIA_ROOT, 'describe'),
+                     stdout=StringIO())
+        post: Post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertTrue(post.image_placeholder)
+
+    def test_warm_command_refreshes_cached_cards(self) -> None:
+        """Размеры, дописанные warm_thumbnails, сразу видны в лентах."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=None, image_height=None, image_placeholder='')
+        thumbnails.generate(self.post.image.name)
+        url: str = reverse('posts:index')
+        versions = feed_cache.get_versions(feed_cache.INDEX)
+        # Без размеров оригинала в srcset все ширины.
+        self.assertIn(' 1440w', self.client.get(url).content.decode())
+        call_command('warm_thumbnails', workers=0, restart=True,
+                     checkpoint=os.path.join(TEMP_MEDIA_ROOT, 'refresh'),
+                     stdout=StringIO())
+        self.assertNotEqual(
+            feed_cache.get_versions(feed_cache.INDEX), versions)
+        self.assertNotIn(' 1440w', self.client.get(url).content.decode())
+
+    def test_failed_image_is_not_pending(self) -> None:
+        """Картинка без миниатюр выводится как есть, без заглушки."""
+        broken: Post = Post.objects.create(
+            author=self.author, text='Не картинка',
+            image=SimpleUploadedFile('broken.jpg', b'RIFF....WEBP'))
+        self.assertFalse(thumbnails.generate(broken.image.name))
+        # Страницу отдаёт другой процесс: о неудаче он знает из базы.
+        thumbnails._failed.clear()
+        with mock.patch.object(thumbnails.generate_task, 'delay') as delay:
+            response: Any = self.client.get(
+                reverse('posts:post_detail', args=(broken.pk,)))
+        self.assertContains(response, broken.image.url)
+        self.assertNotContains(response, 'data-thumbnail-pending')
+        delay.assert_not_called()
+
+    def test_lost_task_is_scheduled_again(self) -> None:
+        """Картинку без результата ставят в очередь снова после паузы."""
+        name: str = self.post.image.name
+        with mock.patch.object(thumbnails.generate_task, 'delay') as delay, \
+                mock.patch.object(thumbnails.time, 'monotonic') as monotonic:
+            monotonic.return_value = 1000.0
+            thumbnails.schedule(name)
+            thumbnails.schedule(name)
+            self.assertEqual(delay.call_count, 1)
+            monotonic.return_value += settings.THUMBNAIL_RETRY_AFTER
+            thumbnails.schedule(name)
+        self.assertEqual(delay.call_count, 2)
+
+    def test_webp_sizes_follow_geometries(self) -> None:
+        """С WebP у каждого размера есть WebP-вариант, без него — нет."""
+        with mock.patch.object(thumbnails, '_pillow_webp', return_value=True):
+            self.assertEqual(
+                thumbnails.geometry('card@webp'),
+                ('960x339', {'crop': 'center', 'upscale': True,
+                             'format': 'WEBP'}))
+            self.assertIn('card_480@webp', thumbnails.srcset_names('card'))
+        with mock.patch.object(thumbnails, '_pillow_webp', return_value=False):
+            self.assertNotIn('card@webp', thumbnails.geometries())
+            self.assertEqual(sorted(thumbnails.srcset_names('card')),
+                             ['card', 'card_1440', 'card_480'])
+
+    def test_webp_source_in_markup(self) -> None:
+        """<source type="image/webp"> получает те же ширины, что и <img>."""
+        Post.objects.filter(pk=self.post.pk).update(image_width=1000)
+        thumbnails.generate(self.post.image.name)
+        # Pillow здесь не кодирует WebP: готовые WebP-миниатюры подставляются
+        # в LRU, как если бы их нашёл resolve.
+        for variant in settings.THUMBNAIL_SRCSET['card'].values():
+            thumbnails._lru_put(
+                (self.post.image.name, variant + thumbnails.WEBP_SUFFIX),
+                ImageFile(f'cache/{variant}.webp', default.storage))
+        url: str = reverse('posts:post_detail', args=(self.post.pk,))
+        with mock.patch.object(thumbnails, '_pillow_webp', return_value=True):
+            content: str = self.client.get(url).content.decode()
+        self.assertIn('<source type="image/webp" srcset="'
+                      '/media/cache/card_480.webp 480w, '
+                      '/media/cache/card.webp 960w"', content)
+        self.assertNotIn('card_1440.webp', content)
+        self.assertIn(' 960w"', content)
+        with mock.patch.object(thumbnails, '_pillow_webp', return_value=False):
+            content = self.client.get(url).content.decode()
+        self.assertNotIn('image/webp', content)
+        self.assertIn('<img class="card-img my-2"', content)
+        self.assertIn(' 480w, ', content)
@@ -0,0 +1,141 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from posts import timeline
+from posts.models import (Counter, Follow, Post, PulledAuthor, TimelineEntry,
+                          User)
+from posts.timeline import get_feed, get_timeline
+from posts.utils import KeysetPaginator
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+
+    def test_new_post_is_fanned_out_to_followers(self) -> None:
+        """Новый пост попадает в ленту подписчика, но не чужую."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.assertEqual(list(get_timeline(self.reader)), [post])
+        self.assertFalse(get_timeline(self.other).exists())
+
+    def test_follow_backfills_and_unfollow_prunes(self) -> None:
+        """Подписка добавляет старые посты автора, отписка их убирает."""
+        post = Post.objects.create(author=self.author, text='Старый пост')
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(list(get_timeline(self.reader)), [post])
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=self.reader).exists())
+
+    def test_deleted_post_leaves_timeline(self) -> None:
+        """Удалённый пост пропадает из лент."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='Пост').delete()
+        self.assertFalse(get_timeline(self.reader).exists())
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_timeline_is_capped(self) -> None:
+        """Лента обрезается до TIMELINE_MAX_LENGTH самых новых постов."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline.trim_followers, 'delay') as delay:
+            posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                     for i in range(3)]
+        # Публикация не обрезает ленты сама, а ставит задачу.
+        delay.assert_called_with(self.author.pk, key=str(self.author.pk))
+        self.assertEqual(get_timeline(self.reader).count(), 3)
+        timeline.trim_followers(self.author.pk)
+        self.assertEqual(list(get_timeline(self.reader)), posts[:0:-1])
+
+    def test_backfill_command(self) -> None:
+        """Команда backfill_timeline восстанавливает ленты из Follow."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Пост')
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertEqual(list(get_timeline(self.reader)), [post])
+
+
+@override_settings(FEED_HEAVY_AUTHOR_FOLLOWERS=2)
+class HybridFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        cls.author = User.objects.create_user(username='author')
+        cls.star = User.objects.create_user(username='star')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.reader, author=cls.star)
+        Follow.objects.create(user=cls.fan, author=cls.star)
+
+    def setUp(self) -> None:
+        cache.clear()
+
+    def test_heavy_author_is_not_fanned_out(self) -> None:
+        """Посты тяжёлого автора не раскладываются по лентам."""
+        Post.objects.create(author=self.star, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.filter(
+            post__author=self.star).exists())
+
+    def test_feed_merges_pushed_and_pulled_posts(self) -> None:
+        """Лента сливает готовую часть и посты тяжёлых авторов по дате."""
+        posts = [
+            Post.objects.create(author=author, text=f'Пост {i}')
+            for i, author in enumerate(
+                (self.author, self.star, self.author, self.star))
+        ]
+        feed = get_feed(self.reader)
+        self.assertEqual(list(feed[0:4]), posts[::-1])
+        self.assertEqual(feed.count(), 4)
+        paginator = KeysetPaginator(feed, 3)
+        first = paginator.get_page()
+        second = paginator.get_page(after=first.next_cursor())
+        self.assertEqual(list(first) + list(second), posts[::-1])
+
+    def test_follow_index_uses_hybrid_feed(self) -> None:
+        """Страница /follow/ показывает посты тяжёлых авторов."""
+        post = Post.objects.create(author=self.star, text='Пост звезды')
+        client = Client()
+        client.force_login(self.reader)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+
+    def test_heavy_author_is_marked_before_skipping(self) -> None:
+        """Лента читает авторов по отметке, которую ставит fan_out."""
+        # Без строки счётчика тяжесть считается по Follow.
+        Counter.objects.filter(name=Counter.FOLLOWERS).delete()
+        post = Post.objects.create(author=self.star, text='Пост звезды')
+        self.assertTrue(
+            PulledAuthor.objects.filter(author=self.star).exists())
+        self.assertFalse(
+            PulledAuthor.objects.filter(author=self.author).exists())
+        self.assertEqual(list(get_feed(self.reader)[0:1]), [post])
+
+    def test_posts_survive_author_becoming_light(self) -> None:
+        """Посты тяжёлого периода остаются в ленте после отписок."""
+        post = Post.objects.create(author=self.star, text='Пост звезды')
+        with mock.patch.object(timeline.release_author, 'delay') as delay:
+            Follow.objects.filter(user=self.fan, author=self.star).delete()
+        delay.assert_called_once_with(self.star.pk, key=str(self.star.pk))
+        # Пока задача не выполнена, автор читается при запросе.
+        self.assertEqual(list(get_feed(self.reader)[0:1]), [post])
+        timeline.release_author(self.star.pk)
+        self.assertFalse(PulledAuthor.objects.exists())
+        self.assertEqual(list(get_feed(self.reader)), [post])
+        newer = Post.objects.create(author=self.star, text='Новый пост')
+        self.assertEqual(list(get_timeline(self.reader)), [newer, post])
+
+    def test_release_keeps_mark_of_heavy_author(self) -> None:
+        Post.objects.create(author=self.star, text='Пост звезды')
+        timeline.release_author(self.star.pk)
+        self.assertTrue(
+            PulledAuthor.objects.filter(author=self.star).exists())
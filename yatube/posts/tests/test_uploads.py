@@ -0,0 +1,170 @@
+import shutil
+import struct
+import tempfile
+import zlib
+from io import BytesIO
+from typing import Any
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from posts.forms import PostForm
+from posts.models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg_upload(size: Any, exif: bool = False,
+                name: str = 'photo.jpg') -> SimpleUploadedFile:
+    buffer = BytesIO()
+    options: dict = {}
+    if exif:
+        tags = Image.Exif()
+        tags[0x0112] = 6  # Orientation: повернуть на 90°
+        tags[0x010F] = 'Camera'
+        options['exif'] = tags.tobytes()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', **options)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+def png_upload(size: Any, camera: str) -> SimpleUploadedFile:
+    """Полупрозрачный PNG с EXIF в чанке eXIf."""
+    buffer = BytesIO()
+    tags = Image.Exif()
+    tags[0x010F] = camera
+    Image.new('RGBA', size, (255, 0, 0, 128)).save(
+        buffer, 'PNG', exif=tags.tobytes())
+    return SimpleUploadedFile('alpha.png', buffer.getvalue(), 'image/png')
+
+
+def mpo_upload(size: Any) -> SimpleUploadedFile:
+    """MPO из двух JPEG (красный и синий) со служебным сегментом APP2 MPF.
+
+    Pillow не умеет сохранять MPO, поэтому заголовок собирается вручную.
+    """
+    frames = []
+    for color in ('red', 'blue'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'JPEG')
+        frames.append(buffer.getvalue())
+
+    def header(sizes: Any, offsets: Any) -> bytes:
+        entries = b''.join(
+            struct.pack('<IIIHH', 0x20030000 if not i else 0, size, offset,
+                        0, 0)
+            for i, (size, offset) in enumerate(zip(sizes, offsets)))
+        return (b'II*\x00' + struct.pack('<IH', 8, 3)
+                + struct.pack('<HHI4s', 0xB000, 7, 4, b'0100')
+                + struct.pack('<HHII', 0xB001, 4, 1, 2)
+                + struct.pack('<HHII', 0xB002, 7, len(entries), 50)
+                + struct.pack('<I', 0) + entries)
+
+    length: int = len(header((0, 0), (0, 0)))
+    segment: bytes = b'\xff\xe2' + struct.pack('>H', length + 6) + b'MPF\x00'
+    first: int = len(frames[0]) + len(segment) + length
+    # Смещения кадров — от начала заголовка MP (после 'MPF\0').
+    data: bytes = (frames[0][:2] + segment
+                   + header((first, len(frames[1])), (0, first - 10))
+                   + frames[0][2:] + frames[1])
+    return SimpleUploadedFile('phone.jpg', data, 'image/jpeg')
+
+
+def png_bomb(width: int, height: int) -> SimpleUploadedFile:
+    """PNG, заголовок которого обещает width x height пикселей."""
+    buffer = BytesIO()
+    Image.new('L', (1, 1)).save(buffer, 'PNG')
+    data = bytearray(buffer.getvalue())
+    header = b'IHDR' + struct.pack('>II', width, height) + bytes(data[24:29])
+    data[12:29] = header
+    data[29:33] = struct.pack('>I', zlib.crc32(header))
+    return SimpleUploadedFile('bomb.png', bytes(data), 'image/png')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_UPLOAD_MAX_SIDE=100)
+class PostImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def form(self, upload: SimpleUploadedFile) -> PostForm:
+        return PostForm({'text': 'Пост'}, {'image': upload})
+
+    def test_oversized_image_is_downscaled_to_progressive_jpeg(self) -> None:
+        """Большая картинка уменьшается и сохраняется прогрессивным JPEG."""
+        form = self.form(jpeg_upload((300, 150)))
+        self.assertTrue(form.is_valid(), form.errors)
+        image = Image.open(form.cleaned_data['image'])
+        self.assertEqual(image.size, (100, 50))
+        self.assertTrue(image.info.get('progressive'))
+
+    def test_exif_is_stripped_and_applied(self) -> None:
+        """EXIF удаляется, а поворот из него применяется к пикселям."""
+        client = Client()
+        client.force_login(self.author)
+        client.post(reverse('posts:post_create'), {
+            'text': 'С EXIF', 'image': jpeg_upload((40, 20), exif=True)})
+        post: Post = Post.objects.get(text='С EXIF')
+        with Image.open(post.image.path) as image:
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(image.size, (20, 40))
+        self.assertEqual((post.image_width, post.image_height), (20, 40))
+
+    def test_png_exif_is_stripped(self) -> None:
+        """EXIF не остаётся и в перекодированном PNG с прозрачностью."""
+        form = self.form(png_upload((40, 20), 'SECRET-CAMERA'))
+        self.assertTrue(form.is_valid(), form.errors)
+        upload = form.cleaned_data['image']
+        self.assertEqual(upload.content_type, 'image/png')
+        self.assertNotIn(b'SECRET-CAMERA', upload.read())
+        upload.seek(0)
+        with Image.open(upload) as image:
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_mpo_is_saved_as_first_frame_jpeg(self) -> None:
+        """Снимок MPO с телефона принимается как JPEG из первого кадра."""
+        upload = mpo_upload((40, 20))
+        with Image.open(BytesIO(upload.read())) as image:
+            self.assertEqual((image.format, image.n_frames), ('MPO', 2))
+        upload.seek(0)
+        form = self.form(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        with Image.open(form.cleaned_data['image']) as image:
+            self.assertEqual(image.format, 'JPEG')
+            self.assertEqual(getattr(image, 'n_frames', 1), 1)
+            red, green, blue = image.convert('RGB').getpixel((5, 5))
+            self.assertGreater(red, 200)
+            self.assertLess(blue, 50)
+
+    def test_small_image_is_kept_as_is(self) -> None:
+        """Небольшая картинка без метаданных не перекодируется."""
+        upload = jpeg_upload((40, 20))
+        content: bytes = upload.read()
+        upload.seek(0)
+        form = self.form(upload)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['image'].read(), content)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=10_000)
+    def test_decompression_bomb_is_rejected_by_header(self) -> None:
+        """Картинка больше предела отклоняется без декодирования."""
+        form = self.form(png_bomb(1000, 1000))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors.as_data()['image'][0].code, 'too_many_pixels')
+        # Гигантские заголовки отклоняет уже Pillow в forms.ImageField.
+        self.assertFalse(self.form(png_bomb(60_000, 60_000)).is_valid())
+
+    def test_not_an_image_is_rejected(self) -> None:
+        form = self.form(SimpleUploadedFile('fake.jpg', b'not an image'))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(
+            form.errors.as_data()['image'][0].code, 'invalid_image')
@@ -62,7 +62,7 @@ class PostPagesTests(TestCase):
 
     @classmethod
     def tearDownClass(cls) -> None:
-        return super().tearDownClass()
+        super().tearDownClass()
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def test_pages_use_correct_template(self) -> None:
@@ -264,7 +264,6 @@ class PostPagesTests(TestCase):
     def test_index_cache(self) -> None:
         """Проверка кеширования главной страницы."""
         cache.clear()
-        posts_count = Post.objects.count()
         new_post: Post = Post.objects.create(
             author=self.author,
             text='проверка кэша',
@@ -272,14 +271,9 @@ class PostPagesTests(TestCase):
         )
         response: HTTPResponse = self.author_client.get(reverse(
             'posts:index'))
-        self.assertEqual(Post.objects.count(), posts_count + 1)
-        self.assertTrue(
-            Post.objects.filter(
-                text='проверка кэша',
-                group=self.group.id
-            ).exists()
-        )
-        new_post.delete()
+        self.assertContains(response, 'проверка кэша')
+        # Изменение в обход сигналов не меняет версию кэша
+        Post.objects.filter(pk=new_post.pk).update(text='в обход кэша')
         cached_response: HTTPResponse = self.author_client.get(reverse(
             'posts:index'))
         self.assertEqual(response.content, cached_response.content)
@@ -288,6 +282,33 @@ class PostPagesTests(TestCase):
             reverse('posts:index'))
         self.assertNotEqual(response_cleared.content, cached_response.content)
 
+    def test_index_cache_invalidated_on_write(self) -> None:
+        """Удаление поста сразу видно на главной странице."""
+        cache.clear()
+        new_post: Post = Post.objects.create(
+            author=self.author,
+            text='проверка кэша',
+            group=self.group,
+        )
+        self.assertContains(
+            self.author_client.get(reverse('posts:index')), 'проверка кэша')
+        new_post.delete()
+        self.assertNotContains(
+            self.author_client.get(reverse('posts:index')), 'проверка кэша')
+
+    def test_index_cache_shared_between_users(self) -> None:
+        """Список постов из кэша не содержит чужих ссылок редактирования."""
+        cache.clear()
+        guest: Client = Client()
+        guest.get(reverse('posts:index'))
+        response: HTTPResponse = self.author_client.get(
+            reverse('posts:index'))
+        self.assertContains(response, 'Редактировать пост')
+        self.assertContains(response, 'Пользователь: author')
+        self.assertNotContains(
+            self.user_follower.get(reverse('posts:index')),
+            'Редактировать пост')
+
     def test_post_appears_on_follow_index_page_for_followers(self):
         """Новая запись пользователя появляется в ленте тех,
             кто на него подписан."""
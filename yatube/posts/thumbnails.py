@@ -0,0 +1,388 @@
+"""Фоновая подготовка миниатюр картинок постов.
+
+Шаблоны не создают миниатюры во время запроса: тег post_picture
+(posts/templatetags/post_thumbnails.py) только ищет готовые миниатюры
+в хранилище ключей sorl, а если их ещё нет — ставит создание в очередь,
+и шаблон выводит заглушку. post_create и post_edit ставят
+миниатюры в очередь сразу после сохранения картинки.
+
+Создание миниатюр — фоновая задача (core/tasks.py), которая ставится
+в очередь после коммита транзакции, чтобы исполнитель видел сохранённый
+файл и пост. Процесс помнит, какие картинки уже поставил (_pending), и
+не обращается к очереди на каждой странице с заглушкой; через
+THUMBNAIL_RETRY_AFTER секунд без результата картинка ставится снова
+(задачу мог потерять упавший исполнитель).
+
+Картинку, которую sorl не открыл, generate отмечает в хранилище ключей
+(failure_key). Отметку видят все процессы: такая картинка выводится как
+есть, без заглушки, и больше не ставится в очередь.
+
+Готовые миниатюры страницы ищутся пачкой (resolve): сначала в LRU
+процесса на THUMBNAIL_LRU_SIZE записей, затем одним get_many в кэше
+sorl и одним запросом key__in к таблице KVStore. Записи LRU
+сбрасываются сигналами при смене или удалении картинки поста.
+Отсутствие ключа не кэшируется (KVStore): миниатюру пишет в базу другой
+процесс, и закэшированный промах прятал бы её от страниц.
+
+Карточка выводится через srcset из нескольких ширин THUMBNAIL_SRCSET,
+а если Pillow умеет WebP (и THUMBNAIL_WEBP включён) — ещё и WebP-копий
+тех же размеров. Размеры оригинала и LQIP (крошечная размытая копия в
+data: URI) считаются один раз при загрузке картинки (describe).
+"""
+import logging
+import threading
+import time
+from base64 import b64encode
+from collections import OrderedDict
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from core.tasks import task
+from django.conf import settings
+from PIL import Image, ImageOps, features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+WEBP_SUFFIX: str = '@webp'
+LQIP_WIDTH: int = 32
+
+# Картинки в очереди (-> время постановки) и не открывшиеся: не ставим
+# повторно.
+_pending: Dict[str, float] = {}
+_failed: Set[str] = set()
+# (имя картинки, имя размера) -> готовая миниатюра, последние в конце
+_lru: 'OrderedDict[Tuple[str, str], ImageFile]' = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def failure_key(image_name: str) -> str:
+    """Ключ отметки, что миниатюры картинки создать нельзя."""
+    return add_prefix(image_name, identity='failed')
+
+
+def failed(image_name: str) -> bool:
+    """Картинка не открылась при последней попытке (см. resolve)."""
+    return image_name in _failed
+
+
+def source(image: Any) -> ImageFile:
+    """Картинка для sorl; имя открывается хранилищем поля Post.image.
+
+    Хранилище входит в ключ миниатюры, поэтому имя картинки и FieldFile
+    поста должны давать одну и ту же миниатюру.
+    """
+    if isinstance(image, str):
+        return ImageFile(image, Post._meta.get_field('image').storage)
+    return ImageFile(image)
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl, умеющий искать миниатюру без её создания."""
+
+    def _options(self, source: ImageFile,
+                 options: Dict[str, Any]) -> Dict[str, Any]:
+        # Те же умолчания, что в ThumbnailBackend.get_thumbnail: от них
+        # зависит имя файла миниатюры.
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+    def thumbnail_file(self, file_: Any, geometry_string: str,
+                       **options: Any) -> ImageFile:
+        """Файл миниатюры, каким его создаст get_thumbnail."""
+        image: ImageFile = source(file_)
+        name: str = self._get_thumbnail_filename(
+            image, geometry_string, self._options(image, options))
+        return ImageFile(name, default.storage)
+
+    def get_cached_thumbnail(self, file_: Any, geometry_string: str,
+                             **options: Any) -> Optional[ImageFile]:
+        """Готовая миниатюра из хранилища ключей или None."""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options))
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Хранилище ключей sorl, которое кэширует только найденные ключи.
+
+    Штатное запоминает и промах на THUMBNAIL_CACHE_TIMEOUT; миниатюра,
+    созданная после этого исполнителем задач, оставалась бы невидимой.
+    """
+
+    def _get_raw(self, key: str) -> Optional[str]:
+        value: Any = self.cache.get(key)
+        if value is None or value == cached_db_kvstore.EMPTY_VALUE:
+            try:
+                value = KVStoreModel.objects.get(key=key).value
+            except KVStoreModel.DoesNotExist:
+                return None
+            self.cache.set(
+                key, value, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        return value
+
+
+@lru_cache(maxsize=None)
+def _pillow_webp() -> bool:
+    return features.check('webp')
+
+
+def webp_enabled() -> bool:
+    return settings.THUMBNAIL_WEBP and _pillow_webp()
+
+
+def geometries() -> Dict[str, Tuple[str, Dict[str, Any]]]:
+    """THUMBNAIL_GEOMETRIES вместе с WebP-вариантами, если они включены."""
+    result: Dict[str, Tuple[str, Dict[str, Any]]] = dict(
+        settings.THUMBNAIL_GEOMETRIES)
+    if webp_enabled():
+        for name, (geometry_string, options) in (
+                settings.THUMBNAIL_GEOMETRIES.items()):
+            result[name + WEBP_SUFFIX] = (
+                geometry_string, {**options, 'format': 'WEBP'})
+    return result
+
+
+def geometry(name: str) -> Tuple[str, Dict[str, Any]]:
+    """Размер и параметры миниатюры по имени из geometries()."""
+    return geometries()[name]
+
+
+def geometry_size(name: str) -> Tuple[int, int]:
+    width, height = geometry(name)[0].split('x')
+    return int(width), int(height)
+
+
+def srcset_names(name: str) -> List[str]:
+    """Все миниатюры, из которых собирается srcset размера name."""
+    names: List[str] = list(settings.THUMBNAIL_SRCSET[name].values())
+    if webp_enabled():
+        names += [variant + WEBP_SUFFIX for variant in names]
+    return names
+
+
+def _lru_get(key: Tuple[str, str]) -> Optional[ImageFile]:
+    with _lru_lock:
+        thumbnail: Optional[ImageFile] = _lru.get(key)
+        if thumbnail is not None:
+            _lru.move_to_end(key)
+        return thumbnail
+
+
+def _lru_put(key: Tuple[str, str], thumbnail: ImageFile) -> None:
+    with _lru_lock:
+        _lru[key] = thumbnail
+        _lru.move_to_end(key)
+        while len(_lru) > settings.THUMBNAIL_LRU_SIZE:
+            _lru.popitem(last=False)
+
+
+def forget(image_name: str) -> None:
+    """Убирает миниатюры картинки из LRU процесса."""
+    with _lru_lock:
+        for name in geometries():
+            _lru.pop((image_name, name), None)
+    _pending.pop(image_name, None)
+
+
+def _kv_get_many(keys: List[str]) -> Dict[str, str]:
+    """Сырые значения хранилища ключей sorl: кэш, затем один запрос."""
+    kvstore: Any = default.kvstore
+    empty: str = cached_db_kvstore.EMPTY_VALUE
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    # Промах, запомненный штатным хранилищем sorl, перепроверяется.
+    found: Dict[str, Any] = {
+        key: value for key, value in kvstore.cache.get_many(keys).items()
+        if value and value != empty}
+    missing: List[str] = [key for key in keys if key not in found]
+    if missing:
+        rows: Dict[str, str] = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        kvstore.cache.set_many(
+            rows, thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(rows)
+    return found
+
+
+def resolve(images: Iterable[Any],
+            names: Sequence[str]) -> Dict[str, Dict[str, ImageFile]]:
+    """Готовые миниатюры картинок: имя картинки -> {размер: миниатюра}.
+
+    Не больше одного обращения к хранилищу ключей на всю пачку; для
+    картинок, у которых чего-то не хватает, создание ставится в очередь,
+    если картинка не отмечена как неоткрывающаяся (failed).
+    """
+    resolved: Dict[str, Dict[str, ImageFile]] = {}
+    wanted: Dict[str, Tuple[str, str]] = {}
+    failures: Dict[str, str] = {}
+    for image in images:
+        if not image or image.name in resolved:
+            continue
+        ready: Dict[str, ImageFile] = {}
+        resolved[image.name] = ready
+        for name in names:
+            thumbnail: Optional[ImageFile] = _lru_get((image.name, name))
+            if thumbnail is not None:
+                ready[name] = thumbnail
+                continue
+            geometry_string, options = geometry(name)
+            key: str = add_prefix(default.backend.thumbnail_file(
+                image.name, geometry_string, **options).key)
+            wanted[key] = (image.name, name)
+            failures[failure_key(image.name)] = image.name
+    if wanted:
+        found: Dict[str, str] = _kv_get_many(list(wanted) + list(failures))
+        for key, image_name in failures.items():
+            if key in found:
+                _failed.add(image_name)
+            else:
+                _failed.discard(image_name)
+        for key, (image_name, name) in wanted.items():
+            if key in found:
+                resolved[image_name][name] = deserialize_image_file(
+                    found[key])
+                _lru_put((image_name, name), resolved[image_name][name])
+                _pending.pop(image_name, None)
+            else:
+                schedule(image_name)
+    return resolved
+
+
+def get_ready(image: Any, name: str) -> Optional[ImageFile]:
+    """Готовая миниатюра картинки; без неё ставит создание в очередь."""
+    if not image:
+        return None
+    return resolve([image], [name])[image.name].get(name)
+
+
+def picture(post: Any, name: str,
+            resolved: Optional[Dict[str, Dict[str, ImageFile]]] = None
+            ) -> Optional[Dict[str, Any]]:
+    """Данные для <picture> картинки поста или None, пока она готовится.
+
+    Для картинки, миниатюры которой создать нельзя, — {'failed': True}:
+    шаблон выводит оригинал без заглушки. Ширины больше оригинала в
+    srcset не попадают: увеличенная копия не даёт чёткости, только
+    лишние байты.
+    """
+    if not post.image:
+        return None
+    names: List[str] = srcset_names(name)
+    if resolved is None or post.image.name not in resolved:
+        resolved = resolve([post.image], names)
+    ready: Dict[str, ImageFile] = resolved[post.image.name]
+    if any(variant not in ready for variant in names):
+        return {'failed': True} if failed(post.image.name) else None
+    widths: Dict[int, str] = settings.THUMBNAIL_SRCSET[name]
+    chosen: List[Tuple[int, str]] = [
+        (width, variant) for width, variant in sorted(widths.items())
+        if variant == name or not post.image_width
+        or width <= post.image_width
+    ]
+    width, height = geometry_size(name)
+    result: Dict[str, Any] = {
+        'src': ready[name].url,
+        'width': width,
+        'height': height,
+        'srcset': ', '.join(
+            f'{ready[variant].url} {size}w' for size, variant in chosen),
+        'webp_srcset': '',
+    }
+    if webp_enabled():
+        result['webp_srcset'] = ', '.join(
+            f'{ready[variant + WEBP_SUFFIX].url} {size}w'
+            for size, variant in chosen)
+    return result
+
+
+def describe(file: Any) -> Optional[Tuple[int, int, str]]:
+    """Ширина и высота картинки и её LQIP для карточки.
+
+    LQIP — JPEG шириной LQIP_WIDTH с пропорциями карточки в data: URI.
+    JPEG декодируется сразу в уменьшенном виде (Image.draft).
+    """
+    card_width, card_height = geometry_size('card')
+    size: Tuple[int, int] = (
+        LQIP_WIDTH, max(1, round(LQIP_WIDTH * card_height / card_width)))
+    buffer: BytesIO = BytesIO()
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            width, height = image.size
+            image.draft('RGB', (size[0] * 4, size[1] * 4))
+            preview: Image.Image = ImageOps.fit(image.convert('RGB'), size)
+        preview.save(buffer, 'JPEG', quality=40)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    finally:
+        file.seek(0)
+    encoded: str = b64encode(buffer.getvalue()).decode()
+    return width, height, f'data:image/jpeg;base64,{encoded}'
+
+
+def missing(image_name: str) -> List[str]:
+    """Размеры из THUMBNAIL_GEOMETRIES, которых ещё нет у картинки."""
+    return [
+        name for name, (geometry_string, options) in geometries().items()
+        if default.backend.get_cached_thumbnail(
+            image_name, geometry_string, **options) is None
+    ]
+
+
+def generate(image_name: str) -> bool:
+    """Создаёт миниатюры картинки во всех настроенных размерах.
+
+    Возвращает False, если исходную картинку открыть не удалось; это
+    отмечается в хранилище ключей, удачная попытка отметку снимает.
+    """
+    kvstore: Any = default.kvstore
+    for geometry_string, options in geometries().values():
+        thumbnail: ImageFile = default.backend.get_thumbnail(
+            source(image_name), geometry_string, **options)
+        if not kvstore.get(thumbnail):
+            # sorl не смог открыть исходную картинку.
+            _failed.add(image_name)
+            kvstore._set_raw(failure_key(image_name), '1')
+            return False
+    if image_name in _failed or kvstore._get_raw(failure_key(image_name)):
+        _failed.discard(image_name)
+        kvstore._delete_raw(failure_key(image_name))
+    return True
+
+
+@task(max_attempts=3)
+def generate_task(image_name: str) -> None:
+    """Фоновая задача: миниатюры картинки image_name."""
+    if not generate(image_name):
+        # Повтор не поможет: картинка не открывается.
+        logger.warning('Картинка %s не открылась', image_name)
+
+
+def schedule(image_name: str) -> None:
+    """Ставит создание миниатюр в очередь после коммита транзакции."""
+    if not image_name or image_name in _failed:
+        return
+    now: float = time.monotonic()
+    if now - _pending.get(image_name, -settings.THUMBNAIL_RETRY_AFTER) < (
+            settings.THUMBNAIL_RETRY_AFTER):
+        return
+    _pending[image_name] = now
+    generate_task.delay(image_name, key=image_name)
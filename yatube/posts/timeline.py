@@ -0,0 +1,270 @@
+"""Лента подписок: гибрид fan-out-on-write и чтения при запросе.
+
+Пост обычного автора при публикации раскладывается в TimelineEntry всех
+подписчиков, поэтому эта часть ленты читается одним проходом по индексу
+(user, -pub_date). Посты «тяжёлых» авторов (подписчиков не меньше
+FEED_HEAVY_AUTHOR_FOLLOWERS) не раскладываются: при чтении ленты они
+выбираются по автору и сливаются с готовой лентой через heapq.merge.
+
+Тяжесть автора решает одно место — счётчик подписчиков в базе (mark):
+если пост не разложен, автор записывается в PulledAuthor, и ленты
+читают его посты при запросе ровно по этой таблице. Когда подписчиков
+становится меньше порога, задача release_author сначала снимает отметку,
+а затем дозаполняет ленты подписчиков, чтобы посты, написанные автором в
+тяжёлый период, не пропали.
+
+Ленты длиннее TIMELINE_MAX_LENGTH обрезает фоновая задача trim_followers
+после раскладки поста, а не сама публикация; до этого лента может быть
+немного длиннее.
+"""
+import heapq
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from core.tasks import task
+from django.conf import settings
+from django.db.models import Count, Q
+from django.db.models.query import QuerySet
+
+from . import counters
+from .models import Counter, Follow, Post, PulledAuthor, TimelineEntry, User
+from .utils import Cursor, keyset_slice
+
+# Лент в одном запросе обрезки
+TRIM_BATCH_SIZE: int = 500
+
+
+def mark(author_id: int) -> bool:
+    """Тяжёлый ли автор; тяжёлого отмечает в PulledAuthor.
+
+    Отметка ставится до того, как пост или подписка останутся без
+    раскладки, в той же транзакции.
+    """
+    if counters.get(Counter.FOLLOWERS, author_id) < (
+            settings.FEED_HEAVY_AUTHOR_FOLLOWERS):
+        return False
+    PulledAuthor.objects.bulk_create(
+        [PulledAuthor(author_id=author_id)], ignore_conflicts=True)
+    return True
+
+
+def fan_out(post: Post) -> None:
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if mark(post.author_id):
+        return
+    follower_ids: List[int] = list(Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+         for user_id in follower_ids],
+        ignore_conflicts=True,
+    )
+    # Обрезка считает записи всех лент подписчиков: не при публикации.
+    trim_followers.delay(post.author_id, key=str(post.author_id))
+
+
+def add_author(user_id: int, author_id: int) -> None:
+    """Заполняет ленту читателя последними постами нового автора."""
+    if mark(author_id):
+        return
+    posts: QuerySet = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk').values_list('pk', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+         for post_id, pub_date in posts[:settings.TIMELINE_MAX_LENGTH]],
+        ignore_conflicts=True,
+    )
+    trim([user_id])
+
+
+def remove_author(user_id: int, author_id: int) -> None:
+    """Убирает из ленты читателя посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+    if PulledAuthor.objects.filter(author_id=author_id).exists() and (
+            counters.get(Counter.FOLLOWERS, author_id)
+            < settings.FEED_HEAVY_AUTHOR_FOLLOWERS):
+        release_author.delay(author_id, key=str(author_id))
+
+
+@task()
+def release_author(author_id: int) -> None:
+    """Возвращает бывшего тяжёлого автора к раскладке по лентам.
+
+    Отметка снимается раньше дозаполнения: пост, разложенный после
+    снятия, уже попадёт в ленты сам, а посты до него — при дозаполнении.
+    Если автор снова стал тяжёлым, отметка остаётся.
+    """
+    if not unmark(PulledAuthor.objects.filter(author_id=author_id)):
+        return
+    follower_ids: QuerySet = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    for user_id in follower_ids.iterator():
+        add_author(user_id, author_id)
+
+
+def unmark(pulled: QuerySet) -> int:
+    """Снимает отметки с авторов, ставших лёгкими; возвращает их число.
+
+    Проверка счётчика и удаление — один запрос, поэтому отметка, которую
+    параллельно поставил mark(), не потеряется.
+    """
+    return pulled.exclude(author_id__in=Counter.objects.filter(
+        name=Counter.FOLLOWERS,
+        value__gte=settings.FEED_HEAVY_AUTHOR_FOLLOWERS,
+    ).values('object_id')).delete()[0]
+
+
+def trim(user_ids: Iterable[int]) -> None:
+    """Обрезает ленты, превысившие TIMELINE_MAX_LENGTH записей."""
+    limit: int = settings.TIMELINE_MAX_LENGTH
+    overflowed: QuerySet = TimelineEntry.objects.filter(
+        user_id__in=list(user_ids)).order_by().values('user_id').annotate(
+        total=Count('id')).filter(total__gt=limit)
+    for row in overflowed:
+        entries: QuerySet = TimelineEntry.objects.filter(
+            user_id=row['user_id'])
+        stale: List[int] = list(entries.order_by(
+            '-pub_date', '-post_id').values_list('pk', flat=True)[limit:])
+        entries.filter(pk__in=stale).delete()
+
+
+@task()
+def trim_followers(author_id: int) -> None:
+    """Фоновая задача: обрезает ленты подписчиков автора после раскладки.
+
+    Ключ задачи — автор, поэтому серия его постов обрезает ленты один раз.
+    """
+    follower_ids: QuerySet = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    batch: List[int] = []
+    for user_id in follower_ids.iterator():
+        batch.append(user_id)
+        if len(batch) == TRIM_BATCH_SIZE:
+            trim(batch)
+            batch = []
+    trim(batch)
+
+
+class Timeline:
+    """Материализованная лента читателя, от новых к старым.
+
+    Срезы и курсоры выбираются по индексу TimelineEntry (user, -pub_date,
+    -post), а сами посты догружаются одним запросом по первичному ключу.
+    Фильтр по курсору нельзя наложить на соединение Post с лентой: в
+    отдельном filter() Django соединяет таблицу ещё раз.
+    """
+
+    ordered: bool = True
+
+    def __init__(self, entries: QuerySet) -> None:
+        self.entries: QuerySet = entries.order_by('-pub_date', '-post__id')
+
+    def exclude_authors(self, author_ids: Iterable[int]) -> 'Timeline':
+        return Timeline(self.entries.exclude(post__author_id__in=author_ids))
+
+    def count(self) -> int:
+        return self.entries.count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def exists(self) -> bool:
+        return self.entries.exists()
+
+    def _posts(self, entries: QuerySet) -> List[Post]:
+        post_ids: List[int] = list(entries.values_list('post_id', flat=True))
+        posts: Dict[int, Post] = Post.objects.select_related(
+            'group', 'author').in_bulk(post_ids)
+        return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+    def __iter__(self) -> Iterator[Post]:
+        return iter(self._posts(self.entries))
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        return self._posts(self.entries[key])
+
+    def keyset_slice(self, cursor: Optional[Cursor], reverse: bool,
+                     limit: int) -> List[Post]:
+        entries: QuerySet = self.entries
+        if cursor is not None:
+            pub_date, pk = cursor
+            if reverse:
+                entries = entries.filter(
+                    Q(pub_date__gt=pub_date)
+                    | Q(pub_date=pub_date, post_id__gt=pk)
+                ).order_by('pub_date', 'post__id')
+            else:
+                entries = entries.filter(
+                    Q(pub_date__lt=pub_date)
+                    | Q(pub_date=pub_date, post_id__lt=pk))
+        posts: List[Post] = self._posts(entries[:limit])
+        if cursor is not None and reverse:
+            posts.reverse()
+        return posts
+
+
+def get_timeline(user: User) -> Timeline:
+    """Посты из материализованной ленты читателя, от новых к старым."""
+    return Timeline(TimelineEntry.objects.filter(user=user))
+
+
+def _sort_key(post: Post) -> Any:
+    return post.pub_date, post.pk
+
+
+class HybridFeed:
+    """Слияние готовой ленты с постами тяжёлых авторов.
+
+    Поддерживает срезы (для Paginator) и keyset_slice (для
+    KeysetPaginator); каждый источник читается не дальше нужной страницы.
+    Источники — запросы Post или Timeline.
+    """
+
+    ordered: bool = True
+
+    def __init__(self, sources: List[Any]) -> None:
+        self.sources: List[Any] = sources
+
+    def count(self) -> int:
+        return sum(source.count() for source in self.sources)
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def _merge(self, parts: List[Iterable[Post]]) -> Iterable[Post]:
+        return heapq.merge(*parts, key=_sort_key, reverse=True)
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        if isinstance(key, int):
+            return self[key:key + 1][0]
+        start: int = key.start or 0
+        stop: int = key.stop
+        merged: Iterable[Post] = self._merge(
+            [source[:stop] for source in self.sources])
+        return list(islice(merged, start, stop))
+
+    def keyset_slice(self, cursor: Optional[Cursor], reverse: bool,
+                     limit: int) -> List[Post]:
+        merged: List[Post] = list(self._merge(
+            [keyset_slice(source, cursor, reverse, limit)
+             for source in self.sources]))
+        return merged[-limit:] if reverse else merged[:limit]
+
+
+def get_feed(user: User) -> Union[Timeline, HybridFeed]:
+    """Лента подписок читателя для get_page_obj."""
+    heavy: List[int] = list(PulledAuthor.objects.filter(
+        author_id__in=Follow.objects.filter(user=user).values(
+            'author_id')).values_list('author_id', flat=True))
+    pushed: Timeline = get_timeline(user)
+    if not heavy:
+        return pushed
+    pulled: List[QuerySet] = [
+        Post.objects.filter(author_id=author_id).select_related(
+            'group', 'author').order_by('-pub_date', '-pk')
+        for author_id in heavy
+    ]
+    return HybridFeed([pushed.exclude_authors(heavy)] + pulled)
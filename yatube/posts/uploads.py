@@ -0,0 +1,139 @@
+"""Приём картинок постов с ограниченным расходом памяти.
+
+Загрузки пишутся частями во временный файл (TemporaryFileUploadHandler
+в FILE_UPLOAD_HANDLERS), а не держатся в памяти процесса, поэтому и
+forms.ImageField проверяет файл по пути, не копируя его в память.
+PostForm.clean_image (process_upload) затем проверяет формат и размеры
+по заголовку, не декодируя картинку, и отклоняет всё, что больше
+IMAGE_UPLOAD_MAX_PIXELS, ещё до декодирования (защита от «бомб»,
+которые при распаковке занимают гигабайты).
+
+Картинки с метаданными (EXIF: геометка, модель камеры) и картинки
+больше IMAGE_UPLOAD_MAX_SIDE по любой стороне перекодируются: поворот
+из EXIF применяется к пикселям, сторона уменьшается до предела, JPEG
+сохраняется прогрессивным. JPEG при этом декодируется сразу в
+уменьшенном виде (Image.draft), так что пиковая память ограничена
+пределами в настройках, а не размером файла. Анимации не
+перекодируются, чтобы не потерять кадры. Исключение — MPO (JPEG
+с несколькими снимками с телефонов): сохраняется только первый кадр.
+"""
+import tempfile
+from typing import Any, Dict, Tuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image, ImageOps
+
+ALLOWED_FORMATS: Tuple[str, ...] = ('JPEG', 'MPO', 'PNG', 'GIF', 'WEBP')
+# Ключи Image.info, которые не должны попасть в сохранённый файл
+METADATA_KEYS: Tuple[str, ...] = ('exif', 'xmp', 'XML:com.adobe.xmp',
+                                  'photoshop', 'comment')
+
+
+def needs_reencoding(image: Image.Image) -> bool:
+    if image.format == 'MPO':
+        # Кадры MPO — не анимация: браузеры показывают только первый.
+        return True
+    if getattr(image, 'is_animated', False):
+        return False
+    if max(image.size) > settings.IMAGE_UPLOAD_MAX_SIDE:
+        return True
+    return any(key in image.info for key in METADATA_KEYS)
+
+
+def reencode(image: Image.Image, name: str) -> UploadedFile:
+    """Картинка без метаданных, не больше IMAGE_UPLOAD_MAX_SIDE,
+    во временном файле.
+
+    Прозрачные картинки сохраняются в PNG, остальные — в прогрессивный
+    JPEG.
+    """
+    limit: int = settings.IMAGE_UPLOAD_MAX_SIDE
+    # Для JPEG декодер сразу уменьшает картинку в 2–8 раз, а thumbnail
+    # уменьшает её на месте; поворот — уже по уменьшенной копии.
+    image.draft('RGB', (limit, limit))
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    transposed: Image.Image = ImageOps.exif_transpose(image)
+    # exif_transpose и convert копируют info, а из него PNG сохраняет
+    # EXIF в чанк eXIf.
+    for key in METADATA_KEYS:
+        transposed.info.pop(key, None)
+    has_alpha: bool = (transposed.mode in ('RGBA', 'LA')
+                       or 'transparency' in transposed.info)
+    stem: str = name.rsplit('.', 1)[0]
+    # Безымянный временный файл: хранилище скопирует его частями.
+    output = tempfile.TemporaryFile(dir=settings.FILE_UPLOAD_TEMP_DIR)
+    if has_alpha:
+        transposed.convert('RGBA').save(
+            output, 'PNG', optimize=True, exif=b'')
+        name, content_type = f'{stem}.png', 'image/png'
+    else:
+        transposed.convert('RGB').save(
+            output, 'JPEG', quality=settings.IMAGE_UPLOAD_QUALITY,
+            optimize=True, progressive=True, exif=b'')
+        name, content_type = f'{stem}.jpg', 'image/jpeg'
+    size: int = output.tell()
+    output.seek(0)
+    return UploadedFile(output, name, content_type, size)
+
+
+ERROR_MESSAGES: Dict[str, str] = {
+    'invalid_image': ('Загрузите правильное изображение. Файл, который вы '
+                      'загрузили, поврежден или не является изображением.'),
+    'invalid_format': 'Поддерживаются только JPEG, PNG, GIF и WebP.',
+    'too_many_pixels': ('Картинка слишком большая: не больше '
+                        '%(limit)s мегапикселей.'),
+}
+
+
+def error(code: str, **params: Any) -> ValidationError:
+    return ValidationError(ERROR_MESSAGES[code], code=code,
+                           params=params or None)
+
+
+def open_checked(uploaded: Any, source: Any) -> Image.Image:
+    """Картинка по заголовку загрузки, если формат и размер допустимы."""
+    try:
+        uploaded.seek(0)
+        # Image.open читает только заголовок.
+        image: Image.Image = Image.open(source)
+    except Image.DecompressionBombError:
+        raise error('too_many_pixels',
+                    limit=settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6)
+    except Exception as exc:
+        raise error('invalid_image') from exc
+    if image.format not in ALLOWED_FORMATS:
+        raise error('invalid_format')
+    width, height = image.size
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise error('too_many_pixels',
+                    limit=settings.IMAGE_UPLOAD_MAX_PIXELS // 10 ** 6)
+    return image
+
+
+def process_upload(uploaded: Any) -> Any:
+    """Проверенная и при необходимости перекодированная загрузка.
+
+    Вызывается из PostForm.clean_image после forms.ImageField; уже
+    сохранённые картинки (FieldFile при редактировании) не трогает.
+    """
+    if not isinstance(uploaded, UploadedFile):
+        return uploaded
+    source: Any = (uploaded.temporary_file_path()
+                   if hasattr(uploaded, 'temporary_file_path')
+                   else uploaded)
+    image: Image.Image = open_checked(uploaded, source)
+    if needs_reencoding(image):
+        try:
+            reencoded: UploadedFile = reencode(image, uploaded.name)
+        except Exception as exc:
+            raise error('invalid_image') from exc
+        uploaded = reencoded
+        uploaded.image = Image.open(uploaded)
+        uploaded.content_type = Image.MIME.get(uploaded.image.format)
+    if isinstance(source, str):
+        # Файл открывал Pillow: закрываем сразу, не дожидаясь сборщика.
+        image.close()
+    uploaded.seek(0)
+    return uploaded
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, feeds, views
 
 app_name = 'posts'
 
@@ -14,6 +14,7 @@ urlpatterns = [
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('search/', views.search_posts, name='search'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -24,4 +25,23 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('api/v1/posts/', api.post_list, name='api_posts'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail,
+         name='api_post_detail'),
+    path('api/v1/posts/<int:post_id>/comments/', api.post_comments,
+         name='api_post_comments'),
+    path('api/v1/groups/<slug:slug>/posts/', api.group_posts,
+         name='api_group_posts'),
+    path('api/v1/authors/<str:username>/posts/', api.author_posts,
+         name='api_author_posts'),
 ]
+
+for extension, feed_type in feeds.FORMATS.items():
+    urlpatterns += [
+        path(f'feeds/posts.{extension}', feeds.PostFeed(feed_type),
+             name=f'feed_{extension}'),
+        path(f'group/<slug:slug>/feed.{extension}',
+             feeds.GroupFeed(feed_type), name=f'group_feed_{extension}'),
+        path(f'profile/<str:username>/feed.{extension}',
+             feeds.AuthorFeed(feed_type), name=f'profile_feed_{extension}'),
+    ]
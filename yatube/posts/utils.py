@@ -1,8 +1,178 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.utils.dateparse import parse_datetime
+
+PAGINATION_KEYSET: str = 'keyset'
+
+Cursor = Tuple[datetime, int]
+
+
+def encode_key(moment: datetime, pk: int) -> str:
+    """Непрозрачный токен курсора по ключу (момент, id)."""
+    raw: str = f'{moment.isoformat()}|{pk}'
+    return urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def encode_cursor(post: Any) -> str:
+    """Токен курсора по ключу (pub_date, id) поста."""
+    return encode_key(post.pub_date, post.pk)
+
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    """Разбор токена курсора; для испорченного токена возвращает None."""
+    if not token:
+        return None
+    try:
+        padding: str = '=' * (-len(token) % 4)
+        raw: str = urlsafe_b64decode(token + padding).decode()
+        pub_date, pk = raw.rsplit('|', 1)
+        parsed: Optional[datetime] = parse_datetime(pub_date)
+        if parsed is None:
+            return None
+        return parsed, int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def keyset_slice(queryset: QuerySet, cursor: Optional[Cursor],
+                 reverse: bool, limit: int,
+                 field: str = 'pub_date') -> List[Any]:
+    """До limit постов строго после курсора (или до него при reverse).
+
+    Результат всегда упорядочен от новых к старым: (-field, -id).
+    Источник может сам уметь выбирать по курсору (см. timeline.py).
+    """
+    custom: Any = getattr(queryset, 'keyset_slice', None)
+    if custom is not None:
+        return custom(cursor, reverse, limit)
+    if cursor is None:
+        return list(queryset.order_by(f'-{field}', '-pk')[:limit])
+    moment, pk = cursor
+    if reverse:
+        rows: List[Any] = list(queryset.filter(
+            Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'pk__gt': pk})
+        ).order_by(field, 'pk')[:limit])
+        rows.reverse()
+        return rows
+    return list(queryset.filter(
+        Q(**{f'{field}__lt': moment}) | Q(**{field: moment, 'pk__lt': pk})
+    ).order_by(f'-{field}', '-pk')[:limit])
+
+
+class KeysetPage(Page):
+    """Страница курсорной пагинации: без номера и общего числа страниц."""
+
+    def __init__(self, object_list: List[Any], paginator: Paginator,
+                 has_next: bool, has_previous: bool,
+                 cursor_key: str = '') -> None:
+        super().__init__(object_list, None, paginator)
+        self._has_next: bool = has_next
+        self._has_previous: bool = has_previous
+        # Нормализованный курсор: часть ключа кэша страницы.
+        self.cursor_key: str = cursor_key
+
+    def __repr__(self) -> str:
+        return '<Page (keyset)>'
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def next_cursor(self) -> Optional[str]:
+        """Токен для ?after= — следующая (более старая) страница."""
+        if not self._has_next or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[-1])
+
+    def previous_cursor(self) -> Optional[str]:
+        """Токен для ?before= — предыдущая (более новая) страница."""
+        if not self._has_previous or not self.object_list:
+            return None
+        return self.paginator.encode_cursor(self.object_list[0])
+
+
+class KeysetPaginator(Paginator):
+    """Пагинатор по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Стоимость выборки страницы не зависит от её глубины.
+    """
+
+    is_keyset: bool = True
+
+    def encode_cursor(self, obj: Any) -> str:
+        return encode_cursor(obj)
+
+    def decode_cursor(self, token: Optional[str]) -> Optional[Any]:
+        return decode_cursor(token)
+
+    def cursor_key(self, direction: str, cursor: Optional[Any]) -> str:
+        if cursor is None:
+            return 'first'
+        return f'{direction}:{cursor[0].timestamp()}:{cursor[1]}'
+
+    def _slice(self, cursor: Optional[Cursor], reverse: bool,
+               limit: int) -> List[Any]:
+        return keyset_slice(self.object_list, cursor, reverse, limit)
+
+    def get_page(self, after: Optional[str] = None,
+                 before: Optional[str] = None) -> KeysetPage:
+        limit: int = self.per_page + 1
+        before_cursor: Optional[Cursor] = self.decode_cursor(before)
+        if before_cursor is not None:
+            rows: List[Any] = self._slice(before_cursor, True, limit)
+            has_previous: bool = len(rows) > self.per_page
+            return KeysetPage(
+                rows[-self.per_page:], self, True, has_previous,
+                self.cursor_key('before', before_cursor))
+        after_cursor: Optional[Cursor] = self.decode_cursor(after)
+        rows = self._slice(after_cursor, False, limit)
+        return KeysetPage(
+            rows[:self.per_page], self,
+            len(rows) > self.per_page, after_cursor is not None,
+            self.cursor_key('after', after_cursor))
+
+
+class RowKeysetPaginator(KeysetPaginator):
+    """KeysetPaginator для строк values() с ключом (field, pk)."""
+
+    def __init__(self, object_list: QuerySet, per_page: int,
+                 field: str = 'pub_date') -> None:
+        super().__init__(object_list, per_page)
+        self.field: str = field
+
+    def encode_cursor(self, row: Dict[str, Any]) -> str:
+        return encode_key(row[self.field], row['pk'])
+
+    def _slice(self, cursor: Optional[Cursor], reverse: bool,
+               limit: int) -> List[Any]:
+        return keyset_slice(
+            self.object_list, cursor, reverse, limit, self.field)
+
+
+def page_key(page_obj: Page) -> str:
+    """Идентификатор страницы для ключей кэша."""
+    return getattr(page_obj, 'cursor_key', None) or str(page_obj.number)
 
 
-def get_page_obj(queryset, request):
+def get_page_obj(queryset, request, count=None):
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+    if (after or before
+            or settings.POSTS_PAGINATION == PAGINATION_KEYSET):
+        paginator = KeysetPaginator(queryset, settings.POSTS_PER_PAGE)
+        return paginator.get_page(after=after, before=before)
     paginator = Paginator(queryset, settings.POSTS_PER_PAGE)
+    if count is not None:
+        # Число строк уже известно из счётчика: без COUNT(*).
+        paginator.count = count
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
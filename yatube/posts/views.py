@@ -1,63 +1,82 @@
 from http.client import HTTPResponse
 from typing import Any, Dict
 
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from . import counters, feed_cache, search, thumbnails
+from .etags import (conditional, group_etag, index_etag, lookup_or_404,
+                    post_etag, profile_etag)
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Comment, Counter, Follow, Group, Post, User
+from .timeline import get_feed
 from .utils import get_page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+@conditional(index_etag)
 def index(request: HttpRequest) -> HTTPResponse:
     """Главная страница:  Получение последних постов."""
     post_list: QuerySet[Post] = Post.objects.select_related('group', 'author')
-    page_obj: Any = get_page_obj(post_list, request)
-    context: Dict[str, QuerySet[Post]] = {
-        'page_obj': page_obj
+    page_obj: Any = get_page_obj(
+        post_list, request, counters.get(Counter.ALL_POSTS))
+    context: Dict[str, Any] = {
+        'page_obj': page_obj,
+        'post_items': feed_cache.post_list(
+            page_obj, feed_cache.INDEX, feed_cache.GROUPS),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional(group_etag)
 def group_posts(request: HttpRequest, slug: str) -> HTTPResponse:
     """Получение списка последних постов группы."""
-    group: Group = get_object_or_404(Group, slug=slug)
+    group: Group = lookup_or_404(request, Group, slug=slug)
     group_post_list: QuerySet[Post] = group.posts.select_related(
         'group', 'author')
-    page_obj: Any = get_page_obj(group_post_list, request)
+    page_obj: Any = get_page_obj(
+        group_post_list, request,
+        counters.get(Counter.GROUP_POSTS, group.pk))
     context: Dict[str, Any] = {
         'page_obj': page_obj,
+        'post_items': feed_cache.post_list(
+            page_obj, feed_cache.group_scope(group.pk)),
         'group': group,
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional(profile_etag)
 def profile(request: HttpRequest, username: str) -> HTTPResponse:
     """Получение списка  постов одного автора(пользователя)."""
-    author: str = get_object_or_404(User, username=username)
+    author: User = lookup_or_404(request, User, username=username)
     author_posts: QuerySet[Post] = author.posts.select_related(
         'group', 'author')
-    posts_count: int = author_posts.count()
-    page_obj: Any = get_page_obj(author_posts, request)
+    posts_count: int = counters.get(Counter.AUTHOR_POSTS, author.pk)
+    page_obj: Any = get_page_obj(author_posts, request, posts_count)
     following = request.user.is_authenticated and Follow.objects.filter(
         author=author, user=request.user).exists()
     context: Dict[str, Any] = {
         'author': author,
         'posts_count': posts_count,
+        'followers_count': counters.get(Counter.FOLLOWERS, author.pk),
+        'following_count': counters.get(Counter.FOLLOWING, author.pk),
         'page_obj': page_obj,
+        'post_items': feed_cache.post_list(
+            page_obj, feed_cache.author_scope(author.pk),
+            feed_cache.GROUPS),
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional(post_etag)
 def post_detail(request: HttpRequest, post_id: int) -> HTTPResponse:
     """Получение отдельной страницы поста."""
-    post: Post = get_object_or_404(Post, pk=post_id)
-    n_posts: int = post.author.posts.count()
+    post: Post = lookup_or_404(request, Post, pk=post_id)
+    n_posts: int = counters.get(Counter.AUTHOR_POSTS, post.author_id)
     form: CommentForm = CommentForm()
     comments: QuerySet[Comment] = Comment.objects.filter(post__id=post_id)
     context: Dict[str, Any] = {
@@ -65,6 +84,7 @@ def post_detail(request: HttpRequest, post_id: int) -> HTTPResponse:
         'n_posts': n_posts,
         'form': form,
         'comments': comments,
+        'comments_count': counters.get(Counter.POST_COMMENTS, post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
@@ -80,6 +100,7 @@ def post_create(request: HttpRequest) -> HTTPResponse:
             post: PostForm = form.save(commit=False)
             post.author = request.user
             post.save()
+            thumbnails.schedule(post.image.name)
             return redirect('posts:profile', post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -96,6 +117,7 @@ def post_edit(request: HttpRequest, post_id: int) -> HTTPResponse:
             instance=post)
         if form.is_valid():
             form.save()
+            thumbnails.schedule(post.image.name)
             return redirect('posts:post_detail', post.id)
         context: Dict[str, Any] = {
             'is_edit': is_edit,
@@ -118,13 +140,32 @@ def add_comment(request: HttpRequest, post_id: int) -> HTTPResponse:
     return redirect('posts:post_detail', post_id=post_id)
 
 
+def search_posts(request: HttpRequest) -> HTTPResponse:
+    """Поиск постов по тексту, лучшие совпадения первыми."""
+    query: str = request.GET.get('q', '').strip()
+    if search.is_supported():
+        paginator: search.SearchPaginator = search.SearchPaginator(
+            search.SearchResults(query), settings.POSTS_PER_PAGE)
+        page_obj: Any = paginator.get_page(
+            after=request.GET.get('after'), before=request.GET.get('before'))
+    else:
+        page_obj = get_page_obj(search.fallback_queryset(query), request)
+    context: Dict[str, Any] = {
+        'q': query,
+        'page_obj': page_obj,
+        'post_items': feed_cache.render_cards(page_obj if query else []),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def follow_index(request):
     """Страница постов авторов, на которых подписан текущий пользователь."""
-    followed_posts = Post.objects.filter(author__following__user=request.user)
+    followed_posts: Any = get_feed(request.user)
     page_obj: Any = get_page_obj(followed_posts, request)
-    context: Dict[str, QuerySet[Post]] = {
-        'page_obj': page_obj
+    context: Dict[str, Any] = {
+        'page_obj': page_obj,
+        'post_items': feed_cache.render_cards(page_obj),
     }
     return render(request, 'posts/follow.html', context)
 
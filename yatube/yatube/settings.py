@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -20,10 +22,17 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'a@=z2f@fn%&3rh!1&65f-(h!&t=jgzw_)0_@f)n7l)c8qn__9n'
+SECRET_KEY = os.environ.get(
+    'YATUBE_SECRET_KEY', 'a@=z2f@fn%&3rh!1&65f-(h!&t=jgzw_)0_@f)n7l)c8qn__9n')
+
+# Профиль настроек выбирается переменной окружения YATUBE_PROFILE:
+# development (по умолчанию) или production, см. конец файла
+PROFILE: str = os.environ.get('YATUBE_PROFILE', 'development')
+if PROFILE not in ('development', 'production'):
+    raise ImproperlyConfigured(f'Неизвестный YATUBE_PROFILE: {PROFILE}')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = PROFILE == 'development'
 
 
 ALLOWED_HOSTS = [
@@ -49,7 +58,6 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
     'sorl.thumbnail',
-    # 'debug_toolbar',
 ]
 
 MIDDLEWARE = [
@@ -57,12 +65,26 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Пользователь запроса берётся из кэша (core/auth.py)
+    'core.auth.CachedAuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
 POSTS_PER_PAGE: int = 10
+# Входит в ETag лент и страниц постов (posts/etags.py): меняется при
+# изменении шаблонов, чтобы клиенты не получали 304 на старую разметку
+ETAG_VERSION: str = '2'
+# RSS, Atom и JSON Feed (posts/feeds.py): число записей, время жизни
+# документа в кэше (его сбрасывают поколения лент, в production он
+# живёт сутки) и max-age для прокси
+SYNDICATION_ITEMS: int = 20
+SYNDICATION_CACHE_TIMEOUT: int = 20
+SYNDICATION_MAX_AGE: int = 60 * 5
+# JSON API (posts/api.py): записей на странице по умолчанию и предел ?limit=
+API_PAGE_SIZE: int = 20
+API_MAX_PAGE_SIZE: int = 100
+# 'offset' — нумерованные страницы, 'keyset' — курсоры ?after=/?before=
+POSTS_PAGINATION: str = 'offset'
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
@@ -140,14 +162,33 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
+# Загрузки пишутся во временный файл частями, а не читаются в память
+FILE_UPLOAD_HANDLERS: list = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+# Пределы для картинок постов (posts/uploads.py): больше
+# IMAGE_UPLOAD_MAX_PIXELS отклоняется по заголовку, стороны больше
+# IMAGE_UPLOAD_MAX_SIDE уменьшаются при перекодировании
+IMAGE_UPLOAD_MAX_PIXELS: int = 50_000_000
+IMAGE_UPLOAD_MAX_SIDE: int = 2560
+IMAGE_UPLOAD_QUALITY: int = 85
+# Файл картинки без ссылок не удаляется, если его переиспользовала
+# загрузка за последние столько секунд (posts/blobs.py): пост с ним
+# может быть ещё не сохранён; такой файл потом уберёт gc_media
+IMAGE_REUSE_GRACE: int = 60
+
+# Письма копятся в очереди (core/mail.py), запрос их не ждёт;
+# отправляет manage.py send_outbox через OUTBOX_EMAIL_BACKEND
+EMAIL_BACKEND = 'core.mail.OutboxBackend'
 #  подключаем движок filebased.EmailBackend
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+OUTBOX_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 # ошибка 403
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Кэш процесса; профиль production подключает общий (см. конец файла)
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -156,3 +197,107 @@ CACHES = {
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+# Максимальная длина материализованной ленты подписок одного пользователя
+TIMELINE_MAX_LENGTH: int = 1000
+# С этого числа подписчиков посты автора не раскладываются по лентам,
+# а выбираются при чтении ленты
+FEED_HEAVY_AUTHOR_FOLLOWERS: int = 10000
+# Время жизни поколений лент (posts/feed_cache.py), закэшированных
+# фрагментов списков постов и карточек постов, секунд. Записи сбрасывают
+# фрагменты сразу через поколения, но в кэше процесса (LocMemCache)
+# сбросы из других процессов не видны. Поэтому здесь сроки короткие, а
+# долгие включает профиль production с общим кэшем (см. конец файла)
+FEED_VERSION_TIMEOUT: int = 20
+POST_LIST_CACHE_TIMEOUT: int = 20
+POST_CARD_CACHE_TIMEOUT: int = 20
+# Миниатюры картинок постов создаются в фоне (posts/thumbnails.py):
+# имя размера -> (геометрия sorl, параметры)
+THUMBNAIL_BACKEND: str = 'posts.thumbnails.ThumbnailBackend'
+THUMBNAIL_KVSTORE: str = 'posts.thumbnails.KVStore'
+THUMBNAIL_GEOMETRIES: dict = {
+    'card_480': ('480x170', {'crop': 'center', 'upscale': True}),
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'card_1440': ('1440x508', {'crop': 'center', 'upscale': True}),
+}
+# srcset карточки: ширина в пикселях -> имя размера из THUMBNAIL_GEOMETRIES
+THUMBNAIL_SRCSET: dict = {
+    'card': {480: 'card_480', 960: 'card', 1440: 'card_1440'},
+}
+# WebP-копии всех размеров, если Pillow собран с поддержкой WebP
+THUMBNAIL_WEBP: bool = True
+# Число готовых миниатюр в LRU процесса (posts/thumbnails.py)
+THUMBNAIL_LRU_SIZE: int = 2048
+# Через сколько секунд картинка без миниатюр ставится в очередь снова
+THUMBNAIL_RETRY_AFTER: int = 60 * 5
+# Фоновые задачи (core/tasks.py): DatabaseBackend — очередь в базе для
+# manage.py run_workers, ThreadBackend — пул потоков веб-процесса,
+# ImmediateBackend — выполнение сразу. Для runserver — пул потоков,
+# профиль production ставит очередь в базе (см. конец файла и README)
+TASKS_BACKEND: str = 'core.tasks.ThreadBackend'
+# Потоков в run_workers и в ThreadBackend
+TASKS_WORKERS: int = 2
+# Пауза перед повтором упавшей задачи: TASKS_BACKOFF * 2 ** (попытка - 1),
+# не больше TASKS_MAX_BACKOFF секунд
+TASKS_BACKOFF: float = 10.0
+TASKS_MAX_BACKOFF: float = 60 * 60
+# Задача, взятая исполнителем дольше этого, считается брошенной
+TASKS_LOCK_TIMEOUT: int = 60 * 15
+# Как часто run_workers ищет такие задачи, секунд
+TASKS_REQUEUE_INTERVAL: float = 60.0
+# Как часто run_workers проверяет пустую очередь, секунд
+TASKS_POLL_INTERVAL: float = 1.0
+# Исходящая почта (core/mail.py): писем в пачке на одно соединение,
+# писем в секунду (0 — без ограничения), попыток до состояния failed и
+# базовая пауза перед повтором, секунд
+OUTBOX_BATCH_SIZE: int = 50
+OUTBOX_RATE: float = 10.0
+OUTBOX_MAX_ATTEMPTS: int = 5
+OUTBOX_BACKOFF: float = 60.0
+# Сессии и пользователь запроса (core/auth.py) кэшируются только в
+# профиле production с общим кэшем (см. конец файла): в кэше процесса
+# выход и смена пароля не были бы видны другим процессам
+SESSION_ENGINE: str = 'django.contrib.sessions.backends.db'
+# Время жизни закэшированного пользователя запроса, секунд; 0 — не кэшировать
+AUTH_USER_CACHE_TIMEOUT: int = 0
+
+# Запросы, которыми процесс прогревается перед приёмом трафика
+# (core/warmup.py, вызывается из yatube/wsgi.py в профиле production)
+WARMUP_URLS: list = ['/']
+
+if PROFILE == 'development':
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+else:
+    # Шаблоны компилируются один раз на процесс
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove(
+        'django.template.context_processors.debug')
+    # Соединение с базой живёт между запросами, секунд
+    DATABASES['default']['CONN_MAX_AGE'] = 60 * 10
+    # Кэш общий для всех процессов сервера (воркеры, run_workers,
+    # import_dump): сбросы поколений, сессий и пользователей из одного
+    # процесса видны остальным. LocMemCache у каждого процесса свой.
+    # memcached не обходит хранилище при записи, как FileBasedCache, и
+    # add в нём атомарен: на этом держится метка сброса в core/auth.py
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': os.environ.get(
+                'YATUBE_MEMCACHED', '127.0.0.1:11211'),
+        }
+    }
+    FEED_VERSION_TIMEOUT = None
+    POST_LIST_CACHE_TIMEOUT = 60 * 60 * 6
+    POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+    SYNDICATION_CACHE_TIMEOUT = 60 * 60 * 24
+    # Сессии читаются из кэша, база — только при промахе
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    AUTH_USER_CACHE_TIMEOUT = 60 * 60
+    # Задачи выполняет отдельный процесс manage.py run_workers
+    TASKS_BACKEND = 'core.tasks.DatabaseBackend'